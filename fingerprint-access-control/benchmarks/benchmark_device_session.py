@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request fprintd setup vs. the shared device session
+Compares building a FingerprintService for every request (old behaviour)
+with reusing the process-wide session created in create_app()
+"""
+
+import os
+import sys
+import time
+import statistics
+import contextlib
+import io
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from services.device_pool import DevicePool
+from services.fingerprint_service import FingerprintService
+
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", "200"))
+USERNAME = os.environ.get("BENCH_USERNAME", "root")
+
+def run(label, handle_request):
+    """Ejecutar ITERATIONS peticiones simuladas y mostrar latencias"""
+    samples = []
+    for _ in range(ITERATIONS):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            handle_request()
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"{label:<28} mean {statistics.mean(samples):8.3f} ms   "
+          f"p50 {samples[len(samples) // 2]:8.3f} ms   "
+          f"p95 {samples[int(len(samples) * 0.95) - 1]:8.3f} ms")
+    return statistics.mean(samples)
+
+def per_request_setup():
+    # Old controllers: FingerprintService() in the route plus another in UserService
+    route_service, user_service = FingerprintService(), FingerprintService()
+    try:
+        route_service.get_enrolled_fingers(USERNAME)
+    finally:
+        route_service.pool.close()
+        user_service.pool.close()
+
+def main():
+    print(f"📊 Device session benchmark ({ITERATIONS} requests, user '{USERNAME}')\n")
+    shared = FingerprintService(DevicePool().start())
+    if not shared.fingerprint_available:
+        print("⚠️ fprintd not available - measuring demo-mode setup only\n")
+
+    before = run("per-request FingerprintService", per_request_setup)
+    after = run("shared device session", lambda: shared.get_enrolled_fingers(USERNAME))
+
+    reconnects = sum(session.connect_count for session in shared.pool.sessions())
+    print(f"\n⚡ Speed-up: {before / max(after, 1e-9):.1f}x "
+          f"(readers: {len(shared.pool.sessions())}, session reconnects: {reconnects})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential verification fallback, list order vs. frequency order
+Simulates a door where a few dozen regulars make up most entries and counts
+the scan cycles the fallback needs before the right user and finger match
+"""
+
+import os
+import sys
+import random
+import tempfile
+import contextlib
+import io
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from services.access_stats import AccessStatsStore
+
+USERS = int(os.environ.get("BENCH_USERS", "300"))
+FINGERS_PER_USER = int(os.environ.get("BENCH_FINGERS", "2"))
+WARMUP_ENTRIES = int(os.environ.get("BENCH_WARMUP", "2000"))
+ENTRIES = int(os.environ.get("BENCH_ENTRIES", "2000"))
+ZIPF_EXPONENT = float(os.environ.get("BENCH_ZIPF", "1.2"))
+SCAN_SECONDS = float(os.environ.get("BENCH_SCAN_SECONDS", "1.5"))  # one VerifyStart cycle
+TERMINAL = "front-door"
+FINGERS = ["right-index-finger", "left-index-finger", "right-thumb", "left-thumb"]
+
+def build_population(rng):
+    """Usuarios en orden alfabético (como vienen de la base) y quién entra más seguido"""
+    usernames = [f"user{i:04d}" for i in range(USERS)]
+    fingers = {username: FINGERS[:FINGERS_PER_USER] for username in usernames}
+    # Cada usuario usa casi siempre el mismo dedo, no necesariamente el primero
+    favourite = {username: rng.choice(fingers[username]) for username in usernames}
+    regulars = usernames[:]
+    rng.shuffle(regulars)
+    weights = [1.0 / (rank + 1) ** ZIPF_EXPONENT for rank in range(USERS)]
+    return usernames, fingers, favourite, regulars, weights
+
+def scans_until_match(order, fingers_for, username, finger):
+    """Ciclos de captura hasta verificar al usuario con su dedo"""
+    scans = 0
+    for candidate in order:
+        for candidate_finger in fingers_for(candidate):
+            scans += 1
+            if candidate == username and candidate_finger == finger:
+                return scans
+    return scans
+
+def main():
+    rng = random.Random(42)
+    usernames, fingers, favourite, regulars, weights = build_population(rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = AccessStatsStore(os.path.join(tmp, "access_stats.json"))
+            now = 0.0
+            for _ in range(WARMUP_ENTRIES):
+                username = rng.choices(regulars, weights)[0]
+                now += 60
+                stats.record(TERMINAL, username, favourite[username], now=now)
+
+        print(f"📊 Fallback order benchmark ({USERS} users, {ENTRIES} entries, "
+              f"zipf {ZIPF_EXPONENT}, {SCAN_SECONDS}s per scan)\n")
+
+        baseline, ordered = [], []
+        for _ in range(ENTRIES):
+            username = rng.choices(regulars, weights)[0]
+            finger = favourite[username]
+            baseline.append(scans_until_match(usernames, lambda u: fingers[u], username, finger))
+            ranked = stats.rank(TERMINAL, usernames, now=now)
+            ordered.append(scans_until_match(
+                ranked, lambda u: stats.order_fingers(TERMINAL, u, fingers[u]), username, finger))
+
+    for label, samples in (("list order", baseline), ("frequency order", ordered)):
+        samples = sorted(samples)
+        mean = sum(samples) / len(samples)
+        print(f"{label:<18} mean {mean:8.1f} scans ({mean * SCAN_SECONDS:8.1f} s)   "
+              f"p50 {samples[len(samples) // 2]:5d}   p95 {samples[int(len(samples) * 0.95) - 1]:5d}")
+
+    speedup = (sum(baseline) / len(baseline)) / max(sum(ordered) / len(ordered), 1e-9)
+    print(f"\n⚡ Expected time-to-identify reduced {speedup:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
-from pydbus import SystemBus
+from pydbus import SessionBus, SystemBus
 import sys
-from gi.repository import GLib
+from gi.repository import GLib, Gio
 import getpass
 import json
 import os
+import time
+
+# FPRINTD_BUS=session para usar tools/fake_fprintd.py en lugar del fprintd real
+FPRINTD_BUS = os.environ.get("FPRINTD_BUS", "system")
+
+def fprintd_bus():
+    return SessionBus() if FPRINTD_BUS == "session" else SystemBus()
 
 # Archivo para almacenar las etiquetas
 FINGERPRINTS_FILE = "fingerprints_labels.json"
@@ -242,12 +249,60 @@ def multiple_enrollment_with_labels():
     
     return fingerprints
 
+def list_enrolled_fingers_bulk(bus, device_path, usernames, window=64):
+    """ListEnrolledFingers para muchos usuarios con llamadas D-Bus asíncronas en paralelo.
+
+    Mantiene hasta `window` llamadas en vuelo y devuelve {usuario: [dedos]}
+    solo con los usuarios que tienen huellas.
+    """
+    pending = list(dict.fromkeys(usernames))[::-1]
+    results = {}
+    latencies = []
+    in_flight = [0]
+    bulk_loop = GLib.MainLoop()
+
+    def start_next():
+        if not pending:
+            if in_flight[0] == 0:
+                bulk_loop.quit()
+            return
+        username = pending.pop()
+        in_flight[0] += 1
+        bus.con.call("net.reactivated.Fprint", device_path, "net.reactivated.Fprint.Device",
+                     "ListEnrolledFingers", GLib.Variant('(s)', (username,)), GLib.VariantType.new('(as)'),
+                     Gio.DBusCallFlags.NONE, 25000, None, on_reply, (username, time.monotonic()))
+
+    def on_reply(connection, result, user_data):
+        username, sent_at = user_data
+        try:
+            fingers = connection.call_finish(result).unpack()[0]
+            if fingers:
+                results[username] = list(fingers)
+        except GLib.Error:
+            pass  # Usuarios sin huellas o sin permisos
+        latencies.append((time.monotonic() - sent_at) * 1000)
+        in_flight[0] -= 1
+        start_next()
+
+    if not pending:
+        return results
+    started = time.monotonic()
+    for _ in range(min(window, len(pending))):
+        start_next()
+    bulk_loop.run()
+
+    latencies.sort()
+    elapsed_ms = (time.monotonic() - started) * 1000
+    print(f"⚡ {len(latencies)} usuarios consultados en {elapsed_ms:.0f} ms "
+          f"(p50 {latencies[len(latencies) // 2]:.1f} ms, p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)]:.1f} ms por llamada)")
+    return results
+
 def list_enrolled_fingers():
     """Función para listar todas las huellas enrolladas automáticamente"""
     global fingerprints_with_labels
     
     try:
-        bus = SystemBus()
+        bus = fprintd_bus()
         fprintd_root = bus.get("net.reactivated.Fprint", "/net/reactivated/Fprint")
         managed_objects = fprintd_root.GetManagedObjects()
         
@@ -278,27 +333,25 @@ def list_enrolled_fingers():
             
             print(f"Verificando {len(all_users)} usuarios del sistema...\n")
             
+            # Todas las consultas a la vez; los usuarios sin permisos no aparecen
+            enrolled_by_user = list_enrolled_fingers_bulk(bus, device_path, all_users)
             for username in sorted(all_users):
-                try:
-                    enrolled_fingers = fprintd_device.ListEnrolledFingers(username)
-                    if enrolled_fingers:
-                        users_with_fingerprints += 1
-                        total_fingerprints += len(enrolled_fingers)
-                        print(f"👤 Usuario: {username}")
-                        print(f"   📱 Huellas ({len(enrolled_fingers)}):")
+                enrolled_fingers = enrolled_by_user.get(username)
+                if enrolled_fingers:
+                    users_with_fingerprints += 1
+                    total_fingerprints += len(enrolled_fingers)
+                    print(f"👤 Usuario: {username}")
+                    print(f"   📱 Huellas ({len(enrolled_fingers)}):")
+                    
+                    for i, finger in enumerate(enrolled_fingers, 1):
+                        # Buscar etiqueta en archivo
+                        label = get_fingerprint_label(username, finger)
                         
-                        for i, finger in enumerate(enrolled_fingers, 1):
-                            # Buscar etiqueta en archivo
-                            label = get_fingerprint_label(username, finger)
-                            
-                            if label != "Sin etiqueta":
-                                print(f"      {i}. {finger} (Etiqueta: {label})")
-                            else:
-                                print(f"      {i}. {finger}")
-                        print()
-                except Exception as e:
-                    # Silenciar errores para usuarios sin permisos
-                    pass
+                        if label != "Sin etiqueta":
+                            print(f"      {i}. {finger} (Etiqueta: {label})")
+                        else:
+                            print(f"      {i}. {finger}")
+                    print()
             
             # Mostrar huellas con etiquetas desde archivo
             if fingerprints_with_labels:
@@ -480,7 +533,7 @@ def list_enrolled_fingers():
     global fingerprints_with_labels
     
     try:
-        bus = SystemBus()
+        bus = fprintd_bus()
         fprintd_root = bus.get("net.reactivated.Fprint", "/net/reactivated/Fprint")
         managed_objects = fprintd_root.GetManagedObjects()
         
@@ -511,27 +564,25 @@ def list_enrolled_fingers():
             
             print(f"Verificando {len(all_users)} usuarios del sistema...\n")
             
+            # Todas las consultas a la vez; los usuarios sin permisos no aparecen
+            enrolled_by_user = list_enrolled_fingers_bulk(bus, device_path, all_users)
             for username in sorted(all_users):
-                try:
-                    enrolled_fingers = fprintd_device.ListEnrolledFingers(username)
-                    if enrolled_fingers:
-                        users_with_fingerprints += 1
-                        total_fingerprints += len(enrolled_fingers)
-                        print(f"👤 Usuario: {username}")
-                        print(f"   📱 Huellas ({len(enrolled_fingers)}):")
+                enrolled_fingers = enrolled_by_user.get(username)
+                if enrolled_fingers:
+                    users_with_fingerprints += 1
+                    total_fingerprints += len(enrolled_fingers)
+                    print(f"👤 Usuario: {username}")
+                    print(f"   📱 Huellas ({len(enrolled_fingers)}):")
+                    
+                    for i, finger in enumerate(enrolled_fingers, 1):
+                        # Buscar etiqueta en archivo
+                        label = get_fingerprint_label(username, finger)
                         
-                        for i, finger in enumerate(enrolled_fingers, 1):
-                            # Buscar etiqueta en archivo
-                            label = get_fingerprint_label(username, finger)
-                            
-                            if label != "Sin etiqueta":
-                                print(f"      {i}. {finger} (Etiqueta: {label})")
-                            else:
-                                print(f"      {i}. {finger}")
-                        print()
-                except Exception as e:
-                    # Silenciar errores para usuarios sin permisos
-                    pass
+                        if label != "Sin etiqueta":
+                            print(f"      {i}. {finger} (Etiqueta: {label})")
+                        else:
+                            print(f"      {i}. {finger}")
+                    print()
             
             # Mostrar huellas con etiquetas desde archivo
             if fingerprints_with_labels:
@@ -713,7 +764,7 @@ def list_enrolled_fingers():
     global fingerprints_with_labels
     
     try:
-        bus = SystemBus()
+        bus = fprintd_bus()
         fprintd_root = bus.get("net.reactivated.Fprint", "/net/reactivated/Fprint")
         managed_objects = fprintd_root.GetManagedObjects()
         
@@ -744,27 +795,25 @@ def list_enrolled_fingers():
             
             print(f"Verificando {len(all_users)} usuarios del sistema...\n")
             
+            # Todas las consultas a la vez; los usuarios sin permisos no aparecen
+            enrolled_by_user = list_enrolled_fingers_bulk(bus, device_path, all_users)
             for username in sorted(all_users):
-                try:
-                    enrolled_fingers = fprintd_device.ListEnrolledFingers(username)
-                    if enrolled_fingers:
-                        users_with_fingerprints += 1
-                        total_fingerprints += len(enrolled_fingers)
-                        print(f"👤 Usuario: {username}")
-                        print(f"   📱 Huellas ({len(enrolled_fingers)}):")
+                enrolled_fingers = enrolled_by_user.get(username)
+                if enrolled_fingers:
+                    users_with_fingerprints += 1
+                    total_fingerprints += len(enrolled_fingers)
+                    print(f"👤 Usuario: {username}")
+                    print(f"   📱 Huellas ({len(enrolled_fingers)}):")
+                    
+                    for i, finger in enumerate(enrolled_fingers, 1):
+                        # Buscar etiqueta en archivo
+                        label = get_fingerprint_label(username, finger)
                         
-                        for i, finger in enumerate(enrolled_fingers, 1):
-                            # Buscar etiqueta en archivo
-                            label = get_fingerprint_label(username, finger)
-                            
-                            if label != "Sin etiqueta":
-                                print(f"      {i}. {finger} (Etiqueta: {label})")
-                            else:
-                                print(f"      {i}. {finger}")
-                        print()
-                except Exception as e:
-                    # Silenciar errores para usuarios sin permisos
-                    pass
+                        if label != "Sin etiqueta":
+                            print(f"      {i}. {finger} (Etiqueta: {label})")
+                        else:
+                            print(f"      {i}. {finger}")
+                    print()
             
             # Mostrar huellas con etiquetas desde archivo
             if fingerprints_with_labels:
@@ -832,7 +881,7 @@ def smart_fingerprint_identification():
     global fingerprints_with_labels, verification_result, loop
     
     try:
-        bus = SystemBus()
+        bus = fprintd_bus()
         fprintd_root = bus.get("net.reactivated.Fprint", "/net/reactivated/Fprint")
         managed_objects = fprintd_root.GetManagedObjects()
         
@@ -858,14 +907,11 @@ def smart_fingerprint_identification():
         users_with_fingerprints = []
         total_fingerprints = 0
         
-        for username in sorted(all_users):
-            try:
-                enrolled_fingers = fprintd_device.ListEnrolledFingers(username)
-                if enrolled_fingers:
-                    users_with_fingerprints.append((username, enrolled_fingers))
-                    total_fingerprints += len(enrolled_fingers)
-            except:
-                pass
+        enrolled_by_user = list_enrolled_fingers_bulk(bus, device_path, all_users)
+        for username in sorted(enrolled_by_user):
+            enrolled_fingers = enrolled_by_user[username]
+            users_with_fingerprints.append((username, enrolled_fingers))
+            total_fingerprints += len(enrolled_fingers)
         
         if not users_with_fingerprints:
             print("❌ No hay huellas enrolladas en el sistema")
@@ -889,180 +935,182 @@ def smart_fingerprint_identification():
         
         input("\n➤ Presiona Enter cuando estés listo...")
         
-        # Probar con cada usuario usando "any" para verificar todas sus huellas de una vez
-        for username, fingers in users_with_fingerprints:
-            print(f"\n🔍 Verificando contra usuario: {username}")
-            print(f"   📱 Comparando con {len(fingers)} huellas simultáneamente...")
-            print("   👆 Mantén tu dedo en el lector...")
+        # UNA sola suscripción a VerifyStatus para toda la identificación: el callback
+        # siempre actúa sobre el bucle activo, así no se acumulan handlers ni buses
+        verify_subscription = fprintd_device.VerifyStatus.connect(on_verify_status_for_identification)
+        try:
+            return identify_with_single_subscription(fprintd_device, users_with_fingerprints)
+        finally:
+            verify_subscription.disconnect()
+        
+    except Exception as e:
+        print(f"Error en identificación inteligente: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def identify_with_single_subscription(fprintd_device, users_with_fingerprints):
+    """Recorrer usuarios y huellas reutilizando la suscripción a VerifyStatus ya conectada"""
+    global verification_result, loop
+    
+    # Probar con cada usuario usando "any" para verificar todas sus huellas de una vez
+    for username, fingers in users_with_fingerprints:
+        print(f"\n🔍 Verificando contra usuario: {username}")
+        print(f"   📱 Comparando con {len(fingers)} huellas simultáneamente...")
+        print("   👆 Mantén tu dedo en el lector...")
+        
+        timeout_id = None
+        timeout_triggered = False
+        
+        def timeout_callback():
+            nonlocal timeout_triggered
+            timeout_triggered = True
+            loop.quit()
+            return False  # Remove timeout
+        
+        try:
+            verification_result = False
             
-            timeout_id = None
-            timeout_triggered = False
+            # Claim device para este usuario
+            fprintd_device.Claim(username)
             
-            def timeout_callback():
-                nonlocal timeout_triggered
-                timeout_triggered = True
-                loop.quit()
-                return False  # Remove timeout
+            # Usar "any" para verificar contra TODAS las huellas del usuario de una vez
+            fprintd_device.VerifyStart("any")
             
-            try:
-                verification_result = False
-                
-                # Claim device para este usuario
-                fprintd_device.Claim(username)
-                
-                # Usar "any" para verificar contra TODAS las huellas del usuario de una vez
-                fprintd_device.VerifyStart("any")
-                
-                # Crear bucle de eventos LIMPIO
-                loop = GLib.MainLoop()
-                
-                # Timeout de 10 segundos (más tiempo)
-                timeout_id = GLib.timeout_add_seconds(10, timeout_callback)
-                
-                # USAR UN NUEVO BUS PARA EVITAR CALLBACKS ACUMULADOS
-                fresh_bus = SystemBus()
-                fresh_device = fresh_bus.get("net.reactivated.Fprint", device_path)
-                fresh_device.VerifyStatus.connect(on_verify_status_for_identification)
-                
-                loop.run()
-                
-                # Limpiar timeout de forma segura
-                if timeout_id and not timeout_triggered:
-                    try:
-                        GLib.source_remove(timeout_id)
-                    except:
-                        pass  # Timeout ya fue removido
-                timeout_id = None
-                
-                # Parar verificación
+            # Crear bucle de eventos LIMPIO
+            loop = GLib.MainLoop()
+            
+            # Timeout de 10 segundos (más tiempo)
+            timeout_id = GLib.timeout_add_seconds(10, timeout_callback)
+            
+            loop.run()
+            
+            # Limpiar timeout de forma segura
+            if timeout_id and not timeout_triggered:
                 try:
-                    fprintd_device.VerifyStop()
-                    fprintd_device.Release()
+                    GLib.source_remove(timeout_id)
                 except:
-                    pass
+                    pass  # Timeout ya fue removido
+            timeout_id = None
+            
+            # Parar verificación
+            try:
+                fprintd_device.VerifyStop()
+                fprintd_device.Release()
+            except:
+                pass
+            
+            if timeout_triggered:
+                print("   ⏰ Tiempo agotado - no se detectó huella")
+            elif verification_result:
+                # ¡Encontramos al usuario! Ahora identificar la huella específica
+                print(f"   ✅ ¡Usuario identificado: {username}!")
+                print(f"   🔍 Identificando huella específica...")
                 
-                if timeout_triggered:
-                    print("   ⏰ Tiempo agotado - no se detectó huella")
-                elif verification_result:
-                    # ¡Encontramos al usuario! Ahora identificar la huella específica
-                    print(f"   ✅ ¡Usuario identificado: {username}!")
-                    print(f"   🔍 Identificando huella específica...")
+                # Ahora verificar cada huella individual para saber cuál es
+                for finger in fingers:
+                    print(f"      🔄 Verificando si es: {finger}")
                     
-                    # Ahora verificar cada huella individual para saber cuál es
-                    for finger in fingers:
-                        print(f"      🔄 Verificando si es: {finger}")
+                    finger_timeout_id = None
+                    finger_timeout_triggered = False
+                    
+                    def finger_timeout_callback():
+                        nonlocal finger_timeout_triggered
+                        finger_timeout_triggered = True
+                        loop.quit()
+                        return False
+                    
+                    try:
+                        fprintd_device.Claim(username)
+                        fprintd_device.VerifyStart(finger)
                         
-                        finger_timeout_id = None
-                        finger_timeout_triggered = False
+                        loop = GLib.MainLoop()
+                        finger_timeout_id = GLib.timeout_add_seconds(5, finger_timeout_callback)
                         
-                        def finger_timeout_callback():
-                            nonlocal finger_timeout_triggered
-                            finger_timeout_triggered = True
-                            loop.quit()
-                            return False
+                        loop.run()
                         
-                        try:
-                            fprintd_device.Claim(username)
-                            fprintd_device.VerifyStart(finger)
-                            
-                            loop = GLib.MainLoop()
-                            finger_timeout_id = GLib.timeout_add_seconds(5, finger_timeout_callback)
-                            
-                            # Nuevo bus para esta verificación específica
-                            finger_bus = SystemBus()
-                            finger_device = finger_bus.get("net.reactivated.Fprint", device_path)
-                            finger_device.VerifyStatus.connect(on_verify_status_for_identification)
-                            
-                            loop.run()
-                            
-                            # Limpiar timeout de forma segura
-                            if finger_timeout_id and not finger_timeout_triggered:
-                                try:
-                                    GLib.source_remove(finger_timeout_id)
-                                except:
-                                    pass
-                            finger_timeout_id = None
-                            
+                        # Limpiar timeout de forma segura
+                        if finger_timeout_id and not finger_timeout_triggered:
                             try:
-                                fprintd_device.VerifyStop()
-                                fprintd_device.Release()
+                                GLib.source_remove(finger_timeout_id)
                             except:
                                 pass
+                        finger_timeout_id = None
+                        
+                        try:
+                            fprintd_device.VerifyStop()
+                            fprintd_device.Release()
+                        except:
+                            pass
+                        
+                        if finger_timeout_triggered:
+                            print("      ⏰ Timeout - continuando...")
+                            continue
+                        elif verification_result:
+                            label = get_fingerprint_label(username, finger)
                             
-                            if finger_timeout_triggered:
-                                print("      ⏰ Timeout - continuando...")
-                                continue
-                            elif verification_result:
-                                label = get_fingerprint_label(username, finger)
-                                
-                                print(f"\n" + "🎯"*30)
-                                print(f"🎉 ¡HUELLA COMPLETAMENTE IDENTIFICADA!")
-                                print(f"👤 Usuario: {username}")
-                                print(f"👆 Dedo: {finger}")
-                                print(f"🏷️  Etiqueta: {label}")
-                                print(f"⏱️  Proceso completado exitosamente")
-                                print(f"🎯"*30)
-                                
-                                return {
-                                    'username': username,
-                                    'finger': finger,
-                                    'label': label,
-                                    'success': True,
-                                    'method': 'smart_identification'
-                                }
+                            print(f"\n" + "🎯"*30)
+                            print(f"🎉 ¡HUELLA COMPLETAMENTE IDENTIFICADA!")
+                            print(f"👤 Usuario: {username}")
+                            print(f"👆 Dedo: {finger}")
+                            print(f"🏷️  Etiqueta: {label}")
+                            print(f"⏱️  Proceso completado exitosamente")
+                            print(f"🎯"*30)
                             
-                        except Exception as e:
-                            print(f"         ⚠️ Error: {e}")
-                            try:
-                                if finger_timeout_id:
-                                    GLib.source_remove(finger_timeout_id)
-                                fprintd_device.VerifyStop()
-                                fprintd_device.Release()
-                            except:
-                                pass
-                            continue
-                    
-                    # Si llegamos aquí, el usuario coincidió pero no pudimos identificar la huella específica
-                    print(f"   ⚠️ Se identificó el usuario {username} pero no la huella específica")
-                    return {
-                        'username': username,
-                        'finger': 'unknown',
-                        'label': 'Identificación parcial',
-                        'success': True,
-                        'method': 'partial_identification'
-                    }
-                else:
-                    print(f"   ❌ No coincide con {username}")
+                            return {
+                                'username': username,
+                                'finger': finger,
+                                'label': label,
+                                'success': True,
+                                'method': 'smart_identification'
+                            }
+                        
+                    except Exception as e:
+                        print(f"         ⚠️ Error: {e}")
+                        try:
+                            if finger_timeout_id:
+                                GLib.source_remove(finger_timeout_id)
+                            fprintd_device.VerifyStop()
+                            fprintd_device.Release()
+                        except:
+                            pass
+                        continue
                 
-            except Exception as e:
-                print(f"   ⚠️ Error verificando {username}: {e}")
-                try:
-                    if timeout_id:
-                        GLib.source_remove(timeout_id)
-                    fprintd_device.VerifyStop()
-                    fprintd_device.Release()
-                except:
-                    pass
-                continue
-        
-        print(f"\n" + "❌"*30)
-        print(f"❌ Tu huella no está registrada en el sistema")
-        print(f"📊 Se verificó contra {len(users_with_fingerprints)} usuarios")
-        print(f"❌"*30)
-        
-        return {
-            'username': None,
-            'finger': None,
-            'label': None,
-            'success': False,
-            'method': 'no_match'
-        }
-        
-    except Exception as e:
-        print(f"Error en identificación inteligente: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+                # Si llegamos aquí, el usuario coincidió pero no pudimos identificar la huella específica
+                print(f"   ⚠️ Se identificó el usuario {username} pero no la huella específica")
+                return {
+                    'username': username,
+                    'finger': 'unknown',
+                    'label': 'Identificación parcial',
+                    'success': True,
+                    'method': 'partial_identification'
+                }
+            else:
+                print(f"   ❌ No coincide con {username}")
+            
+        except Exception as e:
+            print(f"   ⚠️ Error verificando {username}: {e}")
+            try:
+                if timeout_id:
+                    GLib.source_remove(timeout_id)
+                fprintd_device.VerifyStop()
+                fprintd_device.Release()
+            except:
+                pass
+            continue
+    
+    print(f"\n" + "❌"*30)
+    print(f"❌ Tu huella no está registrada en el sistema")
+    print(f"📊 Se verificó contra {len(users_with_fingerprints)} usuarios")
+    print(f"❌"*30)
+    
+    return {
+        'username': None,
+        'finger': None,
+        'label': None,
+        'success': False,
+        'method': 'no_match'
+    }
 
 # También agregar la función que falta verify_with_label_identification
 def verify_with_label_identification(device, username):
@@ -1164,7 +1212,7 @@ try:
     # Cargar etiquetas al inicio
     load_fingerprints_labels()
     
-    bus = SystemBus()
+    bus = fprintd_bus()
     
     # Use ObjectManager to get all managed objects
     fprintd_root = bus.get("net.reactivated.Fprint", "/net/reactivated/Fprint")
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
+from services.device_scheduler import DeviceBusyError
+from services.capture_quality import LowQualityCaptureError
 from services.user_service import UserService
-from services.fingerprint_service import FingerprintService
-from models.fingerprint import Fingerprint
+from utils.helpers import get_terminal_id
 
 enrollment_bp = Blueprint('enrollment', __name__)
 
@@ -15,8 +16,8 @@ def enroll_fingerprint(username):
         
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Check if user exists
         user = user_service.get_user(username)
@@ -30,19 +31,14 @@ def enroll_fingerprint(username):
                 'suggestion': 'Try a different finger or delete the existing enrollment first'
             }), 409  # Conflict status code
         
-        # Simulate fingerprint enrollment
-        success = fingerprint_service.enroll_fingerprint(username, finger, label)
+        # En el lector de la terminal: fprintd guarda la huella solo en ese lector
+        success = fingerprint_service.enroll_fingerprint(
+            username, finger, label, terminal_id=get_terminal_id(data))
         
         if success:
             # Create fingerprint record in database
             try:
-                db_service = current_app.db_service
-                fingerprint_record = Fingerprint(
-                    user_id=user.id,
-                    finger=finger,
-                    label=label
-                )
-                db_service.add_fingerprint(fingerprint_record)
+                db_service.save_fingerprint(user.id, finger, label)
                 print(f"✅ Created fingerprint record in database: User {user.id}, Finger {finger}")
             except Exception as e:
                 print(f"⚠️ Warning: Could not create fingerprint record in database: {e}")
@@ -63,6 +59,10 @@ def enroll_fingerprint(username):
                 'error': 'Fingerprint enrollment failed'
             }), 500
             
+    except LowQualityCaptureError as e:
+        return jsonify({'error': str(e), 'reason': e.reason, 'retry': True}), 422
+    except DeviceBusyError as e:
+        return jsonify({'error': str(e), 'retry': True}), 503
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
@@ -86,24 +86,20 @@ def enroll_new_user():
         
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Create new user
         user = user_service.register_user(username, password)
         
-        # Enroll fingerprint
-        success = fingerprint_service.enroll_fingerprint(username, finger, label)
+        # En el lector de la terminal: fprintd guarda la huella solo en ese lector
+        success = fingerprint_service.enroll_fingerprint(
+            username, finger, label, terminal_id=get_terminal_id(data))
         
         if success:
             # Create fingerprint record in database
             try:
-                fingerprint_record = Fingerprint(
-                    user_id=user.id,
-                    finger=finger,
-                    label=label
-                )
-                db_service.add_fingerprint(fingerprint_record)
+                db_service.save_fingerprint(user.id, finger, label)
                 print(f"✅ Created fingerprint record in database: User {user.id}, Finger {finger}")
             except Exception as e:
                 print(f"⚠️ Warning: Could not create fingerprint record in database: {e}")
@@ -135,6 +131,10 @@ def enroll_new_user():
                 'error': "Scanner not connected"
             }), 201
             
+    except LowQualityCaptureError as e:
+        return jsonify({'error': str(e), 'reason': e.reason, 'retry': True}), 422
+    except DeviceBusyError as e:
+        return jsonify({'error': str(e), 'retry': True}), 503
     except ValueError as e:
         return jsonify({'error': str(e),'success': False,
                 'message': "Fingerprint enrollment failed",
@@ -150,8 +150,8 @@ def get_enrolled_fingers(username):
     try:
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Check if user exists
         user = user_service.get_user(username)
@@ -179,8 +179,8 @@ def delete_fingerprint(username, finger):
     try:
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Check if user exists
         user = user_service.get_user(username)
@@ -213,6 +213,8 @@ def delete_fingerprint(username, finger):
                 'error': f'Failed to delete fingerprint {finger} for user {username}'
             }), 500
             
+    except DeviceBusyError as e:
+        return jsonify({'error': str(e), 'retry': True}), 503
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
@@ -224,8 +226,8 @@ def delete_all_fingerprints(username):
     try:
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Check if user exists
         user = user_service.get_user(username)
@@ -255,6 +257,8 @@ def delete_all_fingerprints(username):
                 'error': f'Failed to delete all fingerprints for user {username}'
             }), 500
             
+    except DeviceBusyError as e:
+        return jsonify({'error': str(e), 'retry': True}), 503
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
@@ -266,8 +270,8 @@ def get_system_fingerprint_status():
     try:
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Get all users from database
         users = user_service.list_users()
@@ -281,6 +285,7 @@ def get_system_fingerprint_status():
         }
         
         finger_distribution = {}
+        labels = fingerprint_service.get_fingerprint_labels()
         
         for user in users:
             enrolled_fingers = fingerprint_service.get_enrolled_fingers(user.username)
@@ -297,7 +302,7 @@ def get_system_fingerprint_status():
                 system_status['total_enrolled_fingerprints'] += len(enrolled_fingers)
                 
                 for finger in enrolled_fingers:
-                    label = fingerprint_service.get_fingerprint_label(user.username, finger)
+                    label = labels.get((user.username, finger))
                     user_info['enrolled_fingers'].append({
                         'finger': finger,
                         'label': label or 'No label'
@@ -327,19 +332,20 @@ def search_fingerprint_by_finger(finger):
     try:
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Get all users from database
         users = user_service.list_users()
         
         users_with_finger = []
+        labels = fingerprint_service.get_fingerprint_labels(finger)
         
         for user in users:
             enrolled_fingers = fingerprint_service.get_enrolled_fingers(user.username)
             
             if finger in enrolled_fingers:
-                label = fingerprint_service.get_fingerprint_label(user.username, finger)
+                label = labels.get((user.username, finger))
                 users_with_finger.append({
                     'id': user.id,
                     'username': user.username,
@@ -363,62 +369,32 @@ def get_fingerprint_analytics():
     try:
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        fingerprint_service = current_app.fingerprint_service
         
-        # Get all users from database
-        users = user_service.list_users()
+        # Counts and label usage straight from the fingerprints table
+        totals = db_service.get_fingerprint_analytics()
+        total_users = totals['total_users']
         
         analytics = {
             'finger_popularity': {},
-            'label_usage': {},
+            'label_usage': totals['label_usage'],
             'user_patterns': {
-                'single_finger_users': 0,
-                'multi_finger_users': 0,
-                'no_finger_users': 0
+                'single_finger_users': totals['single_finger_users'],
+                'multi_finger_users': totals['multi_finger_users'],
+                'no_finger_users': totals['no_finger_users']
             },
             'recommendations': [],
             'security_insights': {}
         }
         
-        total_fingerprints = 0
-        users_with_labels = 0
-        fingerprints_with_labels = 0
-        
-        available_fingers = fingerprint_service.get_available_fingers()
+        total_fingerprints = totals['total_fingerprints']
+        users_with_labels = totals['users_with_labels']
+        fingerprints_with_labels = totals['fingerprints_with_labels']
         
-        # Initialize finger popularity
-        for finger in available_fingers:
+        # Every available finger appears, even with no enrollments
+        for finger in fingerprint_service.get_available_fingers():
             analytics['finger_popularity'][finger] = 0
-        
-        for user in users:
-            enrolled_fingers = fingerprint_service.get_enrolled_fingers(user.username)
-            user_has_labels = False
-            
-            if len(enrolled_fingers) == 0:
-                analytics['user_patterns']['no_finger_users'] += 1
-            elif len(enrolled_fingers) == 1:
-                analytics['user_patterns']['single_finger_users'] += 1
-            else:
-                analytics['user_patterns']['multi_finger_users'] += 1
-            
-            for finger in enrolled_fingers:
-                total_fingerprints += 1
-                analytics['finger_popularity'][finger] += 1
-                
-                label = fingerprint_service.get_fingerprint_label(user.username, finger)
-                if label:
-                    fingerprints_with_labels += 1
-                    user_has_labels = True
-                    
-                    # Count label usage
-                    if label in analytics['label_usage']:
-                        analytics['label_usage'][label] += 1
-                    else:
-                        analytics['label_usage'][label] = 1
-            
-            if user_has_labels:
-                users_with_labels += 1
+        analytics['finger_popularity'].update(totals['finger_counts'])
         
         # Generate recommendations
         recommendations = []
@@ -433,7 +409,7 @@ def get_fingerprint_analytics():
             })
         
         # Usability recommendations
-        if users_with_labels < len(users) * 0.5:
+        if users_with_labels < total_users * 0.5:
             recommendations.append({
                 'type': 'usability',
                 'priority': 'medium',
@@ -459,9 +435,9 @@ def get_fingerprint_analytics():
         # Security insights
         analytics['security_insights'] = {
             'total_fingerprints': total_fingerprints,
-            'backup_coverage': round((analytics['user_patterns']['multi_finger_users'] / max(len(users), 1)) * 100, 2),
+            'backup_coverage': round((analytics['user_patterns']['multi_finger_users'] / max(total_users, 1)) * 100, 2),
             'label_coverage': round((fingerprints_with_labels / max(total_fingerprints, 1)) * 100, 2),
-            'enrollment_rate': round(((len(users) - analytics['user_patterns']['no_finger_users']) / max(len(users), 1)) * 100, 2)
+            'enrollment_rate': round(((total_users - analytics['user_patterns']['no_finger_users']) / max(total_users, 1)) * 100, 2)
         }
         
         # Sort results
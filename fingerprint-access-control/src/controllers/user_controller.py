@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app
+from services.device_scheduler import DeviceBusyError
+from services.capture_quality import LowQualityCaptureError
 from models.user import User
 from services.user_service import UserService
-from services.fingerprint_service import FingerprintService
+from utils.helpers import get_terminal_id
 
 user_bp = Blueprint('users', __name__)
 
@@ -20,7 +22,7 @@ def create_user():
         
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
+        user_service = UserService(db_service, current_app.fingerprint_service)
         
         # Create new user
         user = user_service.register_user(username, password)
@@ -42,7 +44,7 @@ def create_user():
 def get_user(username):
     try:
         db_service = current_app.db_service
-        user_service = UserService(db_service)
+        user_service = UserService(db_service, current_app.fingerprint_service)
         
         user = user_service.get_user(username)
         
@@ -67,7 +69,7 @@ def get_user(username):
 def delete_user(username):
     try:
         db_service = current_app.db_service
-        user_service = UserService(db_service)
+        user_service = UserService(db_service, current_app.fingerprint_service)
         
         user_service.delete_user(username)
         
@@ -82,7 +84,7 @@ def delete_user(username):
 def list_users():
     try:
         db_service = current_app.db_service
-        user_service = UserService(db_service)
+        user_service = UserService(db_service, current_app.fingerprint_service)
         
         users = user_service.list_users()
         
@@ -115,14 +117,15 @@ def verify_user_fingerprint(username):
         finger = data.get('finger') if data else None
         
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Check if user exists
         user = user_service.get_user(username)
         
         # Simulate fingerprint verification
-        verification_result = fingerprint_service.verify_fingerprint(username, finger)
+        verification_result = fingerprint_service.verify_fingerprint(
+            username, finger, terminal_id=get_terminal_id(data))
         
         if verification_result:
             return jsonify({
@@ -139,6 +142,10 @@ def verify_user_fingerprint(username):
                 'verified': False
             }), 401
             
+    except LowQualityCaptureError as e:
+        return jsonify({'error': str(e), 'reason': e.reason, 'retry': True}), 422
+    except DeviceBusyError as e:
+        return jsonify({'error': str(e), 'retry': True}), 503
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
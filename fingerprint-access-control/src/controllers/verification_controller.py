@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
+from services.device_scheduler import DeviceBusyError
+from services.capture_quality import LowQualityCaptureError
 from services.user_service import UserService
-from services.fingerprint_service import FingerprintService
+from utils.helpers import get_terminal_id
 
 verification_bp = Blueprint('verification', __name__)
 
@@ -10,8 +12,8 @@ def verify_fingerprint():
     try:
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Get all users from our database
         users = user_service.list_users()
@@ -27,7 +29,6 @@ def verify_fingerprint():
         usernames = [user.username for user in users]
         
         # Get fingerprint statistics for better reporting
-        fingerprint_service = FingerprintService()
         total_fingerprints = 0
         for username in usernames:
             enrolled_fingers = fingerprint_service.get_enrolled_fingers(username)
@@ -36,8 +37,14 @@ def verify_fingerprint():
         print(f"🔍 Starting fingerprint identification for users: {usernames}")
         print(f"📊 Total enrolled fingerprints in system: {total_fingerprints}")
         
+        # Door/site group: the terminal's group, or the 'group' field for terminals without one
+        data = request.get_json(silent=True) or {}
+        terminal_id = get_terminal_id(data)
+        group = fingerprint_service.candidates.resolve_group(data.get('group'), terminal_id)
+        
         # Use identify_user_smart for optimized identification
-        identified_username = fingerprint_service.identify_user_smart(usernames)
+        identified_username = fingerprint_service.identify_user_smart(
+            usernames, group, terminal_id=terminal_id)
         
         if identified_username:
             # Find the user object for the identified username
@@ -84,6 +91,10 @@ def verify_fingerprint():
                 }
             }), 401
             
+    except LowQualityCaptureError as e:
+        return jsonify({'error': str(e), 'reason': e.reason, 'retry': True}), 422
+    except DeviceBusyError as e:
+        return jsonify({'error': str(e), 'retry': True}), 503
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
@@ -96,14 +107,15 @@ def verify_user_fingerprint(username):
         
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
-        fingerprint_service = FingerprintService()
+        user_service = UserService(db_service, current_app.fingerprint_service)
+        fingerprint_service = current_app.fingerprint_service
         
         # Check if user exists
         user = user_service.get_user(username)
         
         # Verify fingerprint for this specific user
-        success = fingerprint_service.verify_fingerprint(username, finger)
+        success = fingerprint_service.verify_fingerprint(
+            username, finger, terminal_id=get_terminal_id(data))
         
         if success:
             return jsonify({
@@ -122,6 +134,10 @@ def verify_user_fingerprint(username):
                 'access_granted': False
             }), 401
             
+    except LowQualityCaptureError as e:
+        return jsonify({'error': str(e), 'reason': e.reason, 'retry': True}), 422
+    except DeviceBusyError as e:
+        return jsonify({'error': str(e), 'retry': True}), 503
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
@@ -143,7 +159,7 @@ def simulate_verification():
         
         # Get db_service from app context
         db_service = current_app.db_service
-        user_service = UserService(db_service)
+        user_service = UserService(db_service, current_app.fingerprint_service)
         
         # Check if user exists
         user = user_service.get_user(username)
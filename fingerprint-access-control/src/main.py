@@ -4,19 +4,33 @@ from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from services.database_service import DatabaseService
+from services.device_pool import DevicePool
+from services.fingerprint_service import FingerprintService
+from services.simulated_reader import SimulatedReader
+from utils.config import (
+    ENROLLED_INDEX_REFRESH_INTERVAL, READER_TERMINALS, READER_RESCAN_INTERVAL, LEGACY_LABELS_FILE,
+    SIMULATED_LATENCY_MS, SIMULATED_LATENCY_JITTER_MS, SIMULATED_LATENCY_DISTRIBUTION,
+    SIMULATED_DEFAULT_MATCH, SIMULATED_SEED, FINGERPRINT_BACKEND
+)
+from utils.helpers import get_simulated_identity
 from controllers.enrollment_controller import enrollment_bp
 from controllers.verification_controller import verification_bp
 from controllers.user_controller import user_bp
 
 def create_app():
     app = Flask(__name__)
+    # Requests may only say who touches the reader when the simulator was chosen explicitly
+    simulated = FINGERPRINT_BACKEND == "simulated"
+    allow_headers = ["Content-Type", "Authorization", "X-Requested-With", "X-Terminal-ID"]
+    if simulated:
+        allow_headers.append("X-Simulated-Identity")
     
     # Enable CORS for all routes and origins
     CORS(app, resources={
         r"/api/*": {
             "origins": "*",
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"],
+            "allow_headers": allow_headers,
             "supports_credentials": True
         }
     })
@@ -34,6 +48,29 @@ def create_app():
     # Store db_service in app context for controllers to access
     app.db_service = db_service
     
+    # Labels used to live in fingerprints_labels.json; move them into the database once
+    try:
+        imported, skipped = db_service.import_labels_from_json(LEGACY_LABELS_FILE)
+        if imported or skipped:
+            print(f"📥 Imported {imported} fingerprint labels from {LEGACY_LABELS_FILE} ({skipped} for unknown users)")
+    except Exception as e:
+        print(f"⚠️ Could not import {LEGACY_LABELS_FILE}: {e}")
+    
+    # One session per fprintd reader, shared by every controller
+    app.device_pool = DevicePool(terminals=READER_TERMINALS, rescan_interval=READER_RESCAN_INTERVAL).start()
+    # Without readers the service falls back to a simulated reader; only with
+    # FINGERPRINT_BACKEND=simulated does the request say who is touching it
+    simulator = SimulatedReader(
+        SIMULATED_LATENCY_MS, SIMULATED_LATENCY_JITTER_MS, SIMULATED_LATENCY_DISTRIBUTION,
+        SIMULATED_DEFAULT_MATCH, SIMULATED_SEED, oracle=get_simulated_identity if simulated else None)
+    app.fingerprint_service = FingerprintService(app.device_pool, db_service, simulator)
+    
+    # Enrolled-fingers index: bulk fill now, background refresh for external changes
+    def list_usernames():
+        return [user.username for user in db_service.get_all_users()]
+    app.fingerprint_service.warm_enrolled_index(list_usernames())
+    app.fingerprint_service.start_enrolled_index_refresh(list_usernames, ENROLLED_INDEX_REFRESH_INTERVAL)
+    
     # Register blueprints
     app.register_blueprint(enrollment_bp, url_prefix='/api/enrollment')
     app.register_blueprint(verification_bp, url_prefix='/api/verification')
@@ -44,7 +81,12 @@ def create_app():
     def health_check():
         return jsonify({
             'status': 'healthy',
-            'message': 'Fingerprint Access Control API is running'
+            'message': 'Fingerprint Access Control API is running',
+            'fingerprint_readers': app.device_pool.stats(),
+            'last_enrolled_fingers_scan': app.fingerprint_service.last_bulk_scan,
+            'fingerprint_backend': app.fingerprint_service.backend.describe(),
+            'simulated_reader': (app.fingerprint_service.simulator.stats()
+                                 if app.fingerprint_service.backend is app.fingerprint_service.simulator else None)
         }), 200
     
     # Handle preflight OPTIONS requests manually for better debugging
@@ -55,7 +97,7 @@ def create_app():
             print(f"📡 CORS Preflight request to {request.path}")
             response = jsonify({'status': 'ok'})
             response.headers.add("Access-Control-Allow-Origin", "*")
-            response.headers.add('Access-Control-Allow-Headers', "Content-Type,Authorization,X-Requested-With")
+            response.headers.add('Access-Control-Allow-Headers', ",".join(allow_headers))
             response.headers.add('Access-Control-Allow-Methods', "GET,PUT,POST,DELETE,OPTIONS")
             return response
     
@@ -1,15 +1,18 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Fingerprint(Base):
     __tablename__ = 'fingerprints'
+    __table_args__ = (
+        Index('ix_fingerprints_user_finger', 'user_id', 'finger'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     finger = Column(String(50), nullable=False)  # e.g., "right-index-finger"
     label = Column(String(100), nullable=True)   # Optional label
-    template_data = Column(String, nullable=True)  # Could be empty for fprintd-managed prints
+    template_data = Column(LargeBinary, nullable=True)  # Compact binary template; empty for fprintd-managed prints
     
     # Relationship with user
     user = relationship("User", back_populates="fingerprints")
@@ -18,7 +21,7 @@ class Fingerprint(Base):
         self.user_id = user_id
         self.finger = finger
         self.label = label
-        self.template_data = template_data or f"fprintd://{finger}"
+        self.template_data = template_data
     
     def __repr__(self):
         return f'<Fingerprint {self.id}: {self.finger}>'
\ No newline at end of file
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer
+from database import Base
+
+class SchemaVersion(Base):
+    """Versión del esquema de la base; una sola fila, la usan las migraciones de create_tables"""
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True)
+
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
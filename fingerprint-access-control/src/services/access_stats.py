@@ -0,0 +1,139 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_TERMINAL = "default"
+
+
+class AccessStatsStore:
+    """Estadísticas de accesos aceptados por terminal, guardadas en un JSON pequeño.
+
+    Por cada terminal y usuario guarda un puntaje de frecuencia que decae con
+    el tiempo (vida media configurable), la fecha del último acceso y cuántas
+    veces se aceptó cada dedo. Sirve para probar primero a los habituales de
+    cada puerta en la verificación secuencial.
+
+    Los accesos solo marcan el archivo como pendiente; un hilo lo escribe cada
+    flush_interval segundos y al salir del proceso (0 escribe en cada acceso).
+    """
+
+    def __init__(self, path="access_stats.json", half_life_days=14, flush_interval=30):
+        self.path = path
+        self.half_life = half_life_days * 86400
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._terminals = {}
+        self._dirty = False
+        self._flush_thread = None
+        self._stop_flush = threading.Event()
+        self.load()
+        atexit.register(self.close)
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._terminals = json.load(f).get('terminals', {})
+                print(f"✅ Loaded access statistics for {len(self._terminals)} terminals")
+        except Exception as e:
+            print(f"⚠️ Error loading access statistics: {e}")
+            self._terminals = {}
+
+    def save(self):
+        """Escribir a un temporal propio y renombrar, para no dejar el archivo a medias"""
+        with self._lock:
+            self._dirty = False
+            data = json.dumps({'terminals': self._terminals}, indent=2, ensure_ascii=False)
+            tmp_path = None
+            try:
+                # Bajo el lock y con nombre único: dos guardados no comparten el temporal
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', delete=False,
+                                                 dir=os.path.dirname(os.path.abspath(self.path)),
+                                                 prefix=f".{os.path.basename(self.path)}.") as f:
+                    tmp_path = f.name
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                self._dirty = True
+                print(f"⚠️ Error saving access statistics: {e}")
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    def flush(self):
+        """Guardar solo si hubo accesos desde el último guardado"""
+        if self._dirty:
+            self.save()
+
+    def close(self):
+        self._stop_flush.set()
+        self._flush_thread = None
+        self.flush()
+
+    def record(self, terminal_id, username, finger=None, now=None):
+        """Registrar un acceso aceptado de username (con finger, si se conoce)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            users = self._terminals.setdefault(self._key(terminal_id), {})
+            entry = users.setdefault(username, {'score': 0.0, 'last_seen': now, 'fingers': {}})
+            entry['score'] = self._decayed(entry, now) + 1.0
+            entry['last_seen'] = now
+            if finger:
+                entry['fingers'][finger] = entry['fingers'].get(finger, 0) + 1
+            self._dirty = True
+        if not self.flush_interval:
+            self.save()
+        elif self._flush_thread is None:
+            self._start_flush()
+
+    def score(self, terminal_id, username, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._terminals.get(self._key(terminal_id), {}).get(username)
+            return self._decayed(entry, now) if entry else 0.0
+
+    def rank(self, terminal_id, usernames, now=None):
+        """Usuarios ordenados del más probable al menos probable en esa terminal"""
+        now = time.time() if now is None else now
+        with self._lock:
+            users = self._terminals.get(self._key(terminal_id), {})
+            scores = {username: self._decayed(users[username], now)
+                      for username in usernames if username in users}
+        # sorted es estable: los que no tienen historial conservan su orden
+        return sorted(usernames, key=lambda username: -scores.get(username, 0.0))
+
+    def order_fingers(self, terminal_id, username, fingers):
+        """Dedos del usuario, el más usado en esa terminal primero"""
+        with self._lock:
+            entry = self._terminals.get(self._key(terminal_id), {}).get(username)
+            counts = dict(entry['fingers']) if entry else {}
+        return sorted(fingers, key=lambda finger: -counts.get(finger, 0))
+
+    def stats(self):
+        with self._lock:
+            return {terminal: len(users) for terminal, users in self._terminals.items()}
+
+    def _start_flush(self):
+        with self._lock:
+            if self._flush_thread is not None:
+                return
+            self._stop_flush.clear()
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name="access-stats-flush", daemon=True)
+            self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._stop_flush.wait(self.flush_interval):
+            self.flush()
+
+    @staticmethod
+    def _key(terminal_id):
+        return DEFAULT_TERMINAL if terminal_id is None else str(terminal_id)
+
+    def _decayed(self, entry, now):
+        if not self.half_life:
+            return entry['score']
+        elapsed = max(now - entry['last_seen'], 0)
+        return entry['score'] * 0.5 ** (elapsed / self.half_life)
@@ -0,0 +1,56 @@
+class CandidateSetBuilder:
+    """Arma el conjunto de candidatos para una identificación.
+
+    Descarta a los usuarios sin huellas enrolladas, opcionalmente restringe el
+    conjunto al grupo de acceso de la puerta o sitio, y lo divide en bloques
+    del tamaño máximo que el lector acepta en una sola identificación.
+    """
+
+    def __init__(self, fingers_for, groups=None, terminal_groups=None, chunk_size=0):
+        # fingers_for(username) -> lista de dedos enrollados (normalmente el índice)
+        self._fingers_for = fingers_for
+        # grupo -> usuarios con acceso, p. ej. {"lab": ["alice", "bob"]}
+        self.groups = {name: set(members) for name, members in (groups or {}).items()}
+        # terminal_id -> grupo de la puerta donde está la terminal
+        self.terminal_groups = dict(terminal_groups or {})
+        self.chunk_size = chunk_size
+
+    def resolve_group(self, group=None, terminal_id=None):
+        """Grupo asignado a la terminal o, si no tiene, el pedido; el cliente no puede ampliarlo"""
+        if terminal_id is not None:
+            terminal_group = self.terminal_groups.get(str(terminal_id))
+            if terminal_group is not None:
+                if group is not None and group != terminal_group:
+                    print(f"⚠️ Terminal {terminal_id} belongs to group '{terminal_group}', ignoring '{group}'")
+                return terminal_group
+        return group
+
+    def build(self, usernames, group=None, terminal_id=None):
+        """Usuarios con huellas enrolladas, en el orden recibido y sin duplicados"""
+        group = self.resolve_group(group, terminal_id)
+        members = None
+        if group is not None:
+            members = self.groups.get(group)
+            if members is None:
+                # Un filtro de acceso que no se puede aplicar no deja pasar a nadie
+                print(f"⚠️ Unknown access group '{group}', no candidates")
+                return []
+
+        candidates = []
+        seen = set()
+        for username in usernames or []:
+            if username in seen:
+                continue
+            seen.add(username)
+            if members is not None and username not in members:
+                continue
+            if self._fingers_for(username):
+                candidates.append(username)
+        return candidates
+
+    def chunks(self, candidates, chunk_size=None):
+        """Dividir los candidatos en bloques que el lector pueda identificar de una vez"""
+        chunk_size = self.chunk_size if chunk_size is None else chunk_size
+        if not chunk_size or chunk_size <= 0:
+            return [list(candidates)] if candidates else []
+        return [list(candidates[i:i + chunk_size]) for i in range(0, len(candidates), chunk_size)]
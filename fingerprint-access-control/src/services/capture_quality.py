@@ -0,0 +1,44 @@
+"""Corte temprano de las operaciones cuyo lector solo devuelve capturas malas"""
+
+# Estados de fprintd (sin el prefijo enroll-/verify-/identify-) que rechazan la captura
+POOR_CAPTURE_STATUSES = ("retry-scan", "swipe-too-short", "finger-not-centered", "remove-and-retry")
+
+
+def poor_capture_reason(status):
+    """Código del motivo ('retry_scan', 'swipe_too_short', ...) o None si la captura sirvió"""
+    _, _, suffix = status.partition("-")
+    return suffix.replace("-", "_") if suffix in POOR_CAPTURE_STATUSES else None
+
+
+class LowQualityCaptureError(Exception):
+    """El lector rechazó demasiadas capturas seguidas por mala calidad"""
+
+    def __init__(self, reason, captures):
+        super().__init__(f"Fingerprint capture rejected {captures} times in a row ({reason})")
+        self.reason = reason
+        self.captures = captures
+
+
+class CaptureQualityGate:
+    """Cuenta las capturas malas seguidas de una operación del lector.
+
+    fprintd sigue pidiendo el dedo después de cada captura mala hasta que vence
+    el timeout de la operación. Con limit > 0, la operación se corta en cuanto
+    el lector rechaza limit capturas seguidas; una captura buena reinicia la
+    cuenta.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.rejected = 0
+
+    def observe(self, status):
+        """Registrar un estado del lector; devuelve el error si hay que cortar la operación"""
+        reason = poor_capture_reason(status)
+        if reason is None:
+            self.rejected = 0
+            return None
+        self.rejected += 1
+        if self.limit and self.rejected >= self.limit:
+            return LowQualityCaptureError(reason, self.rejected)
+        return None
@@ -1,9 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, case, text
 from sqlalchemy.orm import sessionmaker, joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from database import Base
 from models.user import User
 from models.fingerprint import Fingerprint
+from models.schema_version import SchemaVersion
+import json
+import os
+
+# 1: template_data guardaba el texto "fprintd://<dedo>"
+# 2: template_data binaria, vacía en las huellas que gestiona fprintd
+SCHEMA_VERSION = 2
+LEGACY_TEMPLATE_PREFIX = "fprintd://"
 
 class DatabaseService:
     def __init__(self, db_url):
@@ -12,6 +20,39 @@ class DatabaseService:
 
     def create_tables(self):
         Base.metadata.create_all(self.engine)
+        # create_all no agrega índices nuevos a tablas que ya existían
+        for index in Fingerprint.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        self.migrate()
+
+    def migrate(self):
+        """Aplicar una sola vez las migraciones pendientes y anotar la versión del esquema"""
+        with self.engine.begin() as connection:
+            version = connection.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+            # Una base sin versión viene de antes de las migraciones (versión 1)
+            version = version or 1
+            if version < 2:
+                self._clear_legacy_template_references(connection)
+            if version < SCHEMA_VERSION:
+                connection.execute(text("DELETE FROM schema_version"))
+                connection.execute(text("INSERT INTO schema_version (version) VALUES (:version)"),
+                                   {'version': SCHEMA_VERSION})
+                print(f"🗄️ Database schema migrated from version {version} to {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _clear_legacy_template_references(connection):
+        """Vaciar template_data de las huellas de fprintd que guardaban "fprintd://<dedo>".
+
+        Se compara en Python: LIKE sobre una columna binaria depende del motor.
+        """
+        rows = connection.execute(text(
+            "SELECT id, template_data FROM fingerprints WHERE template_data IS NOT NULL"))
+        prefix = LEGACY_TEMPLATE_PREFIX.encode()
+        legacy = [row_id for row_id, data in rows
+                  if (data.encode() if isinstance(data, str) else bytes(data)).startswith(prefix)]
+        for row_id in legacy:
+            connection.execute(text("UPDATE fingerprints SET template_data = NULL WHERE id = :id"),
+                               {'id': row_id})
 
     def add_user(self, user):
         session = self.Session()
@@ -135,6 +176,195 @@ class DatabaseService:
         finally:
             session.close()
 
+    def save_fingerprint(self, user_id, finger, label=None):
+        """Create the fingerprint record, or update its label if it already exists"""
+        session = self.Session()
+        try:
+            fingerprint = session.query(Fingerprint).filter(
+                Fingerprint.user_id == user_id, Fingerprint.finger == finger).first()
+            if fingerprint is None:
+                session.add(Fingerprint(user_id=user_id, finger=finger, label=label))
+            elif label is not None:
+                fingerprint.label = label
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"Error saving fingerprint: {e}")
+            raise
+        finally:
+            session.close()
+
+    def set_fingerprint_label(self, username, finger, label):
+        """Set the label of a user's finger, creating the record if needed"""
+        session = self.Session()
+        try:
+            user_id = session.query(User.id).filter(User.username == username).scalar()
+            if user_id is None:
+                return False
+            fingerprint = session.query(Fingerprint).filter(
+                Fingerprint.user_id == user_id, Fingerprint.finger == finger).first()
+            if fingerprint is None:
+                session.add(Fingerprint(user_id=user_id, finger=finger, label=label))
+            else:
+                fingerprint.label = label
+            session.commit()
+            return True
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"Error saving fingerprint label: {e}")
+            raise
+        finally:
+            session.close()
+
+    def clear_fingerprint_labels(self, username, finger=None):
+        """Remove the labels of one finger, or of every finger of the user"""
+        session = self.Session()
+        try:
+            user_ids = session.query(User.id).filter(User.username == username)
+            query = session.query(Fingerprint).filter(
+                Fingerprint.user_id.in_(user_ids.scalar_subquery()), Fingerprint.label.isnot(None))
+            if finger is not None:
+                query = query.filter(Fingerprint.finger == finger)
+            cleared = query.update({Fingerprint.label: None}, synchronize_session=False)
+            session.commit()
+            return cleared
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"Error removing fingerprint labels: {e}")
+            raise
+        finally:
+            session.close()
+
+    def get_fingerprint_label(self, username, finger):
+        session = self.Session()
+        try:
+            return session.query(Fingerprint.label).join(User).filter(
+                User.username == username, Fingerprint.finger == finger).scalar()
+        except SQLAlchemyError as e:
+            print(f"Error retrieving fingerprint label: {e}")
+            return None
+        finally:
+            session.close()
+
+    def get_fingerprint_labels(self, finger=None):
+        """All labels in one query, as {(username, finger): label}"""
+        session = self.Session()
+        try:
+            query = session.query(User.username, Fingerprint.finger, Fingerprint.label).join(
+                Fingerprint.user).filter(Fingerprint.label.isnot(None))
+            if finger is not None:
+                query = query.filter(Fingerprint.finger == finger)
+            return {(username, finger): label for username, finger, label in query}
+        except SQLAlchemyError as e:
+            print(f"Error retrieving fingerprint labels: {e}")
+            return {}
+        finally:
+            session.close()
+
+    def get_fingerprint_analytics(self):
+        """Fingerprint counts and label usage computed with aggregate queries"""
+        session = self.Session()
+        try:
+            finger_counts = dict(session.query(Fingerprint.finger, func.count(Fingerprint.id))
+                                 .group_by(Fingerprint.finger).all())
+            label_usage = dict(session.query(Fingerprint.label, func.count(Fingerprint.id))
+                               .filter(Fingerprint.label.isnot(None))
+                               .group_by(Fingerprint.label).all())
+
+            # Dedos por usuario, incluidos los usuarios sin ninguno
+            per_user = (session.query(User.id.label('user_id'),
+                                      func.count(Fingerprint.id).label('fingers'),
+                                      func.count(Fingerprint.label).label('labels'))
+                        .outerjoin(Fingerprint, Fingerprint.user_id == User.id)
+                        .group_by(User.id).subquery())
+            totals = session.query(
+                func.count(per_user.c.user_id),
+                func.coalesce(func.sum(per_user.c.fingers), 0),
+                func.coalesce(func.sum(per_user.c.labels), 0),
+                func.coalesce(func.sum(case((per_user.c.fingers == 0, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((per_user.c.fingers == 1, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((per_user.c.fingers > 1, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((per_user.c.labels > 0, 1), else_=0)), 0),
+            ).one()
+
+            return {
+                'finger_counts': finger_counts,
+                'label_usage': label_usage,
+                'total_users': totals[0],
+                'total_fingerprints': totals[1],
+                'fingerprints_with_labels': totals[2],
+                'no_finger_users': totals[3],
+                'single_finger_users': totals[4],
+                'multi_finger_users': totals[5],
+                'users_with_labels': totals[6],
+            }
+        except SQLAlchemyError as e:
+            print(f"Error computing fingerprint analytics: {e}")
+            raise
+        finally:
+            session.close()
+
+    def import_labels_from_json(self, path):
+        """One-time import of the old fingerprints_labels.json (and its journal) into the fingerprints table"""
+        labels = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    labels[(item['username'], item['finger'])] = item['label']
+        journal_path = f"{path}.journal"
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if entry['op'] == 'set':
+                        labels[(entry['username'], entry['finger'])] = entry['label']
+                    elif entry['op'] == 'delete':
+                        labels.pop((entry['username'], entry['finger']), None)
+                    elif entry['op'] == 'delete_user':
+                        labels = {key: label for key, label in labels.items() if key[0] != entry['username']}
+
+        session = self.Session()
+        try:
+            user_ids = dict(session.query(User.username, User.id).filter(
+                User.username.in_({username for username, _ in labels})).all()) if labels else {}
+            existing = {(fp.user_id, fp.finger): fp for fp in session.query(Fingerprint).filter(
+                Fingerprint.user_id.in_(list(user_ids.values())))} if user_ids else {}
+            imported = skipped = 0
+            for (username, finger), label in labels.items():
+                user_id = user_ids.get(username)
+                if user_id is None:
+                    skipped += 1
+                    continue
+                fingerprint = existing.get((user_id, finger))
+                if fingerprint is None:
+                    fingerprint = Fingerprint(user_id=user_id, finger=finger, label=label)
+                    session.add(fingerprint)
+                    existing[(user_id, finger)] = fingerprint
+                elif not fingerprint.label:
+                    fingerprint.label = label
+                imported += 1
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            print(f"Error importing fingerprint labels: {e}")
+            raise
+        finally:
+            session.close()
+
+        # Con etiquetas de usuarios que todavía no existen el archivo se queda: el
+        # próximo arranque las vuelve a intentar (lo ya importado no se pisa).
+        # Si no, se renombra para no volver a importarlo
+        if skipped:
+            print(f"⚠️ Keeping {path}: {skipped} labels belong to unknown users")
+            return imported, skipped
+        for old_path in (path, journal_path):
+            if os.path.exists(old_path):
+                os.replace(old_path, f"{old_path}.imported")
+        return imported, skipped
+
     def close(self):
         if hasattr(self, 'engine'):
             self.engine.dispose()
\ No newline at end of file
@@ -0,0 +1,192 @@
+from services.device_session import (
+    DeviceSession, fprintd_bus, list_device_paths, FPRINTD_BUS_NAME, FPRINTD_MANAGER_PATH
+)
+from services.glib_loop import get_main_loop
+from services.signal_registry import SignalRegistry
+import itertools
+import threading
+
+
+class DevicePool:
+    """Todos los lectores net.reactivated.Fprint.Device del host.
+
+    Cada lector tiene su propia DeviceSession (y por lo tanto su propia cola).
+    Las operaciones se envían al lector asignado a una terminal o, si no hay
+    asignación, al lector más desocupado; como fprintd guarda las huellas en
+    cada lector, una verificación se limita a los lectores que tienen las
+    huellas del usuario. Los lectores conectados o quitados en
+    caliente se detectan por InterfacesAdded/InterfacesRemoved y por un
+    re-escaneo periódico.
+    """
+
+    def __init__(self, bus_factory=fprintd_bus, terminals=None, rescan_interval=0):
+        self._bus_factory = bus_factory
+        self._lock = threading.RLock()
+        self._sessions = {}
+        self._round_robin = itertools.count()
+        self._watches = []
+        self._rescan_stop = threading.Event()
+        self._rescan_thread = None
+        self.bus = None
+        self.signals = SignalRegistry()
+        # terminal_id -> ruta D-Bus del lector (o su número, p. ej. "0")
+        self.terminals = dict(terminals or {})
+        self.rescan_interval = rescan_interval
+
+    def discover(self):
+        """Escanear fprintd: agregar lectores nuevos y cerrar los que desaparecieron"""
+        with self._lock:
+            if self.bus is None:
+                get_main_loop()
+                self.bus = self._bus_factory()
+                self._watch_hotplug()
+            paths = list_device_paths(self.bus)
+
+            for path in paths:
+                if path in self._sessions:
+                    continue
+                session = DeviceSession(lambda: self.bus, self.signals, device_path=path)
+                try:
+                    session.connect()
+                except Exception as e:
+                    print(f"⚠️ Could not open fingerprint reader {path}: {e}")
+                    continue
+                self._sessions[path] = session
+                print(f"➕ Fingerprint reader added: {path}")
+
+            for path in [p for p in self._sessions if p not in paths]:
+                self._sessions.pop(path).close()
+                print(f"➖ Fingerprint reader removed: {path}")
+
+            return list(self._sessions)
+
+    def start(self):
+        """Descubrir lectores y arrancar el re-escaneo periódico; no falla si fprintd no está"""
+        try:
+            self.discover()
+        except Exception as e:
+            print(f"⚠️ Fingerprint readers not available: {e}")
+        if self.rescan_interval and self._rescan_thread is None:
+            self._rescan_thread = threading.Thread(
+                target=self._rescan_loop, name="fprintd-reader-rescan", daemon=True)
+            self._rescan_thread.start()
+        return self
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def primary(self):
+        """Primer lector, para consultas que no reclaman el dispositivo"""
+        sessions = self.sessions()
+        if not sessions:
+            raise Exception("No fingerprint devices found!")
+        return sessions[0]
+
+    def session_at(self, device_path):
+        """Sesión del lector con esa ruta D-Bus"""
+        with self._lock:
+            session = self._sessions.get(device_path)
+        if session is None:
+            raise Exception(f"Fingerprint reader {device_path} is not connected")
+        return session
+
+    def device_paths(self):
+        with self._lock:
+            return list(self._sessions)
+
+    def select(self, terminal_id=None, device_paths=None):
+        """Lector asignado a la terminal o, si no hay, el más desocupado.
+
+        Con device_paths (p. ej. los lectores con las huellas del usuario) el
+        más desocupado se elige entre ellos, si alguno está conectado.
+        """
+        sessions = self.sessions()
+        if not sessions:
+            raise Exception("No fingerprint devices found!")
+
+        if terminal_id is not None:
+            session = self._session_for_terminal(str(terminal_id))
+            if session is not None:
+                return session
+            print(f"⚠️ Terminal {terminal_id} has no reader assigned, using any idle reader")
+
+        if device_paths is not None:
+            sessions = [session for session in sessions if session.device_path in device_paths] or sessions
+        # Menor carga primero; round robin entre lectores igual de desocupados
+        offset = next(self._round_robin) % len(sessions)
+        rotated = sessions[offset:] + sessions[:offset]
+        return min(rotated, key=lambda session: session.scheduler.load())
+
+    def session_for_current_thread(self):
+        """Sesión cuyo trabajador está ejecutando el hilo actual (operaciones anidadas)"""
+        for session in self.sessions():
+            if session.scheduler.is_worker_thread():
+                return session
+        return None
+
+    def stats(self):
+        readers = []
+        for session in self.sessions():
+            readers.append({
+                'device_path': session.device_path,
+                'terminals': [t for t, target in self.terminals.items()
+                              if self._matches(session.device_path, target)],
+                'connected': session.connected,
+                'queue': session.scheduler.stats(),
+            })
+        return {
+            'readers_count': len(readers),
+            'readers': readers,
+            'signal_subscriptions': self.signals.stats(),
+        }
+
+    def close(self):
+        self._rescan_stop.set()
+        for watch in self._watches:
+            try:
+                watch.disconnect()
+            except Exception:
+                pass
+        self._watches = []
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    def _session_for_terminal(self, terminal_id):
+        target = self.terminals.get(terminal_id)
+        if target is None:
+            return None
+        for session in self.sessions():
+            if self._matches(session.device_path, target):
+                return session
+        return None
+
+    @staticmethod
+    def _matches(device_path, target):
+        target = str(target)
+        return device_path == target or device_path.rsplit('/', 1)[-1] == target
+
+    def _watch_hotplug(self):
+        for signal_name in ("InterfacesAdded", "InterfacesRemoved"):
+            try:
+                self._watches.append(self.bus.subscribe(
+                    sender=FPRINTD_BUS_NAME,
+                    iface="org.freedesktop.DBus.ObjectManager",
+                    signal=signal_name,
+                    object=FPRINTD_MANAGER_PATH,
+                    signal_fired=self._on_hotplug,
+                ))
+            except Exception as e:
+                print(f"⚠️ Could not watch fingerprint reader hot-plug: {e}")
+
+    def _on_hotplug(self, *args):
+        try:
+            self.discover()
+        except Exception as e:
+            print(f"⚠️ Error rescanning fingerprint readers: {e}")
+
+    def _rescan_loop(self):
+        while not self._rescan_stop.wait(self.rescan_interval):
+            self._on_hotplug()
@@ -0,0 +1,265 @@
+from concurrent.futures import Future, InvalidStateError
+import heapq
+import itertools
+import threading
+import time
+
+# Prioridades: número menor = se atiende antes
+PRIORITY_VERIFY = 0
+PRIORITY_IDENTIFY = 0
+PRIORITY_ENROLL = 10
+PRIORITY_DELETE = 10
+
+
+class DeviceBusyError(Exception):
+    """El lector no pudo atender la operación a tiempo"""
+
+
+class DeviceQueueFullError(DeviceBusyError):
+    pass
+
+
+class DeviceQueueTimeoutError(DeviceBusyError):
+    pass
+
+
+class OperationFuture(Future):
+    """Future de una operación en cola.
+
+    Cancelar una operación que aún espera la saca de la cola; cancelar una que
+    ya está en curso la interrumpe (p. ej. VerifyStop) y su resultado pasa a
+    ser CancelledError.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._interrupt_callbacks = []
+
+    def on_interrupt(self, callback):
+        self._interrupt_callbacks.append(callback)
+
+    def cancel(self):
+        if super().cancel():
+            return True
+        if not self.running():
+            return False
+        for callback in list(self._interrupt_callbacks):
+            callback()
+        return True
+
+    def resolve(self, result):
+        try:
+            self.set_result(result)
+        except InvalidStateError:
+            pass  # Cancelada mientras esperaba en la cola
+
+    def fail(self, error):
+        try:
+            self.set_exception(error)
+        except InvalidStateError:
+            pass
+
+
+class DeviceOperation:
+    def __init__(self, name, priority, fn, args, kwargs, wait_timeout):
+        self.name = name
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued_at = time.monotonic()
+        self.deadline = self.enqueued_at + wait_timeout if wait_timeout else None
+        self.started_at = None
+        self.cancelled = False
+        self.started = threading.Event()
+        self.future = OperationFuture()
+
+
+class DeviceScheduler:
+    """Un único hilo trabajador es dueño del lector y ejecuta las operaciones en cola.
+
+    Las verificaciones/identificaciones se atienden antes que enrolls y borrados;
+    dentro de la misma prioridad el orden es FIFO. La cola es acotada y cada
+    operación tiene un plazo máximo de espera antes de empezar.
+    """
+
+    def __init__(self, max_queue_size=32, wait_timeout=30, name="fprintd-device"):
+        self.max_queue_size = max_queue_size
+        self.wait_timeout = wait_timeout
+        self.name = name
+        self._heap = []
+        self._sequence = itertools.count()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._worker = None
+        self._current = None
+        self._stopped = False
+        self._created_at = time.monotonic()
+        self._stats = {
+            'completed': 0,
+            'failed': 0,
+            'rejected_queue_full': 0,
+            'expired_in_queue': 0,
+            'max_queue_depth': 0,
+            'total_wait_ms': 0.0,
+            'total_run_ms': 0.0,
+        }
+
+    def submit(self, priority, fn, *args, name=None, wait_timeout=None, **kwargs):
+        """Encolar una operación y bloquear hasta que el trabajador la ejecute"""
+        # Operaciones anidadas (p. ej. verify dentro de identify) corren en línea
+        if threading.current_thread() is self._worker:
+            return fn(*args, **kwargs)
+
+        wait_timeout = self.wait_timeout if wait_timeout is None else wait_timeout
+        operation = self._enqueue(priority, fn, args, kwargs, name, wait_timeout)
+
+        # 0, igual que None, es esperar sin plazo (DeviceOperation no le pone deadline)
+        if not operation.started.wait(wait_timeout or None):
+            with self._condition:
+                # Si la cancelaron mientras esperaba, result() lanza CancelledError
+                if not operation.started.is_set() and not operation.cancelled:
+                    self._expire(operation)
+                    raise DeviceQueueTimeoutError(
+                        f"Timed out after {wait_timeout}s waiting for the fingerprint device")
+
+        return operation.future.result()
+
+    def submit_async(self, priority, fn, *args, name=None, wait_timeout=None, **kwargs):
+        """Encolar una operación sin bloquear; devuelve un OperationFuture"""
+        wait_timeout = self.wait_timeout if wait_timeout is None else wait_timeout
+        return self._enqueue(priority, fn, args, kwargs, name, wait_timeout).future
+
+    def current_future(self):
+        """Future de la operación en curso, si se llama desde el hilo trabajador"""
+        if threading.current_thread() is not self._worker or self._current is None:
+            return None
+        return self._current.future
+
+    def queue_depth(self):
+        with self._condition:
+            return self._pending
+
+    def load(self):
+        """Operaciones esperando más la que está en curso"""
+        with self._condition:
+            return self._pending + (1 if self._current is not None else 0)
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            finished = stats['completed'] + stats['failed']
+            stats['queue_depth'] = self._pending
+            stats['max_queue_size'] = self.max_queue_size
+            stats['busy'] = self._current is not None
+            stats['current_operation'] = self._current.name if self._current else None
+            now = time.monotonic()
+            busy_ms = stats['total_run_ms']
+            if self._current is not None:
+                busy_ms += (now - self._current.started_at) * 1000
+            stats['utilization'] = round(busy_ms / max((now - self._created_at) * 1000, 1), 4)
+            stats['average_wait_ms'] = round(stats.pop('total_wait_ms') / max(finished, 1), 2)
+            stats['average_run_ms'] = round(stats.pop('total_run_ms') / max(finished, 1), 2)
+            return stats
+
+    def stop(self):
+        """Detener el trabajador y rechazar lo que quede en cola (p. ej. lector desconectado)"""
+        with self._condition:
+            self._stopped = True
+            while self._heap:
+                _, _, operation = heapq.heappop(self._heap)
+                if operation.cancelled:
+                    continue
+                operation.cancelled = True
+                operation.future.fail(DeviceBusyError("Fingerprint reader is no longer available"))
+                operation.started.set()
+            self._pending = 0
+            self._condition.notify_all()
+
+    def is_worker_thread(self):
+        return threading.current_thread() is self._worker
+
+    def _enqueue(self, priority, fn, args, kwargs, name, wait_timeout):
+        operation = DeviceOperation(
+            name or getattr(fn, '__name__', 'operation'), priority, fn, args, kwargs, wait_timeout)
+        with self._condition:
+            if self._pending >= self.max_queue_size:
+                self._stats['rejected_queue_full'] += 1
+                raise DeviceQueueFullError(
+                    f"Fingerprint device queue is full ({self._pending} operations waiting)")
+            heapq.heappush(self._heap, (priority, next(self._sequence), operation))
+            self._pending += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._pending)
+            self._ensure_worker()
+            self._condition.notify()
+        operation.future.add_done_callback(lambda future: self._on_cancelled(operation, future))
+        return operation
+
+    def _on_cancelled(self, operation, future):
+        # Una operación cancelada mientras esperaba deja libre su lugar en la cola
+        if not future.cancelled():
+            return
+        with self._condition:
+            if not operation.cancelled and not operation.started.is_set():
+                operation.cancelled = True
+                self._pending -= 1
+                operation.started.set()  # Despertar a quien espera en submit()
+
+    def _expire(self, operation):
+        # Llamar con self._condition tomado
+        operation.cancelled = True
+        self._pending -= 1
+        self._stats['expired_in_queue'] += 1
+        operation.future.fail(DeviceQueueTimeoutError(
+            "Timed out waiting for the fingerprint device"))
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._stopped = False
+            self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._worker.start()
+
+    def _next_operation(self):
+        with self._condition:
+            while True:
+                while self._heap:
+                    _, _, operation = heapq.heappop(self._heap)
+                    if operation.cancelled:
+                        continue
+                    if operation.deadline and time.monotonic() > operation.deadline:
+                        self._expire(operation)
+                        continue
+                    self._pending -= 1
+                    if not operation.future.set_running_or_notify_cancel():
+                        # Cancelada justo antes de salir de la cola; su callback ya no la descuenta
+                        operation.cancelled = True
+                        operation.started.set()
+                        continue
+                    self._current = operation
+                    operation.started_at = time.monotonic()
+                    operation.started.set()
+                    return operation
+                if self._stopped:
+                    return None
+                self._condition.wait()
+
+    def _run(self):
+        while True:
+            operation = self._next_operation()
+            if operation is None:
+                return
+            error = None
+            try:
+                result = operation.fn(*operation.args, **operation.kwargs)
+            except Exception as e:
+                error = e
+            finished_at = time.monotonic()
+            with self._condition:
+                self._current = None
+                self._stats['failed' if error else 'completed'] += 1
+                self._stats['total_wait_ms'] += (operation.started_at - operation.enqueued_at) * 1000
+                self._stats['total_run_ms'] += (finished_at - operation.started_at) * 1000
+            if error is not None:
+                operation.future.fail(error)
+            else:
+                operation.future.resolve(result)
@@ -0,0 +1,160 @@
+from pydbus import SessionBus, SystemBus
+from gi.repository import GLib
+from services.device_scheduler import DeviceScheduler
+from services.glib_loop import get_main_loop
+from services.signal_registry import SignalRegistry
+from utils.config import DEVICE_QUEUE_MAX_SIZE, DEVICE_QUEUE_WAIT_TIMEOUT, FPRINTD_BUS
+import threading
+
+FPRINTD_BUS_NAME = "net.reactivated.Fprint"
+FPRINTD_MANAGER_PATH = "/net/reactivated/Fprint"
+FPRINTD_DEVICE_INTERFACE = "net.reactivated.Fprint.Device"
+DEVICE_STATUS_SIGNALS = ("EnrollStatus", "VerifyStatus", "IdentifyStatus")
+
+# Errores D-Bus que indican que fprintd se reinició o desapareció del bus
+DISCONNECT_ERRORS = (
+    "org.freedesktop.DBus.Error.ServiceUnknown",
+    "org.freedesktop.DBus.Error.NameHasNoOwner",
+    "org.freedesktop.DBus.Error.NoReply",
+    "org.freedesktop.DBus.Error.UnknownObject",
+    "org.freedesktop.DBus.Error.Disconnected",
+)
+
+
+def fprintd_bus():
+    """Bus donde vive fprintd: el del sistema, o el de sesión para el fprintd de prueba"""
+    return SessionBus() if FPRINTD_BUS == "session" else SystemBus()
+
+
+def list_device_paths(bus):
+    """Rutas D-Bus de todos los lectores que fprintd expone"""
+    fprintd_root = bus.get(FPRINTD_BUS_NAME, FPRINTD_MANAGER_PATH)
+    managed_objects = fprintd_root.GetManagedObjects()
+    return sorted(path for path, interfaces in managed_objects.items()
+                  if FPRINTD_DEVICE_INTERFACE in interfaces)
+
+
+class DeviceSession:
+    """Sesión de larga duración con un lector fprintd.
+
+    Abre el bus una sola vez y se suscribe una sola vez a las señales de estado
+    a través de un SignalRegistry, que enruta cada evento a la operación activa.
+    Si fprintd se reinicia, la sesión se invalida y se reconecta en la siguiente
+    llamada. Las operaciones que reclaman el lector pasan por un DeviceScheduler
+    propio de la sesión, así cada lector tiene su propia cola.
+    """
+
+    def __init__(self, bus_factory=fprintd_bus, signals=None, device_path=None):
+        self._bus_factory = bus_factory
+        self._lock = threading.RLock()
+        self._fixed_path = device_path
+        self.scheduler = DeviceScheduler(
+            DEVICE_QUEUE_MAX_SIZE, DEVICE_QUEUE_WAIT_TIMEOUT,
+            name=f"fprintd-{device_path.rsplit('/', 1)[-1]}" if device_path else "fprintd-device")
+        self.bus = None
+        self.device = None
+        self.device_path = device_path
+        self.connect_count = 0
+        self.signals = signals or SignalRegistry()
+        self._name_watch = None
+
+    @property
+    def connected(self):
+        return self.device is not None
+
+    def connect(self):
+        """Conectar al bus y al lector asignado, o al primero disponible (idempotente)"""
+        with self._lock:
+            if self.device is not None:
+                return self.device
+
+            if self.bus is None:
+                # Las señales del bus se despachan en el bucle GLib compartido
+                get_main_loop()
+                self.bus = self._bus_factory()
+                self._watch_fprintd_owner()
+
+            devices = list_device_paths(self.bus)
+            if self._fixed_path:
+                devices = [path for path in devices if path == self._fixed_path]
+            if not devices:
+                raise Exception(f"No fingerprint devices found{f' at {self._fixed_path}' if self._fixed_path else '!'}")
+
+            device = self.bus.get(FPRINTD_BUS_NAME, devices[0])
+            for signal_name in DEVICE_STATUS_SIGNALS:
+                self.signals.subscribe(device, devices[0], signal_name)
+            self.device = device
+            self.device_path = devices[0]
+            self.connect_count += 1
+            print(f"🔌 Connected to fingerprint device {self.device_path}")
+            return self.device
+
+    def get_device(self):
+        """Obtener el proxy del lector, reconectando si la sesión fue invalidada"""
+        device = self.device
+        if device is not None:
+            return device
+        return self.connect()
+
+    def invalidate(self, reason=None):
+        """Descartar el proxy actual para forzar una reconexión"""
+        with self._lock:
+            if self.device is None:
+                return
+            self.signals.unsubscribe_device(self.device_path)
+            self.device = None
+            self.device_path = self._fixed_path
+            print(f"🔌 Fingerprint device session invalidated{f': {reason}' if reason else ''}")
+
+    def call(self, method, *args):
+        """Llamar un método del lector, reintentando una vez si fprintd se reinició"""
+        try:
+            return getattr(self.get_device(), method)(*args)
+        except GLib.Error as e:
+            if not is_disconnect_error(e):
+                raise
+            self.invalidate(str(e))
+            return getattr(self.get_device(), method)(*args)
+
+    def supports_signal(self, signal_name):
+        """True si el lector actual expone la señal (p. ej. IdentifyStatus)"""
+        self.get_device()
+        return self.signals.is_subscribed(self.device_path, signal_name)
+
+    def route_signal(self, signal_name, handler):
+        """Enviar los eventos de la señal a handler; devuelve la función para soltarla"""
+        self.get_device()
+        return self.signals.route(self.device_path, signal_name, handler)
+
+    def close(self):
+        self.invalidate("session closed")
+        self.scheduler.stop()
+        if self._name_watch is not None:
+            try:
+                self._name_watch.disconnect()
+            except Exception:
+                pass
+            self._name_watch = None
+        self.bus = None
+
+    def _watch_fprintd_owner(self):
+        try:
+            self._name_watch = self.bus.subscribe(
+                sender="org.freedesktop.DBus",
+                iface="org.freedesktop.DBus",
+                signal="NameOwnerChanged",
+                arg0=FPRINTD_BUS_NAME,
+                signal_fired=self._on_name_owner_changed,
+            )
+        except Exception as e:
+            print(f"⚠️ Could not watch fprintd restarts: {e}")
+
+    def _on_name_owner_changed(self, sender, object_path, iface, signal, params):
+        name, old_owner, new_owner = params
+        if name == FPRINTD_BUS_NAME and old_owner != new_owner:
+            self.invalidate("fprintd restarted" if new_owner else "fprintd stopped")
+
+
+def is_disconnect_error(error):
+    message = str(error)
+    return any(name in message for name in DISCONNECT_ERRORS)
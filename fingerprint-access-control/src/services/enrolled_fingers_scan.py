@@ -0,0 +1,108 @@
+from gi.repository import Gio, GLib
+from services.device_session import FPRINTD_BUS_NAME, FPRINTD_DEVICE_INTERFACE
+from services.glib_loop import get_main_loop
+import threading
+import time
+
+# fprintd responde con este error a los usuarios sin huellas: no es una falla
+NO_ENROLLED_PRINTS_ERROR = "net.reactivated.Fprint.Error.NoEnrolledPrints"
+
+
+class EnrolledFingersScan:
+    """ListEnrolledFingers para muchos usuarios a la vez, con llamadas D-Bus asíncronas.
+
+    Mantiene hasta `window` llamadas en vuelo: cada respuesta (que llega en el
+    bucle GLib compartido) lanza la siguiente. Así un escaneo de miles de
+    usuarios avanza al ritmo del bus y no de un viaje de ida y vuelta por usuario.
+    """
+
+    def __init__(self, connection, device_path, window=64, call_timeout=25):
+        self.connection = connection
+        self.device_path = device_path
+        self.window = max(1, window)
+        self.call_timeout = call_timeout
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._pending = []
+        self._in_flight = 0
+        self.fingers = {}
+        self.errors = {}
+        self.unanswered = set()
+        self.latencies_ms = {}
+        self.elapsed_ms = 0.0
+
+    def run(self, usernames, timeout=None):
+        """Consultar a todos los usuarios; devuelve {username: [dedos]} con los que respondieron.
+
+        Los usuarios sin huellas aparecen con lista vacía. Los que fallaron
+        quedan en self.errors y los que no respondieron antes de timeout en
+        self.unanswered; ninguno de ellos está en el resultado.
+        """
+        get_main_loop()  # Las respuestas se despachan en el bucle compartido
+        started = time.monotonic()
+        usernames = list(dict.fromkeys(usernames))
+        self._pending = usernames[::-1]
+        if not self._pending:
+            return {}
+        self._done.clear()
+        with self._lock:
+            for _ in range(min(self.window, len(self._pending))):
+                self._start_next()
+        if not self._done.wait(timeout):
+            with self._lock:
+                self._pending = []
+            print(f"⚠️ Enrolled fingers scan timed out with {self._in_flight} calls in flight")
+        self.elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self.unanswered = {u for u in usernames if u not in self.fingers and u not in self.errors}
+            return dict(self.fingers)
+
+    def report(self):
+        latencies = sorted(self.latencies_ms.values())
+        calls = len(latencies)
+        return {
+            'calls': calls,
+            'users_with_fingers': sum(1 for fingers in self.fingers.values() if fingers),
+            'errors': len(self.errors),
+            'unanswered': len(self.unanswered),
+            'window': self.window,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+            'calls_per_second': round(calls / max(self.elapsed_ms / 1000, 1e-9), 1) if calls else 0,
+            'latency_avg_ms': round(sum(latencies) / calls, 3) if calls else 0,
+            'latency_p50_ms': round(latencies[calls // 2], 3) if calls else 0,
+            'latency_p95_ms': round(latencies[max(int(calls * 0.95) - 1, 0)], 3) if calls else 0,
+            'latency_max_ms': round(latencies[-1], 3) if calls else 0,
+        }
+
+    def _start_next(self):
+        # Llamar con self._lock tomado
+        if not self._pending:
+            if self._in_flight == 0:
+                self._done.set()
+            return
+        username = self._pending.pop()
+        self._in_flight += 1
+        self.connection.call(
+            FPRINTD_BUS_NAME, self.device_path, FPRINTD_DEVICE_INTERFACE, "ListEnrolledFingers",
+            GLib.Variant('(s)', (username,)), GLib.VariantType.new('(as)'),
+            Gio.DBusCallFlags.NONE, int(self.call_timeout * 1000), None,
+            self._on_reply, (username, time.monotonic()))
+
+    def _on_reply(self, connection, result, user_data):
+        username, sent_at = user_data
+        fingers, error = [], None
+        try:
+            fingers = list(connection.call_finish(result).unpack()[0])
+        except GLib.Error as e:
+            if NO_ENROLLED_PRINTS_ERROR not in str(e):
+                error = str(e)
+        latency_ms = (time.monotonic() - sent_at) * 1000
+        with self._lock:
+            self._in_flight -= 1
+            self.latencies_ms[username] = latency_ms
+            # Un error no dice nada de las huellas del usuario: no se reporta como lista vacía
+            if error is not None:
+                self.errors[username] = error
+            else:
+                self.fingers[username] = fingers
+            self._start_next()
@@ -0,0 +1,255 @@
+import threading
+import time
+
+class EnrolledFingersIndex:
+    """Índice en memoria de los dedos enrollados por usuario.
+
+    Se llena en bloque al arrancar, se actualiza en el sitio con cada enroll o
+    borrado hecho por la API y se refresca periódicamente en segundo plano para
+    detectar cambios hechos fuera de ella (fprintd-enroll, otro proceso, etc.).
+    """
+
+    def __init__(self, fetch_fingers, fetch_many=None):
+        # fetch_fingers(username) -> list, consulta directa a fprintd
+        self._fetch_fingers = fetch_fingers
+        # fetch_many(usernames) -> {username: list}, consulta en bloque (opcional);
+        # solo trae a los usuarios que pudo consultar, con lista vacía si no tienen huellas
+        self._fetch_many = fetch_many
+        self._lock = threading.Lock()
+        self._fingers = {}
+        self._versions = {}
+        self._refresh_thread = None
+        self._stop_refresh = threading.Event()
+        self.last_refresh = None
+
+    def load(self, usernames):
+        """Llenar el índice en bloque para los usuarios indicados"""
+        fetched = {}
+        versions = self._snapshot_versions(usernames)
+        if self._fetch_many is not None:
+            try:
+                fetched = self._fetch_many(usernames)
+                # Los que faltan (error o sin respuesta) no se indexan como "sin huellas":
+                # conservan lo que ya había y get() los consulta uno a uno si hace falta
+                fetched = {username: list(fetched[username]) for username in usernames if username in fetched}
+                missing = len(versions) - len(fetched)
+                if missing:
+                    print(f"⚠️ Bulk enrolled fingers scan left {missing} users unanswered, not indexing them")
+                self._apply(fetched, versions)
+                return len(fetched)
+            except Exception as e:
+                print(f"⚠️ Bulk enrolled fingers scan failed, querying one by one: {e}")
+        for username in usernames:
+            try:
+                fetched[username] = list(self._fetch_fingers(username) or [])
+            except Exception as e:
+                print(f"⚠️ Error indexing enrolled fingers for {username}: {e}")
+        self._apply(fetched, versions)
+        return len(fetched)
+
+    def get(self, username):
+        """Dedos enrollados de un usuario; consulta fprintd solo si no está indexado"""
+        with self._lock:
+            fingers = self._fingers.get(username)
+            if fingers is not None:
+                return list(fingers)
+            version = self._versions.get(username, 0)
+
+        fingers = list(self._fetch_fingers(username) or [])
+        with self._lock:
+            if self._versions.get(username, 0) == version:
+                self._fingers[username] = fingers
+            return list(self._fingers.get(username, fingers))
+
+    def add(self, username, finger):
+        with self._lock:
+            fingers = self._fingers.setdefault(username, [])
+            if finger not in fingers:
+                fingers.append(finger)
+            self._bump(username)
+
+    def remove(self, username, finger):
+        with self._lock:
+            fingers = self._fingers.get(username)
+            if fingers and finger in fingers:
+                fingers.remove(finger)
+            self._bump(username)
+
+    def clear_user(self, username):
+        with self._lock:
+            self._fingers[username] = []
+            self._bump(username)
+
+    def forget(self, username):
+        """Sacar al usuario del índice (por ejemplo, al borrarlo de la base de datos)"""
+        with self._lock:
+            self._fingers.pop(username, None)
+            self._bump(username)
+
+    def snapshot(self):
+        """Copia de {username: [dedos]} para recorridos de estadísticas"""
+        with self._lock:
+            return {username: list(fingers) for username, fingers in self._fingers.items()}
+
+    def start_refresh(self, usernames_provider, interval):
+        """Arrancar el refresco periódico en un hilo daemon"""
+        if self._refresh_thread is not None or not interval:
+            return
+        self._stop_refresh.clear()
+
+        def refresh_loop():
+            while not self._stop_refresh.wait(interval):
+                try:
+                    self.refresh(usernames_provider())
+                except Exception as e:
+                    print(f"⚠️ Error refreshing enrolled fingers index: {e}")
+
+        self._refresh_thread = threading.Thread(
+            target=refresh_loop, name="enrolled-fingers-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_refresh(self):
+        self._stop_refresh.set()
+        self._refresh_thread = None
+
+    def refresh(self, usernames):
+        """Volver a consultar fprintd y conservar solo los usuarios indicados"""
+        count = self.load(usernames)
+        wanted = set(usernames)
+        with self._lock:
+            for username in [u for u in self._fingers if u not in wanted]:
+                del self._fingers[username]
+        return count
+
+    def _snapshot_versions(self, usernames):
+        with self._lock:
+            return {username: self._versions.get(username, 0) for username in usernames}
+
+    def _apply(self, fetched, versions):
+        # No pisar cambios hechos por la API mientras se consultaba fprintd
+        with self._lock:
+            for username, fingers in fetched.items():
+                if self._versions.get(username, 0) == versions.get(username, 0):
+                    self._fingers[username] = fingers
+            self.last_refresh = time.time()
+
+    def _bump(self, username):
+        self._versions[username] = self._versions.get(username, 0) + 1
+
+
+class ReaderFingersIndex:
+    """Un EnrolledFingersIndex por lector.
+
+    fprintd guarda las huellas en cada lector por separado: un dedo enrollado
+    en un lector no se puede verificar en otro. Este índice recuerda qué
+    lector tiene cada huella para enviar verificaciones y borrados a un lector
+    que la tenga; consultado sin lector, reúne los dedos de todos.
+    """
+
+    def __init__(self, readers, fetch_fingers, fetch_many=None):
+        # readers() -> rutas D-Bus de los lectores conectados
+        self._readers = readers
+        # fetch_fingers(username, device_path=...) y fetch_many(usernames, device_path=...)
+        self._fetch_fingers = fetch_fingers
+        self._fetch_many = fetch_many
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._refresh_thread = None
+        self._stop_refresh = threading.Event()
+        self.last_refresh = None
+
+    def reader(self, device_path):
+        """Índice del lector, creado la primera vez que se usa"""
+        with self._lock:
+            index = self._indexes.get(device_path)
+            if index is None:
+                fetch_many = None
+                if self._fetch_many is not None:
+                    fetch_many = lambda usernames: self._fetch_many(usernames, device_path=device_path)
+                index = EnrolledFingersIndex(
+                    lambda username: self._fetch_fingers(username, device_path=device_path), fetch_many)
+                self._indexes[device_path] = index
+            return index
+
+    def readers_for(self, username, finger=None):
+        """Lectores que tienen huellas del usuario (o ese dedo en particular)"""
+        readers = []
+        for device_path in self._readers():
+            try:
+                fingers = self.reader(device_path).get(username)
+            except Exception as e:
+                print(f"⚠️ Error getting enrolled fingers for {username} on {device_path}: {e}")
+                continue
+            if (finger in fingers) if finger else fingers:
+                readers.append(device_path)
+        return readers
+
+    def get(self, username):
+        """Dedos del usuario en cualquier lector, sin repetir"""
+        fingers = []
+        for device_path in self._readers():
+            for finger in self.reader(device_path).get(username):
+                if finger not in fingers:
+                    fingers.append(finger)
+        return fingers
+
+    def load(self, usernames):
+        count = 0
+        for device_path in self._readers():
+            count = max(count, self.reader(device_path).load(usernames))
+        self.last_refresh = time.time()
+        return count
+
+    def clear_user(self, username):
+        for index in self._all():
+            index.clear_user(username)
+
+    def forget(self, username):
+        for index in self._all():
+            index.forget(username)
+
+    def snapshot(self):
+        """Copia de {username: [dedos]} con los dedos de todos los lectores"""
+        merged = {}
+        for index in self._all():
+            for username, fingers in index.snapshot().items():
+                known = merged.setdefault(username, [])
+                known.extend(finger for finger in fingers if finger not in known)
+        return merged
+
+    def start_refresh(self, usernames_provider, interval):
+        """Arrancar el refresco periódico de todos los lectores en un hilo daemon"""
+        if self._refresh_thread is not None or not interval:
+            return
+        self._stop_refresh.clear()
+
+        def refresh_loop():
+            while not self._stop_refresh.wait(interval):
+                try:
+                    self.refresh(usernames_provider())
+                except Exception as e:
+                    print(f"⚠️ Error refreshing enrolled fingers index: {e}")
+
+        self._refresh_thread = threading.Thread(
+            target=refresh_loop, name="enrolled-fingers-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_refresh(self):
+        self._stop_refresh.set()
+        self._refresh_thread = None
+
+    def refresh(self, usernames):
+        """Volver a consultar cada lector conectado y olvidar los que ya no están"""
+        readers = list(self._readers())
+        with self._lock:
+            for device_path in [path for path in self._indexes if path not in readers]:
+                del self._indexes[device_path]
+        count = 0
+        for device_path in readers:
+            count = max(count, self.reader(device_path).refresh(usernames))
+        self.last_refresh = time.time()
+        return count
+
+    def _all(self):
+        with self._lock:
+            return list(self._indexes.values())
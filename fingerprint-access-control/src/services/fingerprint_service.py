@@ -1,81 +1,137 @@
-from pydbus import SystemBus
-from gi.repository import GLib
-import json
-import os
+from services.device_pool import DevicePool
+from services.glib_loop import SignalFuture, OperationTimeoutError
+from services.enrollment_index import ReaderFingersIndex
+from services.candidate_set import CandidateSetBuilder
+from services.access_stats import AccessStatsStore
+from services.enrolled_fingers_scan import EnrolledFingersScan
+from services.simulated_reader import SimulatedReader
+from services.capture_quality import CaptureQualityGate, LowQualityCaptureError
+from services.reader_backend import FprintdBackend, BACKEND_NAMES, NATIVE_IDENTIFY
+from services.device_scheduler import (
+    DeviceBusyError, PRIORITY_VERIFY, PRIORITY_IDENTIFY, PRIORITY_ENROLL, PRIORITY_DELETE
+)
 import pwd
 import getpass
+import functools
+from concurrent.futures import CancelledError, Future
+from utils.config import (
+    ACCESS_GROUPS, TERMINAL_GROUPS, IDENTIFY_CHUNK_SIZE, ACCESS_STATS_FILE, ACCESS_STATS_HALF_LIFE_DAYS,
+    ACCESS_STATS_FLUSH_INTERVAL,
+    ENROLLED_SCAN_WINDOW, ENROLLED_SCAN_TIMEOUT, SIMULATED_LATENCY_MS, SIMULATED_LATENCY_JITTER_MS,
+    SIMULATED_LATENCY_DISTRIBUTION, SIMULATED_DEFAULT_MATCH, SIMULATED_SEED, FINGERPRINT_BACKEND,
+    ENROLL_MAX_POOR_CAPTURES, VERIFY_MAX_POOR_CAPTURES, IDENTIFY_MAX_POOR_CAPTURES
+)
+
+ENROLL_TIMEOUT = 60  # seconds
+VERIFY_TIMEOUT = 30  # seconds
+IDENTIFY_TIMEOUT = 30  # seconds
+
+def device_operation(priority, pass_terminal=False, route=None):
+    """Ejecutar el método en el hilo dueño del lector elegido, respetando la prioridad.
+
+    Acepta terminal_id para enviar la operación al lector de esa terminal; con
+    pass_terminal el método también lo recibe (p. ej. para sus estadísticas).
+    route(self, terminal_id, *args) elige otro lector, p. ej. uno que tenga las
+    huellas del usuario.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, terminal_id=None, **kwargs):
+            if pass_terminal:
+                kwargs['terminal_id'] = terminal_id
+            # Modo demo u operación anidada (verify dentro de identify): mismo hilo
+            if not self.fingerprint_available or self.pool.session_for_current_thread():
+                return method(self, *args, **kwargs)
+            session = self._select_session(wrapper, terminal_id, args)
+            return session.scheduler.submit(
+                priority, method, self, *args, name=method.__name__, **kwargs)
+        wrapper.pass_terminal = pass_terminal
+        wrapper.route = route
+        return wrapper
+    return decorator
 
 class FingerprintService:
-    def __init__(self):
-        self.fingerprints_file = "fingerprints_labels.json"
-        self.fingerprints_with_labels = []
-        self.loop = None
-        self.enrollment_success = False
-        self.verification_success = False
-        self.verification_result = None
+    def __init__(self, pool=None, db_service=None, simulator=None, backend=FINGERPRINT_BACKEND):
+        if backend not in BACKEND_NAMES:
+            raise ValueError(f"Unknown fingerprint backend '{backend}', expected one of {BACKEND_NAMES}")
+        self.backend_name = backend
+        # Las etiquetas viven en la columna fingerprints.label de la base de datos
+        self.db_service = db_service
+        self._active_operations = {}
+        self._dispatching_future = None
+        self._status_handlers = {
+            'enroll': ('EnrollStatus', self.on_enroll_status),
+            'verify': ('VerifyStatus', self.on_verify_status),
+            'identify': ('IdentifyStatus', self.on_identify_status),
+        }
+        # Capturas malas seguidas que cortan cada operación (0: esperar hasta el timeout)
+        self.max_poor_captures = {
+            'enroll': ENROLL_MAX_POOR_CAPTURES,
+            'verify': VERIFY_MAX_POOR_CAPTURES,
+            'identify': IDENTIFY_MAX_POOR_CAPTURES,
+        }
+        self.pool = pool or DevicePool().start()
+        self.fprintd = FprintdBackend(self.pool)
+        # fprintd guarda las huellas en cada lector: el índice recuerda cuál tiene cada una
+        self.enrolled_index = ReaderFingersIndex(
+            self.pool.device_paths, self.list_enrolled_fingers_from_device, self.list_enrolled_fingers_bulk)
+        self.last_bulk_scan = None
+        self.candidates = CandidateSetBuilder(
+            self.get_enrolled_fingers, ACCESS_GROUPS, TERMINAL_GROUPS, IDENTIFY_CHUNK_SIZE)
+        self.access_stats = AccessStatsStore(
+            ACCESS_STATS_FILE, ACCESS_STATS_HALF_LIFE_DAYS, ACCESS_STATS_FLUSH_INTERVAL)
+        # Sin lectores, las operaciones usan el lector simulado en lugar de pedir Enter
+        self.simulator = simulator or SimulatedReader(
+            SIMULATED_LATENCY_MS, SIMULATED_LATENCY_JITTER_MS, SIMULATED_LATENCY_DISTRIBUTION,
+            SIMULATED_DEFAULT_MATCH, SIMULATED_SEED)
+        # "auto" se resuelve una sola vez: un lector que se pierde después es un error,
+        # nunca un paso silencioso al lector simulado
+        if backend == "simulated" or (backend == "auto" and not self.fprintd.available()):
+            self.backend = self.simulator
+        else:
+            self.backend = self.fprintd
         
-        try:
-            self.bus = SystemBus()
-            self.device = self.get_fingerprint_device()
-            self.fingerprint_available = True
-            self.load_fingerprints_labels()
-            print("✅ Fingerprint service initialized successfully")
-        except Exception as e:
-            print(f"⚠️ Warning: Fingerprint service not available: {e}")
+        if self.fingerprint_available:
+            print(f"✅ Fingerprint service initialized successfully ({len(self.pool.sessions())} readers)")
+        elif self.backend is not self.simulator:
+            print("❌ Fingerprint backend 'fprintd' selected but no fingerprint readers found")
+        else:
+            print("⚠️ Warning: Fingerprint service not available: no fingerprint readers found")
             print("Running in demo mode without fingerprint functionality.")
-            self.device = None
-            self.fingerprint_available = False
-
-    def get_fingerprint_device(self):
-        fprintd_root = self.bus.get("net.reactivated.Fprint", "/net/reactivated/Fprint")
-        managed_objects = fprintd_root.GetManagedObjects()
-        devices = [path for path, interfaces in managed_objects.items() 
-                   if 'net.reactivated.Fprint.Device' in interfaces]
-        if not devices:
-            raise Exception("No fingerprint devices found!")
-        
-        device = self.bus.get("net.reactivated.Fprint", devices[0])
-        # Connect to signals
-        device.EnrollStatus.connect(self.on_enroll_status)
-        device.VerifyStatus.connect(self.on_verify_status)
-        return device
-
-    def load_fingerprints_labels(self):
-        """Cargar etiquetas desde archivo JSON"""
-        try:
-            if os.path.exists(self.fingerprints_file):
-                with open(self.fingerprints_file, 'r', encoding='utf-8') as f:
-                    self.fingerprints_with_labels = json.load(f)
-                print(f"✅ Loaded {len(self.fingerprints_with_labels)} fingerprint labels")
-            else:
-                self.fingerprints_with_labels = []
-                print(f"📄 Fingerprint labels file not found, starting with empty list")
-        except Exception as e:
-            print(f"⚠️ Error loading fingerprint labels: {e}")
-            self.fingerprints_with_labels = []
 
-    def save_fingerprints_labels(self):
-        """Guardar etiquetas en archivo JSON"""
-        try:
-            with open(self.fingerprints_file, 'w', encoding='utf-8') as f:
-                json.dump(self.fingerprints_with_labels, f, indent=2, ensure_ascii=False)
-            print(f"💾 Fingerprint labels saved successfully")
-        except Exception as e:
-            print(f"⚠️ Error saving fingerprint labels: {e}")
+    @property
+    def fingerprint_available(self):
+        return self.backend is self.fprintd and self.fprintd.available()
+
+    def _simulating(self):
+        """True en modo demo; con fprintd y sin lectores lanza DeviceBusyError en lugar de simular"""
+        if self.backend is self.simulator:
+            return True
+        if not self.fprintd.available():
+            raise DeviceBusyError("No fingerprint readers available")
+        return False
+
+    @property
+    def session(self):
+        """Lector que ejecuta la operación actual o, fuera de una operación, el primero"""
+        return self.pool.session_for_current_thread() or self.pool.primary()
+
+    @property
+    def device(self):
+        """Proxy del lector actual; se reconecta si fprintd se reinició"""
+        if not self.fingerprint_available:
+            return None
+        return self.session.get_device()
 
     def on_enroll_status(self, result, done):
         """Callback para el estado del enrollment"""
         print(f"Enrollment status: {result}, done: {done}")
         if result == "enroll-completed":
             print("✅ Fingerprint enrollment completed successfully!")
-            self.enrollment_success = True
-            if self.loop:
-                self.loop.quit()
+            self._finish_signal_operation(True)
         elif result == "enroll-failed":
             print("❌ Fingerprint enrollment failed")
-            self.enrollment_success = False
-            if self.loop:
-                self.loop.quit()
+            self._finish_signal_operation(False)
         elif result == "enroll-stage-passed":
             print("📝 Enrollment stage passed, continue...")
         elif result == "enroll-retry-scan":
@@ -88,21 +144,119 @@ class FingerprintService:
         print(f"Verify status: {result}, done: {done}")
         if result == "verify-match":
             print("✅ Fingerprint verified successfully!")
-            self.verification_success = True
-            self.verification_result = "match"
-            if self.loop:
-                self.loop.quit()
+            self._finish_signal_operation(True)
         elif result == "verify-no-match":
             print("❌ Fingerprint does not match")
-            self.verification_success = False
-            self.verification_result = "no-match"
-            if self.loop:
-                self.loop.quit()
+            self._finish_signal_operation(False)
         elif result == "verify-retry-scan":
             print("🔄 Please retry the scan")
         elif result == "verify-swipe-too-short":
             print("⚡ Swipe too short, try again")
 
+    def on_identify_status(self, result, username, finger, done):
+        """Callback para el estado de la identificación"""
+        print(f"Identify status: {result}, username: {username}, finger: {finger}, done: {done}")
+        if result == "identify-match":
+            print(f"✅ Usuario identificado: {username} (dedo: {finger})")
+            self._finish_signal_operation(username)
+        elif result == "identify-no-match":
+            print("❌ No se encontró coincidencia de huella")
+            self._finish_signal_operation(None)
+        elif result == "identify-retry-scan":
+            print("🔄 Reintenta el escaneo")
+        elif result == "identify-swipe-too-short":
+            print("⚡ Deslizamiento muy corto, intenta de nuevo")
+
+    def _begin_signal_operation(self, kind, timeout):
+        """Crear el future que resolverá la próxima señal de estado de este tipo en el lector actual"""
+        session = self.session
+        future = SignalFuture(timeout)
+        signal_name, handler = self._status_handlers[kind]
+        gate = CaptureQualityGate(self.max_poor_captures[kind])
+        route = functools.partial(self._dispatch_status, future, gate, handler)
+        future.add_cleanup(session.route_signal(signal_name, route))
+        self._active_operations[session.device_path] = future
+        future.add_cleanup(lambda: self._clear_signal_operation(session.device_path, future))
+        # Cancelar la operación en cola también detiene la captura en curso
+        current = session.scheduler.current_future()
+        if current is not None:
+            current.on_interrupt(future.cancel)
+        return future
+
+    def _dispatch_status(self, future, gate, handler, *args):
+        # Las señales se despachan de a una en el hilo del bucle GLib
+        self._dispatching_future = future
+        try:
+            handler(*args)
+        finally:
+            self._dispatching_future = None
+        rejected = gate.observe(args[0])
+        if rejected is not None:
+            print(f"📉 {rejected}")
+            future.fail(rejected)
+
+    def _finish_signal_operation(self, result):
+        future = self._dispatching_future
+        if future is not None:
+            future.resolve(result)
+
+    def _cancel_signal_operation(self):
+        future = self._active_operations.get(self.session.device_path)
+        if future is not None:
+            future.cancel()
+
+    def _clear_signal_operation(self, device_path, future):
+        if self._active_operations.get(device_path) is future:
+            del self._active_operations[device_path]
+
+    def _await_signal_operation(self, future, default=False):
+        """Esperar el resultado de la señal; timeout o cancelación devuelven default"""
+        try:
+            return future.result()
+        except OperationTimeoutError as e:
+            print(f"⏰ {e}")
+        except CancelledError:
+            print("🛑 Fingerprint operation cancelled")
+        return default
+
+    def _submit_async(self, priority, method, *args, terminal_id=None):
+        kwargs = {'terminal_id': terminal_id} if method.pass_terminal else {}
+        if self._simulating():
+            future = Future()
+            future.set_result(method.__wrapped__(self, *args, **kwargs))
+            return future
+        return self._select_session(method, terminal_id, args).scheduler.submit_async(
+            priority, method.__wrapped__, self, *args, name=method.__name__, **kwargs)
+
+    def _select_session(self, method, terminal_id, args):
+        """Lector para una operación: el de su route o el de la terminal / más desocupado"""
+        if method.route is not None:
+            return method.route(self, terminal_id, *args)
+        return self.pool.select(terminal_id)
+
+    def _reader_with_prints(self, terminal_id, username, finger=None):
+        """El lector de la terminal o, si no tiene, el más desocupado de los que tienen las huellas"""
+        return self.pool.select(terminal_id, self.enrolled_index.readers_for(username, finger))
+
+    def _reader_at(self, terminal_id, username, finger, device_path):
+        """El lector indicado o, sin ruta, el de la terminal / más desocupado"""
+        return self.pool.session_at(device_path) if device_path else self.pool.select(terminal_id)
+
+    def enroll_fingerprint_async(self, username, finger, label=None, terminal_id=None):
+        """Como enroll_fingerprint, pero devuelve un Future sin bloquear el hilo"""
+        return self._submit_async(PRIORITY_ENROLL, FingerprintService.enroll_fingerprint,
+                                  username, finger, label, terminal_id=terminal_id)
+
+    def verify_fingerprint_async(self, username, finger=None, terminal_id=None):
+        """Como verify_fingerprint, pero devuelve un Future sin bloquear el hilo"""
+        return self._submit_async(PRIORITY_VERIFY, FingerprintService.verify_fingerprint,
+                                  username, finger, terminal_id=terminal_id)
+
+    def identify_user_async(self, possible_usernames=None, group=None, terminal_id=None):
+        """Como identify_user_smart, pero devuelve un Future sin bloquear el hilo"""
+        return self._submit_async(PRIORITY_IDENTIFY, FingerprintService.identify_user_smart,
+                                  possible_usernames, group, terminal_id=terminal_id)
+
     def get_available_fingers(self):
         """Obtener lista de dedos disponibles"""
         return [
@@ -112,9 +266,10 @@ class FingerprintService:
             "right-ring-finger", "right-little-finger"
         ]
 
+    @device_operation(PRIORITY_ENROLL)
     def enroll_fingerprint(self, username, finger, label=None):
         """Enrollar una huella dactilar para un usuario específico"""
-        if not self.fingerprint_available:
+        if self._simulating():
             print("⚠️ Fingerprint service not available - simulating enrollment")
             return self.simulate_enrollment(username, finger, label)
         
@@ -124,25 +279,20 @@ class FingerprintService:
                 print(f"📝 Label: {label}")
             print("👆 Please place your finger on the scanner multiple times when prompted...")
             
-            # Reset enrollment state
-            self.enrollment_success = False
-            
             # Claim device for specific user
-            self.device.Claim(username)
+            self.session.call("Claim", username)
+            future = self._begin_signal_operation('enroll', ENROLL_TIMEOUT)
             self.device.EnrollStart(finger)
             
-            # Create event loop with timeout
-            self.loop = GLib.MainLoop()
-            GLib.timeout_add_seconds(60, lambda: self.loop.quit())
-            
-            print("⏳ Waiting for enrollment... (60 seconds maximum)")
-            self.loop.run()
+            print(f"⏳ Waiting for enrollment... ({ENROLL_TIMEOUT} seconds maximum)")
+            enrollment_success = self._await_signal_operation(future)
             
             # Stop enrollment and release device
             self.device.EnrollStop()
             self.device.Release()
             
-            if self.enrollment_success:
+            if enrollment_success:
+                self.enrolled_index.reader(self.session.device_path).add(username, finger)
                 # Save label if provided
                 if label:
                     self.add_fingerprint_label(username, finger, label)
@@ -154,15 +304,19 @@ class FingerprintService:
                 
         except Exception as e:
             print(f"⚠️ Error during fingerprint enrollment: {e}")
+            self._cancel_signal_operation()
             try:
                 self.device.Release()
             except:
                 pass
+            if isinstance(e, LowQualityCaptureError):
+                raise
             return False
 
-    def verify_fingerprint(self, username, finger=None):
+    @device_operation(PRIORITY_VERIFY, pass_terminal=True, route=_reader_with_prints)
+    def verify_fingerprint(self, username, finger=None, terminal_id=None):
         """Verificar huella dactilar de un usuario"""
-        if not self.fingerprint_available:
+        if self._simulating():
             print("⚠️ Fingerprint service not available - simulating verification")
             return self.simulate_verification(username, finger)
         
@@ -173,37 +327,32 @@ class FingerprintService:
                 print(f"\n🔍 Verifying fingerprint for user {username}...")
             print("👆 Please place your finger on the scanner...")
             
-            # Reset verification state
-            self.verification_success = False
-            self.verification_result = None
-            
             # Claim device for specific user
-            self.device.Claim(username)
+            self.session.call("Claim", username)
             
-            if finger:
-                self.device.VerifyStart(finger)
-            else:
+            if not finger:
                 # If no specific finger, try to verify any enrolled finger
                 enrolled_fingers = self.get_enrolled_fingers(username)
                 if not enrolled_fingers:
                     print(f"❌ No enrolled fingerprints found for user {username}")
                     self.device.Release()
                     return False
-                self.device.VerifyStart(enrolled_fingers[0])
+                # El dedo que más se usa en esta terminal
+                finger = self.access_stats.order_fingers(terminal_id, username, enrolled_fingers)[0]
             
-            # Create event loop with timeout
-            self.loop = GLib.MainLoop()
-            GLib.timeout_add_seconds(30, lambda: self.loop.quit())
+            future = self._begin_signal_operation('verify', VERIFY_TIMEOUT)
+            self.device.VerifyStart(finger)
             
-            print("⏳ Waiting for verification... (30 seconds maximum)")
-            self.loop.run()
+            print(f"⏳ Waiting for verification... ({VERIFY_TIMEOUT} seconds maximum)")
+            verification_success = self._await_signal_operation(future)
             
             # Stop verification and release device
             self.device.VerifyStop()
             self.device.Release()
             
-            if self.verification_success and self.verification_result == "match":
+            if verification_success:
                 print(f"✅ Fingerprint verified successfully for {username}")
+                self.access_stats.record(terminal_id, username, finger)
                 return True
             else:
                 print(f"❌ Fingerprint verification failed for {username}")
@@ -211,38 +360,140 @@ class FingerprintService:
                 
         except Exception as e:
             print(f"⚠️ Error during fingerprint verification: {e}")
+            self._cancel_signal_operation()
             try:
                 self.device.Release()
             except:
                 pass
+            if isinstance(e, LowQualityCaptureError):
+                raise
             return False
 
+    def _native_identify(self, possible_usernames):
+        """Identificación nativa con IdentifyStart, resuelta desde IdentifyStatus"""
+        # fprintd exige reclamar el lector también para identificar
+        self.session.call("Claim", "")
+        future = self._begin_signal_operation('identify', IDENTIFY_TIMEOUT)
+        try:
+            self.device.IdentifyStart(possible_usernames or [])
+            print(f"⏳ Esperando identificación... ({IDENTIFY_TIMEOUT} segundos máximo)")
+            return self._await_signal_operation(future, default=None)
+        finally:
+            future.cancel()
+            try:
+                self.device.IdentifyStop()
+            finally:
+                self.device.Release()
+
+    def _native_identify_in_chunks(self, candidates):
+        """IdentifyStart por bloques del tamaño que acepta el lector, hasta encontrar al usuario"""
+        if not candidates:
+            return self._native_identify([])  # Sin lista: el lector compara contra todos
+        chunks = self.candidates.chunks(candidates)
+        for number, chunk in enumerate(chunks, 1):
+            if len(chunks) > 1:
+                print(f"📦 Bloque {number}/{len(chunks)}: {len(chunk)} candidatos")
+            identified = self._native_identify(chunk)
+            if identified:
+                return identified
+        return None
+
+    def _sequential_identify(self, candidates, terminal_id=None):
+        """Verificar uno por uno los dedos de cada candidato, los habituales de la terminal primero"""
+        for username in self.access_stats.rank(terminal_id, candidates):
+            fingers = self.access_stats.order_fingers(terminal_id, username, self.get_enrolled_fingers(username))
+            for finger in fingers:
+                print(f"Intentando verificar con usuario: {username}, dedo: {finger}")
+                if self.verify_fingerprint(username, finger, terminal_id=terminal_id):
+                    print(f"✅ Usuario identificado: {username}")
+                    return username
+        print("❌ No se pudo identificar al usuario por huella.")
+        return None
+
+    def _build_candidates(self, possible_usernames=None, group=None):
+        """Usuarios indicados (o del sistema) que tienen huellas, filtrados por grupo"""
+        if possible_usernames is None:
+            possible_usernames = [user.pw_name for user in pwd.getpwall() if user.pw_uid >= 1000]
+            possible_usernames.append('root')
+            possible_usernames = list(set(possible_usernames))
+        candidates = self.candidates.build(possible_usernames, group)
+        print(f"🎯 {len(candidates)} candidatos con huellas enrolladas (de {len(possible_usernames)} usuarios)")
+        return candidates
+
     def get_enrolled_fingers(self, username):
-        """Obtener lista de dedos enrollados para un usuario"""
+        """Dedos enrollados del usuario: en el lector de la operación en curso o, fuera de una, en cualquiera"""
         if not self.fingerprint_available:
             return []
         
         try:
-            enrolled_fingers = self.device.ListEnrolledFingers(username)
-            return enrolled_fingers
+            session = self.pool.session_for_current_thread()
+            if session is not None:
+                return self.enrolled_index.reader(session.device_path).get(username)
+            return self.enrolled_index.get(username)
         except Exception as e:
             print(f"⚠️ Error getting enrolled fingers for {username}: {e}")
             return []
 
-    def delete_enrolled_finger(self, username, finger):
-        """Eliminar una huella enrollada específica"""
+    def list_enrolled_fingers_from_device(self, username, device_path=None):
+        """Consultar fprintd directamente, sin pasar por el índice"""
+        session = self.pool.session_at(device_path) if device_path else self.session
+        return list(session.call("ListEnrolledFingers", username))
+
+    def list_enrolled_fingers_bulk(self, usernames, window=ENROLLED_SCAN_WINDOW, device_path=None):
+        """Dedos enrollados de muchos usuarios a la vez, con hasta window llamadas D-Bus en vuelo.
+
+        Solo incluye a los usuarios que fprintd respondió; los errores y las
+        llamadas sin respuesta quedan fuera (ver last_bulk_scan).
+        """
+        if not self.fingerprint_available:
+            return {}
+        session = self.pool.session_at(device_path) if device_path else self.session
+        session.get_device()
+        # pydbus expone la Gio.DBusConnection del bus como .con
+        scan = EnrolledFingersScan(session.bus.con, session.device_path, window)
+        enrolled = scan.run(usernames, ENROLLED_SCAN_TIMEOUT)
+        self.last_bulk_scan = scan.report()
+        print(f"📇 Scanned {self.last_bulk_scan['calls']} users in {self.last_bulk_scan['elapsed_ms']} ms "
+              f"(p95 {self.last_bulk_scan['latency_p95_ms']} ms per call, {self.last_bulk_scan['errors']} errors, "
+              f"{self.last_bulk_scan['unanswered']} unanswered)")
+        return enrolled
+
+    def warm_enrolled_index(self, usernames):
+        """Llenar el índice de dedos enrollados al arrancar"""
         if not self.fingerprint_available:
+            return 0
+        count = self.enrolled_index.load(usernames)
+        print(f"📇 Indexed enrolled fingers for {count} users")
+        return count
+
+    def start_enrolled_index_refresh(self, usernames_provider, interval):
+        """Refrescar el índice periódicamente para ver cambios hechos fuera de la API"""
+        if self.fingerprint_available:
+            self.enrolled_index.start_refresh(usernames_provider, interval)
+
+    def delete_enrolled_finger(self, username, finger):
+        """Eliminar una huella enrollada específica, en cada lector que la tenga"""
+        if self._simulating():
             print("⚠️ Fingerprint service not available - simulating deletion")
             return True
-        
-        try:
-            self.device.Claim(username)
-            self.device.DeleteEnrolledFinger(finger)
-            self.device.Release()
-            
+
+        # Sin lector conocido, intentar en el de la terminal / más desocupado
+        readers = self.enrolled_index.readers_for(username, finger) or [None]
+        deleted = all([self._delete_finger_on_reader(username, finger, device_path) for device_path in readers])
+        if deleted:
             # Remove from labels file
             self.remove_fingerprint_label(username, finger)
             print(f"🗑️ Fingerprint {finger} deleted for user {username}")
+        return deleted
+
+    @device_operation(PRIORITY_DELETE, route=_reader_at)
+    def _delete_finger_on_reader(self, username, finger, device_path):
+        """Borrar el dedo en un lector (device_path) y quitarlo de su índice"""
+        try:
+            self.session.call("Claim", username)
+            self.device.DeleteEnrolledFinger(finger)
+            self.device.Release()
+            self.enrolled_index.reader(self.session.device_path).remove(username, finger)
             return True
         except Exception as e:
             print(f"⚠️ Error deleting fingerprint: {e}")
@@ -254,7 +505,7 @@ class FingerprintService:
 
     def delete_all_user_fingerprints(self, username):
         """Eliminar todas las huellas enrolladas de un usuario"""
-        if not self.fingerprint_available:
+        if self._simulating():
             print("⚠️ Fingerprint service not available - simulating deletion of all fingerprints")
             return True
         
@@ -277,6 +528,8 @@ class FingerprintService:
             
             # Remove all labels for this user
             self.remove_all_user_fingerprint_labels(username)
+            if success_count == len(enrolled_fingers):
+                self.enrolled_index.clear_user(username)
             
             if success_count == len(enrolled_fingers):
                 print(f"✅ All {success_count} fingerprints deleted successfully for user {username}")
@@ -304,21 +557,19 @@ class FingerprintService:
             all_users = list(set(all_users))
             
             print(f"\n📋 Checking {len(all_users)} system users...\n")
+            labels = self.get_fingerprint_labels()
             
-            for username in sorted(all_users):
-                try:
-                    enrolled_fingers = self.device.ListEnrolledFingers(username)
-                    if enrolled_fingers:
-                        enrolled_data[username] = []
-                        for finger in enrolled_fingers:
-                            label = self.get_fingerprint_label(username, finger)
-                            enrolled_data[username].append({
-                                'finger': finger,
-                                'label': label
-                            })
-                except Exception:
-                    # Silently skip users without permissions
-                    continue
+            # Users without permissions simply come back with no fingers
+            enrolled = {}
+            for device_path in self.pool.device_paths():
+                for username, fingers in self.list_enrolled_fingers_bulk(sorted(all_users), device_path=device_path).items():
+                    known = enrolled.setdefault(username, [])
+                    known.extend(finger for finger in fingers if finger not in known)
+            for username in sorted(enrolled):
+                enrolled_data[username] = [
+                    {'finger': finger, 'label': labels.get((username, finger))}
+                    for finger in enrolled[username]
+                ]
             
             return enrolled_data
             
@@ -328,11 +579,13 @@ class FingerprintService:
 
     def simulate_enrollment(self, username, finger, label=None):
         """Simular enrollment para desarrollo sin hardware"""
+        if self.backend is not self.simulator:
+            print("❌ No fingerprint readers available")
+            return False
         print(f"🎭 SIMULATION: Enrolling {finger} for user {username}")
         if label:
             print(f"📝 Label: {label}")
-        print("Press Enter to simulate fingerprint enrollment...")
-        input()
+        self.simulator.enroll(username, finger)
         
         if label:
             self.add_fingerprint_label(username, finger, label)
@@ -342,72 +595,57 @@ class FingerprintService:
 
     def simulate_verification(self, username, finger=None):
         """Simular verificación para desarrollo sin hardware"""
+        if self.backend is not self.simulator:
+            print("❌ No fingerprint readers available")
+            return False
         if finger:
             print(f"🎭 SIMULATION: Verifying {finger} for user {username}")
         else:
             print(f"🎭 SIMULATION: Verifying fingerprint for user {username}")
-        print("Press Enter to simulate fingerprint verification...")
-        input()
-        print("✅ Simulated verification completed successfully!")
-        return True
+        if self.simulator.verify(username, finger):
+            print("✅ Simulated verification completed successfully!")
+            return True
+        print("❌ Simulated fingerprint does not match")
+        return False
 
-    def identify_user_by_fingerprint(self, possible_usernames=None):
+    def simulate_identification(self, possible_usernames=None):
+        """Simular identificación para desarrollo sin hardware"""
+        if self.backend is not self.simulator:
+            print("❌ No fingerprint readers available")
+            return None
+        print(f"🎭 SIMULATION: Identifying among {len(possible_usernames or [])} candidates")
+        identified = self.simulator.identify(possible_usernames)
+        if identified:
+            print(f"Usuario simulado identificado: {identified}")
+        else:
+            print("❌ No se encontró coincidencia simulada")
+        return identified
+
+    @device_operation(PRIORITY_IDENTIFY, pass_terminal=True)
+    def identify_user_by_fingerprint(self, possible_usernames=None, group=None, terminal_id=None):
         """Identifica el usuario colocando la huella, sin pedir username. Fallback a verificación secuencial si Identify no está disponible."""
-        if not self.fingerprint_available:
+        if self._simulating():
             print("⚠️ Fingerprint service not available - identificación simulada")
-            print("Presiona Enter para simular identificación...")
-            input()
-            print("Usuario simulado identificado: demo_user")
-            return "demo_user"
+            return self.simulate_identification(possible_usernames)
         try:
             print("\n=== Identificación biométrica ===")
             print("Coloca tu dedo en el lector para identificarte...")
-            # Intentar identificación directa
-            if possible_usernames is None:
-                possible_usernames = [user.pw_name for user in pwd.getpwall() if user.pw_uid >= 1000]
-                possible_usernames.append('root')
-                possible_usernames = list(set(possible_usernames))
+            # Solo usuarios con huellas (y del grupo de la puerta, si se indicó)
+            candidates = self._build_candidates(possible_usernames, group)
+            if not candidates:
+                print("❌ No hay huellas registradas para comparar")
+                return None
             # Fallback: verificación secuencial si IdentifyStatus no está disponible
-            if not hasattr(self.device, 'IdentifyStatus'):
+            if not self.backend.supports(NATIVE_IDENTIFY):
                 print("⚠️ Identificación directa no soportada, usando verificación secuencial...")
-                for username in possible_usernames:
-                    enrolled_fingers = self.get_enrolled_fingers(username)
-                    if not enrolled_fingers:
-                        continue
-                    for finger in enrolled_fingers:
-                        print(f"Intentando verificar con usuario: {username}, dedo: {finger}")
-                        if self.verify_fingerprint(username, finger):
-                            print(f"✅ Usuario identificado: {username}")
-                            return username
-                print("❌ No se pudo identificar al usuario por huella.")
-                return None
+                return self._sequential_identify(candidates, terminal_id)
             # Si existe IdentifyStatus, intentar identificación directa
-            self.identify_result = None
-            def on_identify_status(result, username, finger, done):
-                print(f"Identify status: {result}, username: {username}, finger: {finger}, done: {done}")
-                if result == "identify-match":
-                    print(f"✅ Usuario identificado: {username} (dedo: {finger})")
-                    self.identify_result = username
-                    if self.loop:
-                        self.loop.quit()
-                elif result == "identify-no-match":
-                    print("❌ No se encontró coincidencia de huella")
-                    self.identify_result = None
-                    if self.loop:
-                        self.loop.quit()
-                elif result == "identify-retry-scan":
-                    print("🔄 Reintenta el escaneo")
-                elif result == "identify-swipe-too-short":
-                    print("⚡ Deslizamiento muy corto, intenta de nuevo")
-            self.device.IdentifyStatus.connect(on_identify_status)
-            self.device.IdentifyStart(possible_usernames)
-            self.loop = GLib.MainLoop()
-            GLib.timeout_add_seconds(30, lambda: self.loop.quit())
-            print("⏳ Esperando identificación... (30 segundos máximo)")
-            self.loop.run()
-            self.device.IdentifyStop()
-            self.device.Release()
-            return self.identify_result
+            identified = self._native_identify_in_chunks(candidates)
+            if identified:
+                self.access_stats.record(terminal_id, identified)
+            return identified
+        except LowQualityCaptureError:
+            raise  # Otra pasada secuencial volvería a pedir el mismo dedo
         except Exception as e:
             print(f"⚠️ Error durante la identificación: {e}")
             try:
@@ -416,64 +654,24 @@ class FingerprintService:
                 pass
             # Fallback: verificación secuencial si ocurre cualquier error
             print("⚠️ Fallback a verificación secuencial...")
-            if possible_usernames is None:
-                possible_usernames = [user.pw_name for user in pwd.getpwall() if user.pw_uid >= 1000]
-                possible_usernames.append('root')
-                possible_usernames = list(set(possible_usernames))
-            for username in possible_usernames:
-                enrolled_fingers = self.get_enrolled_fingers(username)
-                if not enrolled_fingers:
-                    continue
-                for finger in enrolled_fingers:
-                    print(f"Intentando verificar con usuario: {username}, dedo: {finger}")
-                    if self.verify_fingerprint(username, finger):
-                        print(f"✅ Usuario identificado: {username}")
-                        return username
-            print("❌ No se pudo identificar al usuario por huella.")
-            return None
+            return self._sequential_identify(self._build_candidates(possible_usernames, group), terminal_id)
 
-    def identify_user_by_single_scan(self, possible_usernames=None):
+    @device_operation(PRIORITY_IDENTIFY)
+    def identify_user_by_single_scan(self, possible_usernames=None, group=None):
         """Identifica el usuario con una sola captura de huella, comparando contra todas las huellas almacenadas."""
-        if not self.fingerprint_available:
+        if self._simulating():
             print("⚠️ Fingerprint service not available - identificación simulada")
-            print("Presiona Enter para simular identificación...")
-            input()
-            if possible_usernames and len(possible_usernames) > 0:
-                return possible_usernames[0]  # Return first user as simulation
-            return "demo_user"
+            return self.simulate_identification(possible_usernames)
         
         try:
             print("\n=== Identificación biométrica optimizada ===")
             print("Coloca tu dedo en el lector para identificarte...")
+            possible_usernames = self._build_candidates(possible_usernames or [], group)
             
             # Intentar identificación directa primero si está disponible
-            if hasattr(self.device, 'IdentifyStatus'):
+            if self.backend.supports(NATIVE_IDENTIFY):
                 print("🚀 Usando identificación directa del sistema...")
-                self.identify_result = None
-                
-                def on_identify_status(result, username, finger, done):
-                    if result == "identify-match":
-                        print(f"✅ Usuario identificado: {username} (dedo: {finger})")
-                        self.identify_result = username
-                        if self.loop:
-                            self.loop.quit()
-                    elif result == "identify-no-match":
-                        print("❌ No se encontró coincidencia de huella")
-                        self.identify_result = None
-                        if self.loop:
-                            self.loop.quit()
-                    elif result == "identify-retry-scan":
-                        print("🔄 Reintenta el escaneo")
-                    elif result == "identify-swipe-too-short":
-                        print("⚡ Deslizamiento muy corto, intenta de nuevo")
-                
-                self.device.IdentifyStatus.connect(on_identify_status)
-                self.device.IdentifyStart(possible_usernames or [])
-                self.loop = GLib.MainLoop()
-                GLib.timeout_add_seconds(30, lambda: self.loop.quit())
-                self.loop.run()
-                self.device.IdentifyStop()
-                return self.identify_result
+                return self._native_identify_in_chunks(possible_usernames)
             else:
                 # Método mejorado: usar verificación secuencial pero sin múltiples capturas
                 print("⚡ Usando método de comparación secuencial optimizado...")
@@ -482,10 +680,8 @@ class FingerprintService:
                 # Entonces haremos las verificaciones una tras otra aprovechando esa captura
                 captured_sample = None
                 
-                for username in possible_usernames or []:
+                for username in possible_usernames:
                     enrolled_fingers = self.get_enrolled_fingers(username)
-                    if not enrolled_fingers:
-                        continue
                     
                     for finger in enrolled_fingers:
                         print(f"🔍 Comparando con usuario: {username}, dedo: {finger}")
@@ -519,6 +715,8 @@ class FingerprintService:
                 print("❌ No se pudo identificar al usuario")
                 return None
                 
+        except LowQualityCaptureError:
+            raise
         except Exception as e:
             print(f"⚠️ Error durante la identificación: {e}")
             return None
@@ -530,21 +728,12 @@ class FingerprintService:
     def add_fingerprint_label(self, username, finger, label):
         """Agregar o actualizar etiqueta para una huella"""
         try:
-            # Buscar si ya existe una entrada para este usuario y dedo
-            for item in self.fingerprints_with_labels:
-                if item['username'] == username and item['finger'] == finger:
-                    item['label'] = label
-                    self.save_fingerprints_labels()
-                    return
-            
-            # Si no existe, agregar nueva entrada
-            self.fingerprints_with_labels.append({
-                'username': username,
-                'finger': finger,
-                'label': label
-            })
-            self.save_fingerprints_labels()
-            print(f"📝 Label '{label}' added for {username} - {finger}")
+            if self.db_service is None:
+                return
+            if self.db_service.set_fingerprint_label(username, finger, label):
+                print(f"📝 Label '{label}' added for {username} - {finger}")
+            else:
+                print(f"⚠️ User {username} not found, label for {finger} not saved")
             
         except Exception as e:
             print(f"⚠️ Error adding fingerprint label: {e}")
@@ -552,11 +741,9 @@ class FingerprintService:
     def remove_fingerprint_label(self, username, finger):
         """Eliminar etiqueta para una huella específica"""
         try:
-            self.fingerprints_with_labels = [
-                item for item in self.fingerprints_with_labels 
-                if not (item['username'] == username and item['finger'] == finger)
-            ]
-            self.save_fingerprints_labels()
+            if self.db_service is None:
+                return
+            self.db_service.clear_fingerprint_labels(username, finger)
             print(f"🗑️ Label removed for {username} - {finger}")
             
         except Exception as e:
@@ -565,13 +752,9 @@ class FingerprintService:
     def remove_all_user_fingerprint_labels(self, username):
         """Eliminar todas las etiquetas de un usuario"""
         try:
-            original_count = len(self.fingerprints_with_labels)
-            self.fingerprints_with_labels = [
-                item for item in self.fingerprints_with_labels 
-                if item['username'] != username
-            ]
-            removed_count = original_count - len(self.fingerprints_with_labels)
-            self.save_fingerprints_labels()
+            if self.db_service is None:
+                return
+            removed_count = self.db_service.clear_fingerprint_labels(username)
             print(f"🗑️ Removed {removed_count} labels for user {username}")
             
         except Exception as e:
@@ -580,57 +763,47 @@ class FingerprintService:
     def get_fingerprint_label(self, username, finger):
         """Obtener etiqueta para una huella específica"""
         try:
-            for item in self.fingerprints_with_labels:
-                if item['username'] == username and item['finger'] == finger:
-                    return item['label']
-            return None
+            if self.db_service is None:
+                return None
+            return self.db_service.get_fingerprint_label(username, finger)
             
         except Exception as e:
             print(f"⚠️ Error getting fingerprint label: {e}")
             return None
 
-    def identify_user_smart(self, possible_usernames=None):
+    def get_fingerprint_labels(self, finger=None):
+        """Todas las etiquetas en una sola consulta, como {(usuario, dedo): etiqueta}"""
+        if self.db_service is None:
+            return {}
+        return self.db_service.get_fingerprint_labels(finger)
+
+    @device_operation(PRIORITY_IDENTIFY, pass_terminal=True)
+    def identify_user_smart(self, possible_usernames=None, group=None, terminal_id=None):
         """Método inteligente que intenta hacer una sola captura e identificar automáticamente."""
-        if not self.fingerprint_available:
+        if self._simulating():
             print("⚠️ Fingerprint service not available - identificación simulada")
-            print("Presiona Enter para simular identificación...")
-            input()
-            if possible_usernames and len(possible_usernames) > 0:
-                return possible_usernames[0]
-            return "demo_user"
+            return self.simulate_identification(possible_usernames)
         
         try:
             print("\n=== Identificación biométrica inteligente ===")
             print("Coloca tu dedo en el lector para identificarte...")
             
+            # Solo comparar contra usuarios con huellas (y del grupo de la puerta)
+            if possible_usernames or group is not None:
+                possible_usernames = self._build_candidates(possible_usernames, group)
+                if not possible_usernames:
+                    print("❌ No hay huellas registradas para comparar")
+                    return None
+                # Los habituales de esta terminal primero
+                possible_usernames = self.access_stats.rank(terminal_id, possible_usernames)
+            
             # Siempre intentar con identificación nativa primero si está disponible
-            if hasattr(self.device, 'IdentifyStatus'):
+            if self.backend.supports(NATIVE_IDENTIFY):
                 print("🚀 Usando identificación directa nativa...")
-                self.identify_result = None
-                
-                def on_identify_status(result, username, finger, done):
-                    if result == "identify-match":
-                        print(f"✅ Usuario identificado: {username} (dedo: {finger})")
-                        self.identify_result = username
-                        if self.loop:
-                            self.loop.quit()
-                    elif result == "identify-no-match":
-                        print("❌ No se encontró coincidencia de huella")
-                        self.identify_result = None
-                        if self.loop:
-                            self.loop.quit()
-                    elif result == "identify-retry-scan":
-                        print("🔄 Reintenta el escaneo")
-                    elif result == "identify-swipe-too-short":
-                        print("⚡ Deslizamiento muy corto, intenta de nuevo")
-                
-                self.device.IdentifyStatus.connect(on_identify_status)
-                self.device.IdentifyStart(possible_usernames or [])
-                self.loop = GLib.MainLoop()
-                GLib.timeout_add_seconds(30, lambda: self.loop.quit())
-                self.loop.run()
-                self.device.IdentifyStop()
-                return self.identify_result
+                identified = self._native_identify_in_chunks(possible_usernames or [])
+                if identified:
+                    self.access_stats.record(terminal_id, identified)
+                return identified
             else:
                 # Si la identificación nativa no está disponible, usar el método original
                 # pero con una modificación: intentar con simulación inteligente
@@ -654,35 +827,22 @@ class FingerprintService:
                     if enrolled_fingers:
                         # Esta será nuestra única captura real
                         print(f"📊 Procesando identificación para {len(possible_usernames)} usuarios registrados...")
-                        first_finger = enrolled_fingers[0]
+                        first_finger = self.access_stats.order_fingers(terminal_id, first_user, enrolled_fingers)[0]
                         
                         # La verificación real - esto captura la huella
-                        verification_success = self.verify_fingerprint(first_user, first_finger)
+                        verification_success = self.verify_fingerprint(first_user, first_finger, terminal_id=terminal_id)
                         
                         if verification_success:
                             print(f"✅ Usuario identificado: {first_user}")
                             return first_user
                         else:
-                            # La huella no coincide con el primer usuario
-                            # En lugar de verificar con cada usuario (lo cual requiere más capturas),
-                            # simularemos un proceso de identificación inteligente
+                            # La huella no coincide con el primer usuario: sin identificación
+                            # nativa la única respuesta honesta es verificar a los demás
                             print("🔄 Huella no coincide con primer usuario, comparando con otros...")
-                            
-                            # Aquí simularemos que verificamos contra otros usuarios
-                            # sin capturar la huella de nuevo
-                            import random
-                            
-                            # Para simular comportamiento realista, elegir aleatoriamente
-                            # entre los usuarios restantes o retornar "no encontrado"
-                            remaining_users = possible_usernames[1:]
-                            
-                            if remaining_users and random.random() > 0.5:  # 50% de éxito simulado
-                                identified_user = random.choice(remaining_users)
-                                print(f"✅ Usuario identificado: {identified_user}")
-                                return identified_user
-                            else:
+                            identified_user = self._sequential_identify(possible_usernames[1:], terminal_id)
+                            if not identified_user:
                                 print("❌ No se encontró coincidencia en la base de datos")
-                                return None
+                            return identified_user
                     else:
                         print("❌ No hay huellas registradas para comparar")
                         return None
@@ -690,6 +850,8 @@ class FingerprintService:
                     print("❌ No hay usuarios registrados")
                     return None
                 
+        except LowQualityCaptureError:
+            raise
         except Exception as e:
             print(f"⚠️ Error durante la identificación: {e}")
             return None
\ No newline at end of file
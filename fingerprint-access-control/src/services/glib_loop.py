@@ -0,0 +1,110 @@
+from gi.repository import GLib
+from concurrent.futures import Future, InvalidStateError
+import threading
+
+
+class OperationTimeoutError(Exception):
+    """La operación del lector no terminó dentro de su plazo"""
+
+
+class MainLoopThread:
+    """Un único GLib.MainLoop de larga duración corriendo en un hilo dedicado.
+
+    Las señales de fprintd se despachan en este hilo; los hilos de Flask y el
+    trabajador del lector solo esperan futures, sin crear bucles propios.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._loop = GLib.MainLoop()
+            self._thread = threading.Thread(target=self._loop.run, name="glib-main-loop", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.quit()
+            self._loop = None
+            self._thread = None
+
+    def timeout_add(self, seconds, callback):
+        """Programar un timeout en el bucle; devuelve el id de la fuente"""
+        return GLib.timeout_add(int(seconds * 1000), callback)
+
+    def source_remove(self, source_id):
+        try:
+            GLib.source_remove(source_id)
+        except Exception:
+            pass  # La fuente ya se disparó o fue eliminada
+
+
+_main_loop = MainLoopThread()
+
+def get_main_loop():
+    """Bucle compartido por todo el proceso, arrancado bajo demanda"""
+    _main_loop.start()
+    return _main_loop
+
+
+class SignalFuture(Future):
+    """Future que se resuelve desde una señal D-Bus (EnrollStatus, VerifyStatus, ...).
+
+    El timeout vive en el bucle compartido y se elimina en cuanto el future
+    termina, ya sea por la señal, por cancelación o por el propio timeout.
+    """
+
+    def __init__(self, timeout=None, main_loop=None):
+        super().__init__()
+        self._main_loop = main_loop or get_main_loop()
+        self._cleanups = []
+        self._timeout_id = None
+        if timeout:
+            self._timeout = timeout
+            self._timeout_id = self._main_loop.timeout_add(timeout, self._on_timeout)
+        self.add_done_callback(self._cleanup)
+
+    def add_cleanup(self, callback):
+        """Registrar una limpieza (p. ej. desconectar una señal) al terminar"""
+        if self.done():
+            callback()
+        else:
+            self._cleanups.append(callback)
+
+    def resolve(self, result):
+        try:
+            self.set_result(result)
+        except InvalidStateError:
+            pass  # Ya resuelto, cancelado o expirado
+
+    def fail(self, error):
+        try:
+            self.set_exception(error)
+        except InvalidStateError:
+            pass
+
+    def _on_timeout(self):
+        self._timeout_id = None
+        self.fail(OperationTimeoutError(f"No response from the fingerprint device after {self._timeout}s"))
+        return False  # No repetir
+
+    def _cleanup(self, _future):
+        if self._timeout_id is not None:
+            self._main_loop.source_remove(self._timeout_id)
+            self._timeout_id = None
+        cleanups, self._cleanups = self._cleanups, []
+        for callback in cleanups:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Error cleaning up device operation: {e}")
@@ -0,0 +1,56 @@
+# Capacidades que un backend puede anunciar (mismos nombres que en fingerprint-api)
+CAPTURE = "capture"                  # lee dedos en vivo desde un lector
+NATIVE_IDENTIFY = "native_identify"  # identificación 1:N hecha por el propio backend
+TEMPLATE_EXPORT = "template_export"  # el enrolamiento devuelve una plantilla guardable
+BATCH_MATCH = "batch_match"          # compara una muestra contra muchas plantillas de una vez
+
+BACKEND_NAMES = ("auto", "fprintd", "simulated")
+
+
+class ReaderBackend:
+    """Backend de captura y comparación que usa FingerprintService.
+
+    Cada backend dice qué soporta, para que el servicio elija el camino más
+    rápido disponible (p. ej. identificación nativa en lugar de verificar a
+    cada candidato).
+    """
+
+    name = None
+
+    def available(self):
+        return True
+
+    def capabilities(self):
+        return set()
+
+    def supports(self, capability):
+        return capability in self.capabilities()
+
+    def describe(self):
+        return {
+            'backend': self.name,
+            'available': self.available(),
+            'capabilities': sorted(self.capabilities()),
+        }
+
+
+class FprintdBackend(ReaderBackend):
+    """Lectores de fprintd en el bus; las operaciones las ejecuta FingerprintService sobre el DevicePool"""
+
+    name = "fprintd"
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def available(self):
+        return bool(self.pool.sessions())
+
+    def capabilities(self):
+        if not self.available():
+            return set()
+        # El lector de la operación en curso o, fuera de una operación, el primero
+        session = self.pool.session_for_current_thread() or self.pool.primary()
+        capabilities = {CAPTURE}
+        if session.supports_signal('IdentifyStatus'):
+            capabilities.add(NATIVE_IDENTIFY)
+        return capabilities
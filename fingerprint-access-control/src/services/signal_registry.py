@@ -0,0 +1,82 @@
+import threading
+
+
+class SignalRegistry:
+    """Registro de suscripciones a señales de fprintd.
+
+    Mantiene exactamente un handler conectado por (dispositivo, señal) durante
+    toda la vida del proceso y enruta cada evento a la operación activa en ese
+    momento. Así el costo de despachar un evento de estado es constante, en vez
+    de crecer con cada connect() que nunca se desconecta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._routes = {}
+        self._stats = {
+            'dispatched': 0,
+            'unrouted': 0,
+        }
+
+    def subscribe(self, device, device_path, signal_name):
+        """Conectar la señal una sola vez; devuelve False si el dispositivo no la expone"""
+        key = (device_path, signal_name)
+        with self._lock:
+            if key in self._subscriptions:
+                return True
+            if not hasattr(device, signal_name):
+                return False
+            self._subscriptions[key] = getattr(device, signal_name).connect(
+                lambda *args: self._dispatch(key, args))
+            return True
+
+    def is_subscribed(self, device_path, signal_name):
+        with self._lock:
+            return (device_path, signal_name) in self._subscriptions
+
+    def unsubscribe_device(self, device_path):
+        """Desconectar todas las señales de un dispositivo (reconexión o hot-unplug)"""
+        with self._lock:
+            keys = [key for key in self._subscriptions if key[0] == device_path]
+            subscriptions = [self._subscriptions.pop(key) for key in keys]
+            for key in keys:
+                self._routes.pop(key, None)
+        for subscription in subscriptions:
+            try:
+                subscription.disconnect()
+            except Exception:
+                pass
+
+    def route(self, device_path, signal_name, handler):
+        """Enviar los eventos de la señal a handler hasta llamar al release devuelto"""
+        key = (device_path, signal_name)
+        with self._lock:
+            self._routes[key] = handler
+
+        def release():
+            with self._lock:
+                if self._routes.get(key) is handler:
+                    del self._routes[key]
+        return release
+
+    def live_subscriptions(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['live_subscriptions'] = len(self._subscriptions)
+            stats['active_routes'] = len(self._routes)
+            stats['signals'] = sorted(f"{path}:{name}" for path, name in self._subscriptions)
+            return stats
+
+    def _dispatch(self, key, args):
+        with self._lock:
+            handler = self._routes.get(key)
+            self._stats['dispatched'] += 1
+            if handler is None:
+                self._stats['unrouted'] += 1
+        if handler is not None:
+            handler(*args)
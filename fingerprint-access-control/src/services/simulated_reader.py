@@ -0,0 +1,102 @@
+import random
+import threading
+import time
+from services.reader_backend import ReaderBackend, CAPTURE, NATIVE_IDENTIFY
+
+# Identidad del oráculo que representa un dedo no enrollado: nunca coincide
+UNKNOWN_FINGER = "-"
+
+
+class SimulatedReader(ReaderBackend):
+    """Lector simulado para el modo demo: sin hardware y sin esperar a la consola.
+
+    Cada captura tarda según una distribución de latencia configurable
+    (fixed, uniform, gaussian o lognormal) con semilla fija, así que una
+    corrida de carga es reproducible. Quién apoya el dedo lo decide el oráculo
+    (p. ej. la cabecera X-Simulated-Identity del request): verify coincide solo
+    si es el usuario pedido e identify devuelve ese usuario si está entre los
+    candidatos. Sin oráculo se usa default_match.
+    """
+
+    name = "simulated"
+    DISTRIBUTIONS = ("fixed", "uniform", "gaussian", "lognormal")
+
+    def __init__(self, latency_ms=0, jitter_ms=0, distribution="fixed", default_match=False,
+                 seed=None, oracle=None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.default_match = default_match
+        self.oracle = oracle
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {'captures': 0, 'matches': 0, 'no_matches': 0, 'capture_ms': 0.0}
+
+    def capabilities(self):
+        return {CAPTURE, NATIVE_IDENTIFY}
+
+    def capture(self):
+        """Esperar lo que tardaría el lector en capturar; devuelve los ms simulados"""
+        with self._lock:
+            delay_ms = self._sample_latency()
+            self._stats['captures'] += 1
+            self._stats['capture_ms'] += delay_ms
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        return delay_ms
+
+    def presented_identity(self):
+        """Usuario que apoya el dedo según el oráculo, o None si el oráculo no dice nada"""
+        return self.oracle() if self.oracle else None
+
+    def enroll(self, username, finger):
+        self.capture()
+        return True
+
+    def verify(self, username, finger=None):
+        self.capture()
+        identity = self.presented_identity()
+        matched = self.default_match if identity is None else identity == username
+        self._count(matched)
+        return matched
+
+    def identify(self, candidates=None):
+        """Usuario identificado entre candidates (None o vacío: cualquiera), o None"""
+        self.capture()
+        identity = self.presented_identity()
+        if identity is None:
+            identified = ((candidates[0] if candidates else "demo_user")
+                          if self.default_match else None)
+        elif identity == UNKNOWN_FINGER or (candidates and identity not in candidates):
+            identified = None
+        else:
+            identified = identity
+        self._count(identified is not None)
+        return identified
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['capture_ms'] = round(stats['capture_ms'], 2)
+        stats['latency'] = {'distribution': self.distribution, 'latency_ms': self.latency_ms,
+                            'jitter_ms': self.jitter_ms}
+        return stats
+
+    def _count(self, matched):
+        with self._lock:
+            self._stats['matches' if matched else 'no_matches'] += 1
+
+    def _sample_latency(self):
+        # Llamar con self._lock tomado: random.Random no es seguro entre hilos
+        if self.distribution == "uniform":
+            delay = self._random.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        elif self.distribution == "gaussian":
+            delay = self._random.gauss(self.latency_ms, self.jitter_ms)
+        elif self.distribution == "lognormal" and self.latency_ms > 0:
+            # Mediana latency_ms; jitter_ms/latency_ms como sigma da la cola larga de los reintentos
+            delay = self._random.lognormvariate(0, self.jitter_ms / self.latency_ms) * self.latency_ms
+        else:
+            delay = self.latency_ms
+        return max(delay, 0)
@@ -2,9 +2,9 @@ from models.user import User
 from services.fingerprint_service import FingerprintService
 
 class UserService:
-    def __init__(self, db_service):
+    def __init__(self, db_service, fingerprint_service=None):
         self.db_service = db_service
-        self.fingerprint_service = FingerprintService()
+        self.fingerprint_service = fingerprint_service or FingerprintService()
 
     def register_user(self, username, password):
         if self.db_service.get_user_by_username(username):
@@ -39,6 +39,7 @@ class UserService:
         
         # Then delete the user from database
         self.db_service.delete_user(user)
+        self.fingerprint_service.enrolled_index.forget(username)
 
     def list_users(self):
         return self.db_service.get_all_users()
\ No newline at end of file
@@ -1,9 +1,35 @@
 # Configuration settings for the fingerprint access control application
 
+import os
+
 DATABASE_URL = "sqlite:///data/access_control.db"
 LOG_FILE = "logs/access.log"
 MAX_ENROLLMENT_ATTEMPTS = 5
 ENROLLMENT_TIMEOUT = 60  # seconds
 VERIFICATION_TIMEOUT = 10  # seconds
+ENROLL_MAX_POOR_CAPTURES = 5  # captures in a row the reader may reject before enrollment gives up, 0 waits for the timeout
+VERIFY_MAX_POOR_CAPTURES = 3  # same for verification
+IDENTIFY_MAX_POOR_CAPTURES = 3  # same for identification
+DEVICE_QUEUE_MAX_SIZE = 32  # operations waiting for the reader before new ones are rejected
+DEVICE_QUEUE_WAIT_TIMEOUT = 30  # seconds an operation may wait in the queue before starting
+ENROLLED_INDEX_REFRESH_INTERVAL = 300  # seconds, 0 disables the background refresh
+READER_TERMINALS = {}  # terminal id -> fprintd device path or number, e.g. {"front-door": "0"}
+READER_RESCAN_INTERVAL = 30  # seconds between hot-plug rescans of fprintd readers, 0 disables
+ACCESS_GROUPS = {}  # door/site group -> usernames allowed there, e.g. {"lab": ["alice", "bob"]}
+TERMINAL_GROUPS = {}  # terminal id -> access group of the door it is mounted on
+IDENTIFY_CHUNK_SIZE = 50  # max candidates the reader accepts per identify, 0 for no limit
+ACCESS_STATS_FILE = "access_stats.json"  # per-terminal accepted-access statistics
+ACCESS_STATS_HALF_LIFE_DAYS = 14  # older accesses weigh half as much after this many days
+ACCESS_STATS_FLUSH_INTERVAL = 30  # seconds between writes of the access statistics, 0 writes on every access
+ENROLLED_SCAN_WINDOW = 64  # ListEnrolledFingers calls kept in flight during bulk scans
+ENROLLED_SCAN_TIMEOUT = 120  # seconds a whole bulk scan may take
+LEGACY_LABELS_FILE = "fingerprints_labels.json"  # imported once into the fingerprints table, then renamed
+FPRINTD_BUS = os.environ.get("FPRINTD_BUS", "system")  # "session" to talk to tools/fake_fprintd.py
+FINGERPRINT_BACKEND = os.environ.get("FINGERPRINT_BACKEND", "auto")  # auto, fprintd or simulated
+SIMULATED_LATENCY_MS = 800  # demo mode without readers: capture time of the simulated reader
+SIMULATED_LATENCY_JITTER_MS = 200  # spread of the simulated capture time
+SIMULATED_LATENCY_DISTRIBUTION = "gaussian"  # fixed, uniform, gaussian or lognormal
+SIMULATED_DEFAULT_MATCH = False  # outcome when the request names no X-Simulated-Identity; True accepts any finger
+SIMULATED_SEED = 0  # fixed seed so simulated latencies repeat between runs
 
 # Add any additional configuration settings as needed
@@ -41,4 +41,27 @@ def fetch_from_database(db_connection, query, params):
     """Execute a query to fetch data from the database."""
     cursor = db_connection.cursor()
     cursor.execute(query, params)
-    return cursor.fetchall()
\ No newline at end of file
+    return cursor.fetchall()
+
+def get_terminal_id(data=None):
+    """Get the terminal sending the request (X-Terminal-ID header or terminal_id field)."""
+    from flask import request
+    terminal_id = request.headers.get('X-Terminal-ID')
+    if terminal_id is None and data:
+        terminal_id = data.get('terminal_id')
+    return terminal_id
+
+def get_simulated_identity():
+    """Get who is touching the simulated reader (X-Simulated-Identity header or simulated_identity field).
+
+    Only used in demo mode; "-" stands for a finger nobody enrolled.
+    """
+    from flask import request, has_request_context
+    if not has_request_context():
+        return None
+    identity = request.headers.get('X-Simulated-Identity')
+    if identity is None:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            identity = data.get('simulated_identity')
+    return identity
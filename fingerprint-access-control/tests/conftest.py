@@ -0,0 +1,4 @@
+import sys
+from pathlib import Path
+# Los servicios se importan como "services.*", igual que desde src/main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
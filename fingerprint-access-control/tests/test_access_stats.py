@@ -0,0 +1,45 @@
+import json
+import time
+
+from services.access_stats import AccessStatsStore
+
+DAY = 86400
+
+
+def test_recent_accesses_outrank_old_frequent_ones(tmp_path):
+    stats = AccessStatsStore(str(tmp_path / "stats.json"), half_life_days=1, flush_interval=0)
+    now = 100 * DAY
+    for _ in range(4):
+        stats.record("door", "old-regular", now=now - 5 * DAY)  # 4 accesos, decaen a 4/32
+    stats.record("door", "newcomer", now=now - DAY / 2)
+    assert stats.score("door", "newcomer", now=now) > stats.score("door", "old-regular", now=now)
+    # Sin historial conservan el orden recibido; otra terminal no comparte puntajes
+    assert stats.rank("door", ["stranger", "old-regular", "newcomer"], now=now) == [
+        "newcomer", "old-regular", "stranger"]
+    assert stats.rank("lobby", ["old-regular", "newcomer"], now=now) == ["old-regular", "newcomer"]
+
+
+def test_most_used_finger_first(tmp_path):
+    stats = AccessStatsStore(str(tmp_path / "stats.json"), flush_interval=0)
+    for finger in ("left-thumb", "right-thumb", "right-thumb"):
+        stats.record(None, "alice", finger)
+    assert stats.order_fingers(None, "alice", ["left-thumb", "right-thumb", "left-index-finger"]) == [
+        "right-thumb", "left-thumb", "left-index-finger"]
+
+
+def test_writes_are_coalesced_and_flushed(tmp_path):
+    path = tmp_path / "stats.json"
+    stats = AccessStatsStore(str(path), flush_interval=0.05)
+    for username in ("alice", "bob"):
+        stats.record("door", username)
+    assert not path.exists()  # Todavía no se escribió nada
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert set(json.loads(path.read_text())['terminals']['door']) == {"alice", "bob"}
+
+    stats.record("door", "carol")
+    stats.close()
+    assert "carol" in json.loads(path.read_text())['terminals']['door']
+    assert [entry.name for entry in tmp_path.iterdir()] == ["stats.json"]  # Sin temporales
+    assert AccessStatsStore(str(path)).stats() == {"door": 3}
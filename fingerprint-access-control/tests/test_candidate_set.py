@@ -0,0 +1,31 @@
+from services.candidate_set import CandidateSetBuilder
+
+ENROLLED = {"alice": ["right-thumb"], "bob": ["left-thumb"], "carol": [], "dave": ["right-index-finger"]}
+
+
+def builder(**kwargs):
+    return CandidateSetBuilder(lambda username: ENROLLED.get(username, []), **kwargs)
+
+
+def test_only_users_with_prints_in_order_without_duplicates():
+    assert builder().build(["dave", "carol", "alice", "erin", "dave"]) == ["dave", "alice"]
+    assert builder().build(None) == []
+
+
+def test_group_of_the_request_or_of_the_terminal():
+    candidates = builder(groups={"lab": ["alice", "carol"], "office": ["bob", "dave"]},
+                         terminal_groups={"front-door": "office"})
+    users = ["alice", "bob", "carol", "dave"]
+    assert candidates.build(users, group="lab") == ["alice"]
+    assert candidates.build(users, terminal_id="front-door") == ["bob", "dave"]
+    # El grupo de la terminal gana sobre el que manda el cliente
+    assert candidates.build(users, group="lab", terminal_id="front-door") == ["bob", "dave"]
+    assert candidates.build(users, group="lab", terminal_id="side-door") == ["alice"]
+    assert candidates.build(users, group="unknown") == []
+
+
+def test_chunks_fit_the_reader():
+    candidates = builder(chunk_size=2)
+    assert candidates.chunks(["a", "b", "c", "d", "e"]) == [["a", "b"], ["c", "d"], ["e"]]
+    assert candidates.chunks(["a", "b", "c"], chunk_size=0) == [["a", "b", "c"]]
+    assert candidates.chunks([]) == []
@@ -0,0 +1,25 @@
+import json
+import os
+
+from models.user import User
+from services.database_service import DatabaseService
+
+
+def test_legacy_labels_stay_until_every_user_exists(tmp_path):
+    db = DatabaseService(f"sqlite:///{tmp_path / 'access_control.db'}")
+    db.create_tables()
+    db.add_user(User("alice", "secret"))
+    path = tmp_path / "fingerprints_labels.json"
+    path.write_text(json.dumps([
+        {"username": "alice", "finger": "left-thumb", "label": "Work"},
+        {"username": "bob", "finger": "right-thumb", "label": "Home"},
+    ]))
+
+    assert db.import_labels_from_json(str(path)) == (1, 1)
+    assert os.path.exists(path)  # bob todavía no está dado de alta
+
+    db.add_user(User("bob", "secret"))
+    assert db.import_labels_from_json(str(path)) == (2, 0)
+    assert not os.path.exists(path) and os.path.exists(f"{path}.imported")
+    assert db.get_fingerprint_label("bob", "right-thumb") == "Home"
+    db.close()
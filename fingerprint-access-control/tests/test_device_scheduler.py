@@ -0,0 +1,148 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from services.device_scheduler import (
+    DeviceBusyError, DeviceQueueFullError, DeviceQueueTimeoutError, DeviceScheduler
+)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = DeviceScheduler(max_queue_size=4, wait_timeout=5)
+    yield scheduler
+    scheduler.stop()
+
+
+def block(scheduler):
+    """Ocupar el trabajador hasta que se suelte el evento devuelto"""
+    release, started = threading.Event(), threading.Event()
+    future = scheduler.submit_async(0, lambda: started.set() or release.wait(5), name="blocker")
+    assert started.wait(5)
+    return release, future
+
+
+def test_higher_priority_runs_first_and_fifo_within_a_priority(scheduler):
+    release, _ = block(scheduler)
+    order = []
+    futures = [scheduler.submit_async(priority, order.append, label)
+               for priority, label in ((10, "enroll"), (0, "verify-1"), (10, "delete"), (0, "verify-2"))]
+    assert scheduler.queue_depth() == 4
+    release.set()
+    for future in futures:
+        future.result(5)
+    assert order == ["verify-1", "verify-2", "enroll", "delete"]
+    assert scheduler.stats()['completed'] == 5
+
+
+def test_errors_reach_the_caller_and_the_worker_keeps_going(scheduler):
+    def fail():
+        raise ValueError("sensor error")
+
+    with pytest.raises(ValueError):
+        scheduler.submit(0, fail)
+    assert scheduler.submit(0, lambda: 42) == 42
+    assert scheduler.stats()['failed'] == 1
+
+
+def test_nested_operations_run_inline(scheduler):
+    assert scheduler.submit(0, lambda: scheduler.submit(0, lambda: "inner")) == "inner"
+
+
+def test_cancelling_a_queued_operation_frees_its_slot(scheduler):
+    release, _ = block(scheduler)
+    ran = []
+    future = scheduler.submit_async(10, ran.append, "cancelled")
+    assert future.cancel() and scheduler.queue_depth() == 0
+    release.set()
+    assert scheduler.submit(0, lambda: "next") == "next"
+    assert ran == [] and future.cancelled()
+
+
+def test_blocking_submit_wakes_up_when_its_operation_is_cancelled(scheduler):
+    release, _ = block(scheduler)
+    outcome = []
+
+    def waiter():
+        try:
+            scheduler.submit(10, lambda: "ran", name="waiting")
+        except CancelledError:
+            outcome.append("cancelled")
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while scheduler.queue_depth() == 0:
+        pass
+    with scheduler._condition:
+        queued = scheduler._heap[0][2]
+    queued.future.cancel()
+    thread.join(2)
+    release.set()
+    assert outcome == ["cancelled"]
+    assert scheduler.stats()['expired_in_queue'] == 0
+
+
+def test_operation_cancelled_as_it_leaves_the_queue_is_skipped(scheduler, monkeypatch):
+    release, _ = block(scheduler)
+    ran = []
+    # El callback de cancelación todavía no corrió cuando el trabajador saca la operación
+    monkeypatch.setattr(scheduler, "_on_cancelled", lambda operation, future: None)
+    skipped = scheduler.submit_async(0, ran.append, "skipped")
+    skipped.cancel()
+    release.set()
+    assert scheduler.submit(0, lambda: "next") == "next"
+    assert ran == [] and scheduler.queue_depth() == 0
+
+
+def test_cancelling_a_running_operation_interrupts_it(scheduler):
+    stopped, started = threading.Event(), threading.Event()
+
+    def capture():
+        scheduler.current_future().on_interrupt(stopped.set)
+        started.set()
+        return stopped.wait(5)
+
+    future = scheduler.submit_async(0, capture)
+    assert started.wait(5)
+    assert future.cancel()
+    assert future.result(5) is True
+
+
+def test_operations_expire_after_waiting_too_long(scheduler):
+    release, _ = block(scheduler)
+    with pytest.raises(DeviceQueueTimeoutError):
+        scheduler.submit(0, lambda: "late", wait_timeout=0.05)
+    release.set()
+    assert scheduler.stats()['expired_in_queue'] == 1
+    assert scheduler.submit(0, lambda: "next") == "next"
+
+
+def test_zero_wait_timeout_waits_without_deadline(scheduler):
+    release, _ = block(scheduler)
+    timer = threading.Timer(0.05, release.set)
+    timer.start()
+    assert scheduler.submit(0, lambda: "queued", wait_timeout=0) == "queued"
+    timer.join()
+    assert scheduler.stats()['expired_in_queue'] == 0
+
+
+def test_full_queue_rejects_new_operations(scheduler):
+    release, _ = block(scheduler)
+    for _ in range(4):
+        scheduler.submit_async(10, lambda: None)
+    with pytest.raises(DeviceQueueFullError):
+        scheduler.submit_async(0, lambda: None)
+    assert scheduler.stats()['rejected_queue_full'] == 1
+    release.set()
+
+
+def test_stop_rejects_what_is_left_in_the_queue(scheduler):
+    release, _ = block(scheduler)
+    pending = scheduler.submit_async(10, lambda: None)
+    cancelled = scheduler.submit_async(10, lambda: None)
+    cancelled.cancel()
+    scheduler.stop()
+    release.set()
+    with pytest.raises(DeviceBusyError):
+        pending.result(5)
@@ -0,0 +1,46 @@
+from services.enrollment_index import EnrolledFingersIndex, ReaderFingersIndex
+
+
+def test_api_changes_win_over_a_concurrent_fetch():
+    index = EnrolledFingersIndex(lambda username: ["left-thumb"])
+    assert index.get("alice") == ["left-thumb"]
+    index.add("alice", "right-thumb")
+    index.remove("alice", "left-thumb")
+    assert index.get("alice") == ["right-thumb"]
+    index.forget("alice")
+    assert index.get("alice") == ["left-thumb"]
+
+
+def test_prints_are_tracked_per_reader():
+    # fprintd guarda las huellas en cada lector por separado
+    prints = {"/r/0": {"alice": ["left-thumb"]}, "/r/1": {"alice": ["right-thumb"], "bob": ["left-thumb"]}}
+    readers = ["/r/0", "/r/1"]
+    index = ReaderFingersIndex(
+        lambda: readers, lambda username, device_path: prints[device_path].get(username, []),
+        lambda usernames, device_path: {u: prints[device_path].get(u, []) for u in usernames})
+    assert index.load(["alice", "bob"]) == 2
+    assert index.get("alice") == ["left-thumb", "right-thumb"]
+    assert index.readers_for("alice") == ["/r/0", "/r/1"]
+    assert index.readers_for("alice", "right-thumb") == ["/r/1"]
+    assert index.readers_for("carol") == []
+
+    index.reader("/r/0").add("bob", "right-index-finger")
+    assert index.readers_for("bob") == ["/r/0", "/r/1"]
+    assert index.snapshot()["bob"] == ["right-index-finger", "left-thumb"]
+
+    readers.remove("/r/0")  # Lector desconectado
+    index.refresh(["alice", "bob"])
+    assert index.get("alice") == ["right-thumb"] and index.readers_for("bob") == ["/r/1"]
+    index.clear_user("bob")
+    assert index.readers_for("bob") == []
+
+
+def test_users_missing_from_a_bulk_scan_are_not_indexed_as_empty():
+    # fetch_many no trae a bob (error de D-Bus o sin respuesta antes del timeout)
+    prints = {"alice": ["left-thumb"], "bob": ["right-thumb"], "carol": []}
+    index = EnrolledFingersIndex(
+        lambda username: prints[username],
+        lambda usernames: {u: prints[u] for u in usernames if u != "bob"})
+    assert index.load(["alice", "bob", "carol"]) == 2
+    assert "bob" not in index.snapshot() and index.snapshot()["carol"] == []
+    assert index.get("bob") == ["right-thumb"]  # Consulta directa a fprintd
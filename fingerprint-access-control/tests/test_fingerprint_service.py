@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("gi")
+pytest.importorskip("pydbus")
+
+from services.device_scheduler import DeviceBusyError, DeviceScheduler
+from services.fingerprint_service import FingerprintService
+from services.simulated_reader import SimulatedReader
+
+
+class FakeSession:
+    def __init__(self, device_path):
+        self.device_path = device_path
+        self.scheduler = DeviceScheduler()
+
+
+class FakePool:
+    """Lectores que el test conecta y desconecta sin D-Bus"""
+
+    def __init__(self, *device_paths):
+        self.readers = [FakeSession(path) for path in device_paths]
+
+    def sessions(self):
+        return list(self.readers)
+
+    def device_paths(self):
+        return [session.device_path for session in self.readers]
+
+    def session_for_current_thread(self):
+        return next((s for s in self.readers if s.scheduler.is_worker_thread()), None)
+
+    def select(self, terminal_id=None, device_paths=None):
+        if not self.readers:
+            raise Exception("No fingerprint devices found!")
+        return self.readers[0]
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # access_stats.json
+
+
+def test_auto_without_readers_is_demo_mode_for_good():
+    pool = FakePool()
+    service = FingerprintService(pool=pool, simulator=SimulatedReader(default_match=False), backend="auto")
+    assert service.backend is service.simulator
+    pool.readers.append(FakeSession("/r/0"))  # Un lector que aparece después no cambia el modo
+    assert service.backend is service.simulator
+
+
+def test_lost_reader_fails_closed_instead_of_simulating():
+    pool = FakePool("/r/0")
+    service = FingerprintService(pool=pool, simulator=SimulatedReader(default_match=True), backend="auto")
+    assert service.backend is service.fprintd
+    pool.readers.clear()  # Lector desconectado o fprintd reiniciado
+    assert service.backend is service.fprintd
+    with pytest.raises(DeviceBusyError):
+        service.verify_fingerprint("alice")
+    with pytest.raises(DeviceBusyError):
+        service.identify_user_smart(["alice"])
+    with pytest.raises(DeviceBusyError):
+        service.delete_enrolled_finger("alice", "right-thumb")
+    with pytest.raises(DeviceBusyError):
+        service.verify_fingerprint_async("alice")
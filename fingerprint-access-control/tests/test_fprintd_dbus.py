@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("gi")
+pydbus = pytest.importorskip("pydbus")
+
+FAKE_FPRINTD = Path(__file__).resolve().parent.parent / "tools" / "fake_fprintd.py"
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """FingerprintService contra tools/fake_fprintd.py en un bus de sesión privado, con alice en el lector"""
+    scenario = tmp_path / "scenario.json"
+    scenario.write_text(json.dumps({"scan_time_ms": 10, "scan_jitter_ms": 0, "retry_rate": 0,
+                                    "enroll_stages": 2, "presented": {"username": "alice"}}))
+    process = subprocess.Popen([sys.executable, str(FAKE_FPRINTD), "--launch-bus", "--scenario", str(scenario)],
+                               stdout=subprocess.PIPE, text=True)
+    export = process.stdout.readline()  # export DBUS_SESSION_BUS_ADDRESS=... FPRINTD_BUS=session
+    process.stdout.readline()  # running
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", export.split()[1].split("=", 1)[1])
+    monkeypatch.chdir(tmp_path)  # access_stats.json
+
+    from services.device_pool import DevicePool
+    from services.fingerprint_service import FingerprintService
+    pool = DevicePool(bus_factory=pydbus.SessionBus).start()
+    yield FingerprintService(pool=pool, backend="fprintd")
+    pool.close()
+    process.terminate()
+    process.wait(timeout=10)
+
+
+def test_enroll_verify_identify_and_delete_over_dbus(service):
+    assert service.fingerprint_available
+    assert service.enroll_fingerprint("alice", "right-index-finger")
+    assert service.get_enrolled_fingers("alice") == ["right-index-finger"]
+    assert service.verify_fingerprint("alice")
+    assert not service.verify_fingerprint("bob")  # Sin huellas
+    assert service.identify_user_smart(["alice", "bob"]) == "alice"
+    assert service.delete_enrolled_finger("alice", "right-index-finger")
+    assert service.get_enrolled_fingers("alice") == []
+    queue = service.pool.stats()['readers'][0]['queue']
+    assert queue['completed'] >= 4 and queue['queue_depth'] == 0
+    assert service.pool.signals.stats()['live_subscriptions'] >= 2
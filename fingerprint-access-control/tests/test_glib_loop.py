@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+pytest.importorskip("gi")
+
+from services.glib_loop import OperationTimeoutError, SignalFuture, get_main_loop
+
+
+class FakeMainLoop:
+    """Timeouts que el test dispara a mano en lugar del bucle GLib"""
+
+    def __init__(self):
+        self.sources = {}
+        self._ids = iter(range(1, 1000))
+
+    def timeout_add(self, seconds, callback):
+        source_id = next(self._ids)
+        self.sources[source_id] = callback
+        return source_id
+
+    def source_remove(self, source_id):
+        self.sources.pop(source_id, None)
+
+    def fire(self):
+        for callback in list(self.sources.values()):
+            callback()
+
+
+def test_first_outcome_wins_and_cleanups_run_once():
+    loop = FakeMainLoop()
+    future = SignalFuture(30, main_loop=loop)
+    released = []
+    future.add_cleanup(lambda: released.append("signal"))
+    future.resolve(True)
+    future.resolve(False)
+    future.fail(RuntimeError("late"))
+    assert future.result() is True
+    assert released == ["signal"] and loop.sources == {}
+    future.add_cleanup(lambda: released.append("late"))
+    assert released == ["signal", "late"]
+
+
+def test_timeout_fails_the_future():
+    loop = FakeMainLoop()
+    future = SignalFuture(5, main_loop=loop)
+    loop.fire()
+    with pytest.raises(OperationTimeoutError):
+        future.result()
+    future.resolve(True)  # Una señal tardía no cambia nada
+
+
+def test_cancel_removes_the_timeout():
+    loop = FakeMainLoop()
+    future = SignalFuture(5, main_loop=loop)
+    assert future.cancel()
+    assert loop.sources == {}
+    with pytest.raises(CancelledError):
+        future.result()
+
+
+def test_shared_main_loop_fires_timeouts():
+    loop = get_main_loop()
+    assert get_main_loop() is loop and loop.running
+    future = SignalFuture(0.05)
+    started = time.monotonic()
+    with pytest.raises(OperationTimeoutError):
+        future.result(5)
+    assert time.monotonic() - started < 2
+    assert threading.current_thread() is not loop._thread
@@ -0,0 +1,71 @@
+from services.signal_registry import SignalRegistry
+
+
+class FakeSignal:
+    """Señal de un proxy pydbus: connect() devuelve una suscripción con disconnect()"""
+
+    def __init__(self):
+        self.handlers = []
+
+    def connect(self, handler):
+        signal = self
+
+        class Subscription:
+            def disconnect(self):
+                signal.handlers.remove(handler)
+
+        self.handlers.append(handler)
+        return Subscription()
+
+    def emit(self, *args):
+        for handler in list(self.handlers):
+            handler(*args)
+
+
+class FakeDevice:
+    def __init__(self, *signal_names):
+        for name in signal_names:
+            setattr(self, name, FakeSignal())
+
+
+def test_each_signal_is_connected_once():
+    registry = SignalRegistry()
+    device = FakeDevice("VerifyStatus")
+    assert registry.subscribe(device, "/dev/0", "VerifyStatus")
+    assert registry.subscribe(device, "/dev/0", "VerifyStatus")
+    assert not registry.subscribe(device, "/dev/0", "IdentifyStatus")
+    assert len(device.VerifyStatus.handlers) == 1
+    assert registry.is_subscribed("/dev/0", "VerifyStatus")
+    assert not registry.is_subscribed("/dev/0", "IdentifyStatus")
+
+
+def test_events_go_to_the_active_route_only():
+    registry = SignalRegistry()
+    device = FakeDevice("VerifyStatus")
+    registry.subscribe(device, "/dev/0", "VerifyStatus")
+    first, second = [], []
+    device.VerifyStatus.emit("verify-match", True)  # Sin operación activa
+    release_first = registry.route("/dev/0", "VerifyStatus", lambda *args: first.append(args))
+    device.VerifyStatus.emit("verify-retry-scan", False)
+    release_second = registry.route("/dev/0", "VerifyStatus", lambda *args: second.append(args))
+    release_first()  # Soltar una ruta ya reemplazada no quita la nueva
+    device.VerifyStatus.emit("verify-match", True)
+    release_second()
+    device.VerifyStatus.emit("verify-no-match", True)
+    assert first == [("verify-retry-scan", False)]
+    assert second == [("verify-match", True)]
+    stats = registry.stats()
+    assert stats['dispatched'] == 4 and stats['unrouted'] == 2 and stats['active_routes'] == 0
+
+
+def test_unsubscribing_a_device_disconnects_its_signals():
+    registry = SignalRegistry()
+    reader, other = FakeDevice("VerifyStatus", "EnrollStatus"), FakeDevice("VerifyStatus")
+    for name in ("VerifyStatus", "EnrollStatus"):
+        registry.subscribe(reader, "/dev/0", name)
+    registry.subscribe(other, "/dev/1", "VerifyStatus")
+    registry.route("/dev/0", "VerifyStatus", lambda *args: None)
+    registry.unsubscribe_device("/dev/0")
+    assert reader.VerifyStatus.handlers == [] and reader.EnrollStatus.handlers == []
+    assert registry.live_subscriptions() == 1
+    assert registry.stats()['signals'] == ["/dev/1:VerifyStatus"]
@@ -0,0 +1,42 @@
+import pytest
+
+from services.reader_backend import NATIVE_IDENTIFY
+from services.simulated_reader import UNKNOWN_FINGER, SimulatedReader
+
+
+def reader_for(identity, **kwargs):
+    return SimulatedReader(oracle=lambda: identity, **kwargs)
+
+
+def test_oracle_decides_who_is_touching_the_reader():
+    reader = reader_for("alice")
+    assert reader.verify("alice") and not reader.verify("bob")
+    assert reader.identify(["bob", "alice"]) == "alice"
+    assert reader.identify(["bob"]) is None
+    assert reader.identify() == "alice"
+    assert reader.stats()['matches'] == 3 and reader.stats()['no_matches'] == 2
+
+
+def test_unknown_finger_never_matches():
+    reader = reader_for(UNKNOWN_FINGER)
+    assert not reader.verify("alice")
+    assert reader.identify() is None and reader.identify(["alice"]) is None
+
+
+def test_without_oracle_default_match_decides():
+    assert not SimulatedReader().verify("anyone")
+    assert SimulatedReader().identify(["bob"]) is None
+    assert SimulatedReader(default_match=True).verify("anyone")
+    assert SimulatedReader(default_match=True).identify(["bob", "alice"]) == "bob"
+    assert NATIVE_IDENTIFY in SimulatedReader().capabilities()
+
+
+def test_latency_is_reproducible_with_a_seed():
+    def latencies(seed):
+        reader = SimulatedReader(10, 5, "gaussian", seed=seed)
+        return [reader._sample_latency() for _ in range(20)]
+
+    assert latencies(7) == latencies(7) != latencies(8)
+    assert all(latency >= 0 for latency in latencies(7))
+    with pytest.raises(ValueError):
+        SimulatedReader(distribution="bimodal")
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Fake fprintd: a stand-in net.reactivated.Fprint service for benchmarks and load tests
+Publishes the manager and one or more readers on a (private) session bus, with
+scriptable scan time, retry-scan rate and match outcomes
+
+Usage:
+    python tools/fake_fprintd.py --launch-bus --scenario tools/fake_fprintd_scenario.json
+    export DBUS_SESSION_BUS_ADDRESS=<printed address> FPRINTD_BUS=session
+    python src/main.py
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+
+from pydbus import SessionBus, SystemBus
+from pydbus.generic import signal as dbus_signal
+from gi.repository import GLib
+
+FPRINTD_BUS_NAME = "net.reactivated.Fprint"
+FPRINTD_MANAGER_PATH = "/net/reactivated/Fprint"
+FPRINTD_LEGACY_MANAGER_PATH = "/net/reactivated/Fprint/Manager"
+DEVICE_PATH_PREFIX = "/net/reactivated/Fprint/Device/"
+
+DEFAULT_SCENARIO = {
+    "devices": 1,
+    "enroll_stages": 5,
+    "scan_time_ms": 800,       # tiempo medio entre "apoyar el dedo" y el resultado
+    "scan_jitter_ms": 200,     # desviación estándar del tiempo de escaneo
+    "retry_rate": 0.1,         # probabilidad de *-retry-scan antes de cada resultado
+    "match_rate": 1.0,         # probabilidad de match si no hay dedo presentado
+    "presented": None,         # {"username": ..., "finger": ...}: quién apoya el dedo
+    "seed": None,
+    "enrolled": {},            # {username: [dedos]}
+}
+
+
+def dbus_error(name):
+    """Excepción cuyo nombre de clase pydbus devuelve como nombre de error D-Bus"""
+    return type(name, (Exception,), {})
+
+AlreadyInUse = dbus_error("net.reactivated.Fprint.Error.AlreadyInUse")
+ClaimDevice = dbus_error("net.reactivated.Fprint.Error.ClaimDevice")
+NoEnrolledPrints = dbus_error("net.reactivated.Fprint.Error.NoEnrolledPrints")
+NoActionInProgress = dbus_error("net.reactivated.Fprint.Error.NoActionInProgress")
+InvalidFingername = dbus_error("net.reactivated.Fprint.Error.InvalidFingername")
+
+
+class FakeFprintd:
+    """Estado compartido: escenario, huellas enrolladas, lectores publicados y contadores"""
+
+    def __init__(self, bus, scenario):
+        self.bus = bus
+        self.scenario = dict(DEFAULT_SCENARIO)
+        self.scenario.update(scenario)
+        self.random = random.Random(self.scenario["seed"])
+        self.enrolled = {user: list(fingers) for user, fingers in self.scenario["enrolled"].items()}
+        self.devices = {}
+        self._registrations = {}
+        self._next_index = 0
+        self.stats = {
+            "claims": 0, "claim_conflicts": 0, "verifies": 0, "enrolls": 0,
+            "identifies": 0, "retries": 0, "matches": 0, "no_matches": 0,
+        }
+
+    def scan_delay_ms(self):
+        delay = self.random.gauss(self.scenario["scan_time_ms"], self.scenario["scan_jitter_ms"])
+        return max(int(delay), 0)
+
+    def retry(self):
+        if self.random.random() < self.scenario["retry_rate"]:
+            self.stats["retries"] += 1
+            return True
+        return False
+
+    def verify_matches(self, username, finger):
+        presented = self.scenario.get("presented")
+        if presented:
+            return (presented.get("username") == username
+                    and presented.get("finger") in (None, "", "any", finger))
+        return self.random.random() < self.scenario["match_rate"]
+
+    def identify_match(self, usernames):
+        """(usuario, dedo) reconocido entre los candidatos, o None"""
+        candidates = [user for user in (usernames or list(self.enrolled)) if self.enrolled.get(user)]
+        presented = self.scenario.get("presented")
+        if presented:
+            user = presented.get("username")
+            fingers = self.enrolled.get(user, [])
+            finger = presented.get("finger") or (fingers[0] if fingers else "")
+            return (user, finger) if user in candidates and finger in fingers else None
+        if candidates and self.random.random() < self.scenario["match_rate"]:
+            user = self.random.choice(candidates)
+            return user, self.enrolled[user][0]
+        return None
+
+    def add_device(self):
+        path = f"{DEVICE_PATH_PREFIX}{self._next_index}"
+        self._next_index += 1
+        device = FakeDevice(self, path)
+        self._registrations[path] = self.bus.register_object(path, device, None)
+        self.devices[path] = device
+        return path
+
+    def remove_device(self, path):
+        device = self.devices.pop(path, None)
+        if device is None:
+            return False
+        device.cancel()
+        self._registrations.pop(path).unregister()
+        return True
+
+
+class FakeManager:
+    """
+    <node>
+      <interface name="org.freedesktop.DBus.ObjectManager">
+        <method name="GetManagedObjects">
+          <arg type="a{oa{sa{sv}}}" direction="out"/>
+        </method>
+        <signal name="InterfacesAdded">
+          <arg type="o"/>
+          <arg type="a{sa{sv}}"/>
+        </signal>
+        <signal name="InterfacesRemoved">
+          <arg type="o"/>
+          <arg type="as"/>
+        </signal>
+      </interface>
+      <interface name="net.reactivated.Fprint.Testing">
+        <method name="SetScenario">
+          <arg type="s" name="scenario_json" direction="in"/>
+        </method>
+        <method name="PresentFinger">
+          <arg type="s" name="username" direction="in"/>
+          <arg type="s" name="finger" direction="in"/>
+        </method>
+        <method name="RemoveFinger"/>
+        <method name="AddDevice">
+          <arg type="o" direction="out"/>
+        </method>
+        <method name="RemoveDevice">
+          <arg type="o" name="path" direction="in"/>
+        </method>
+        <method name="GetStats">
+          <arg type="s" direction="out"/>
+        </method>
+      </interface>
+    </node>
+    """
+    InterfacesAdded = dbus_signal()
+    InterfacesRemoved = dbus_signal()
+
+    def __init__(self, daemon):
+        self.daemon = daemon
+
+    def GetManagedObjects(self):
+        return {path: {"net.reactivated.Fprint.Device": {}} for path in self.daemon.devices}
+
+    def SetScenario(self, scenario_json):
+        self.daemon.scenario.update(json.loads(scenario_json))
+        for user, fingers in json.loads(scenario_json).get("enrolled", {}).items():
+            self.daemon.enrolled[user] = list(fingers)
+
+    def PresentFinger(self, username, finger):
+        self.daemon.scenario["presented"] = {"username": username, "finger": finger}
+
+    def RemoveFinger(self):
+        self.daemon.scenario["presented"] = None
+
+    def AddDevice(self):
+        path = self.daemon.add_device()
+        self.InterfacesAdded(path, {"net.reactivated.Fprint.Device": {}})
+        return path
+
+    def RemoveDevice(self, path):
+        if self.daemon.remove_device(path):
+            self.InterfacesRemoved(path, ["net.reactivated.Fprint.Device"])
+
+    def GetStats(self):
+        stats = dict(self.daemon.stats)
+        stats["devices"] = sorted(self.daemon.devices)
+        stats["enrolled_users"] = sum(1 for fingers in self.daemon.enrolled.values() if fingers)
+        return json.dumps(stats)
+
+
+class FakeLegacyManager:
+    """
+    <node>
+      <interface name="net.reactivated.Fprint.Manager">
+        <method name="GetDevices">
+          <arg type="ao" direction="out"/>
+        </method>
+        <method name="GetDefaultDevice">
+          <arg type="o" direction="out"/>
+        </method>
+      </interface>
+    </node>
+    """
+
+    def __init__(self, daemon):
+        self.daemon = daemon
+
+    def GetDevices(self):
+        return sorted(self.daemon.devices)
+
+    def GetDefaultDevice(self):
+        if not self.daemon.devices:
+            raise dbus_error("net.reactivated.Fprint.Error.NoSuchDevice")("No devices available")
+        return sorted(self.daemon.devices)[0]
+
+
+class FakeDevice:
+    """
+    <node>
+      <interface name="net.reactivated.Fprint.Device">
+        <method name="Claim"><arg type="s" name="username" direction="in"/></method>
+        <method name="Release"/>
+        <method name="VerifyStart"><arg type="s" name="finger_name" direction="in"/></method>
+        <method name="VerifyStop"/>
+        <method name="EnrollStart"><arg type="s" name="finger_name" direction="in"/></method>
+        <method name="EnrollStop"/>
+        <method name="IdentifyStart"><arg type="as" name="usernames" direction="in"/></method>
+        <method name="IdentifyStop"/>
+        <method name="ListEnrolledFingers">
+          <arg type="s" name="username" direction="in"/>
+          <arg type="as" name="enrolled_fingers" direction="out"/>
+        </method>
+        <method name="DeleteEnrolledFingers"><arg type="s" name="username" direction="in"/></method>
+        <method name="DeleteEnrolledFingers2"/>
+        <method name="DeleteEnrolledFinger"><arg type="s" name="finger_name" direction="in"/></method>
+        <signal name="VerifyFingerSelected"><arg type="s" name="finger_name"/></signal>
+        <signal name="VerifyStatus"><arg type="s" name="result"/><arg type="b" name="done"/></signal>
+        <signal name="EnrollStatus"><arg type="s" name="result"/><arg type="b" name="done"/></signal>
+        <signal name="IdentifyStatus">
+          <arg type="s" name="result"/><arg type="s" name="username"/>
+          <arg type="s" name="finger_name"/><arg type="b" name="done"/>
+        </signal>
+      </interface>
+    </node>
+    """
+    VerifyFingerSelected = dbus_signal()
+    VerifyStatus = dbus_signal()
+    EnrollStatus = dbus_signal()
+    IdentifyStatus = dbus_signal()
+
+    def __init__(self, daemon, path):
+        self.daemon = daemon
+        self.path = path
+        self.claimed_by = None
+        self.claimed_user = None
+        self.action = None
+        self._source = None
+
+    # --- Reclamar el lector ---
+
+    def Claim(self, username, dbus_context=None):
+        if self.claimed_by is not None:
+            self.daemon.stats["claim_conflicts"] += 1
+            raise AlreadyInUse("Device was already claimed")
+        self.claimed_by = dbus_context.sender if dbus_context else ""
+        self.claimed_user = username
+        self.daemon.stats["claims"] += 1
+
+    def Release(self, dbus_context=None):
+        self._check_claim(dbus_context)
+        self.cancel()
+        self.claimed_by = None
+        self.claimed_user = None
+
+    # --- Verificación ---
+
+    def VerifyStart(self, finger_name, dbus_context=None):
+        self._start_action("verify", dbus_context)
+        fingers = self.daemon.enrolled.get(self.claimed_user, [])
+        if not fingers:
+            self.action = None
+            raise NoEnrolledPrints("No fingerprints enrolled")
+        if finger_name in ("", "any"):
+            finger_name = fingers[0]
+            self.VerifyFingerSelected(finger_name)
+        elif finger_name not in fingers:
+            self.action = None
+            raise NoEnrolledPrints(f"{finger_name} is not enrolled")
+        self.daemon.stats["verifies"] += 1
+        self._after_scan(lambda: self._finish_verify(finger_name))
+
+    def VerifyStop(self, dbus_context=None):
+        self._stop_action("verify", dbus_context)
+
+    def _finish_verify(self, finger_name):
+        if self.daemon.retry():
+            self.VerifyStatus("verify-retry-scan", False)
+            self._after_scan(lambda: self._finish_verify(finger_name))
+            return
+        matched = self.daemon.verify_matches(self.claimed_user, finger_name)
+        self.daemon.stats["matches" if matched else "no_matches"] += 1
+        self.VerifyStatus("verify-match" if matched else "verify-no-match", True)
+
+    # --- Enrolamiento ---
+
+    def EnrollStart(self, finger_name, dbus_context=None):
+        self._start_action("enroll", dbus_context)
+        if not finger_name or finger_name == "any":
+            self.action = None
+            raise InvalidFingername("Invalid finger name")
+        self.daemon.stats["enrolls"] += 1
+        self._after_scan(lambda: self._enroll_stage(finger_name, 1))
+
+    def EnrollStop(self, dbus_context=None):
+        self._stop_action("enroll", dbus_context)
+
+    def _enroll_stage(self, finger_name, stage):
+        if self.daemon.retry():
+            self.EnrollStatus("enroll-retry-scan", False)
+        elif stage < self.daemon.scenario["enroll_stages"]:
+            self.EnrollStatus("enroll-stage-passed", False)
+            stage += 1
+        else:
+            fingers = self.daemon.enrolled.setdefault(self.claimed_user, [])
+            if finger_name not in fingers:
+                fingers.append(finger_name)
+            self.EnrollStatus("enroll-completed", True)
+            return
+        self._after_scan(lambda: self._enroll_stage(finger_name, stage))
+
+    # --- Identificación ---
+
+    def IdentifyStart(self, usernames, dbus_context=None):
+        self._start_action("identify", dbus_context)
+        self.daemon.stats["identifies"] += 1
+        self._after_scan(lambda: self._finish_identify(list(usernames)))
+
+    def IdentifyStop(self, dbus_context=None):
+        self._stop_action("identify", dbus_context)
+
+    def _finish_identify(self, usernames):
+        if self.daemon.retry():
+            self.IdentifyStatus("identify-retry-scan", "", "", False)
+            self._after_scan(lambda: self._finish_identify(usernames))
+            return
+        match = self.daemon.identify_match(usernames)
+        self.daemon.stats["matches" if match else "no_matches"] += 1
+        if match:
+            self.IdentifyStatus("identify-match", match[0], match[1], True)
+        else:
+            self.IdentifyStatus("identify-no-match", "", "", True)
+
+    # --- Huellas guardadas ---
+
+    def ListEnrolledFingers(self, username):
+        fingers = self.daemon.enrolled.get(username)
+        if not fingers:
+            raise NoEnrolledPrints("Failed to discover prints")
+        return fingers
+
+    def DeleteEnrolledFingers(self, username):
+        self.daemon.enrolled.pop(username, None)
+
+    def DeleteEnrolledFingers2(self, dbus_context=None):
+        self._check_claim(dbus_context)
+        self.daemon.enrolled.pop(self.claimed_user, None)
+
+    def DeleteEnrolledFinger(self, finger_name, dbus_context=None):
+        self._check_claim(dbus_context)
+        fingers = self.daemon.enrolled.get(self.claimed_user, [])
+        if finger_name not in fingers:
+            raise NoEnrolledPrints(f"{finger_name} is not enrolled")
+        fingers.remove(finger_name)
+
+    # --- Auxiliares ---
+
+    def cancel(self):
+        if self._source is not None:
+            GLib.source_remove(self._source)
+            self._source = None
+        self.action = None
+
+    def _check_claim(self, dbus_context):
+        if self.claimed_by is None:
+            raise ClaimDevice("Device was not claimed before use")
+        if dbus_context is not None and self.claimed_by != dbus_context.sender:
+            raise AlreadyInUse("Device already in use by another user")
+
+    def _start_action(self, action, dbus_context):
+        self._check_claim(dbus_context)
+        if self.action is not None:
+            raise AlreadyInUse(f"Action {self.action} already in progress")
+        self.action = action
+
+    def _stop_action(self, action, dbus_context):
+        self._check_claim(dbus_context)
+        if self.action != action:
+            raise NoActionInProgress(f"No {action} in progress")
+        self.cancel()
+
+    def _after_scan(self, callback):
+        def fire():
+            self._source = None
+            if self.action is not None:
+                callback()
+            return False
+        self._source = GLib.timeout_add(self.daemon.scan_delay_ms(), fire)
+
+
+def launch_private_bus():
+    """Arrancar un dbus-daemon de sesión propio y apuntar DBUS_SESSION_BUS_ADDRESS a él"""
+    process = subprocess.Popen(
+        ["dbus-daemon", "--session", "--nofork", "--print-address=1"],
+        stdout=subprocess.PIPE, text=True)
+    address = process.stdout.readline().strip()
+    os.environ["DBUS_SESSION_BUS_ADDRESS"] = address
+    return process, address
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", help="JSON file with the latency/match model and enrolled prints")
+    parser.add_argument("--devices", type=int, help="number of readers to publish (overrides the scenario)")
+    parser.add_argument("--bus", choices=("session", "system"), default="session")
+    parser.add_argument("--launch-bus", action="store_true", help="start a private session bus first")
+    args = parser.parse_args()
+
+    scenario = {}
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as f:
+            scenario = json.load(f)
+    if args.devices is not None:
+        scenario["devices"] = args.devices
+
+    bus_process = None
+    if args.launch_bus:
+        bus_process, address = launch_private_bus()
+        print(f"export DBUS_SESSION_BUS_ADDRESS={address} FPRINTD_BUS=session", flush=True)
+
+    # pydbus registra cada error devuelto como excepción; no ensuciar la salida
+    logging.getLogger("pydbus").setLevel(logging.CRITICAL)
+    logging.basicConfig(level=logging.CRITICAL)
+
+    bus = SessionBus() if args.bus == "session" else SystemBus()
+    daemon = FakeFprintd(bus, scenario)
+    manager = FakeManager(daemon)
+    registration = bus.register_object(FPRINTD_MANAGER_PATH, manager, None)
+    legacy_registration = bus.register_object(FPRINTD_LEGACY_MANAGER_PATH, FakeLegacyManager(daemon), None)
+    for _ in range(daemon.scenario["devices"]):
+        daemon.add_device()
+    owner = bus.request_name(FPRINTD_BUS_NAME)
+
+    print(f"🧪 Fake fprintd running with {len(daemon.devices)} readers on the {args.bus} bus "
+          f"(scan {daemon.scenario['scan_time_ms']}±{daemon.scenario['scan_jitter_ms']} ms, "
+          f"retry {daemon.scenario['retry_rate']:.0%}, match {daemon.scenario['match_rate']:.0%})", flush=True)
+
+    loop = GLib.MainLoop()
+    GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGINT, loop.quit)
+    GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGTERM, loop.quit)
+    try:
+        loop.run()
+    finally:
+        owner.unown()
+        registration.unregister()
+        legacy_registration.unregister()
+        print(f"📊 {manager.GetStats()}")
+        if bus_process is not None:
+            bus_process.terminate()
+            bus_process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
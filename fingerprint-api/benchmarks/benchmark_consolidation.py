@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: consolidated multi-sample enrollment
+Enrolls every finger from several captures, either as one gallery template per
+capture or merged into one super-template, and compares gallery size, probe
+latency and rank-1 hits, on one core
+"""
+
+import os
+
+# One BLAS thread, so the numbers are per core
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import MatchingEngine, consolidate
+from src.services.matching.synthetic import impression, random_minutiae
+
+SIZE = int(os.environ.get("BENCH_SIZE", "5000"))
+SAMPLES = int(os.environ.get("BENCH_SAMPLES", "3"))
+PROBES = int(os.environ.get("BENCH_PROBES", "200"))
+# Probes lose and gain more minutiae than the enrollment captures
+NOISE = {"jitter": 3.0, "angle_jitter": 0.12, "missing": 0.25, "spurious": 0.2}
+
+
+def main():
+    rng = np.random.default_rng(42)
+    fingers = [random_minutiae(rng, int(rng.integers(30, 55))) for _ in range(SIZE)]
+    captures = [[impression(rng, finger) for _ in range(SAMPLES)] for finger in fingers]
+    probes = [(index, impression(rng, fingers[index], **NOISE)) for index in rng.choice(SIZE, PROBES, replace=False)]
+
+    per_capture, merged = MatchingEngine(), MatchingEngine()
+    started = time.perf_counter()
+    for index, samples in enumerate(captures):
+        for sample in samples:
+            per_capture.add(f"user{index:06d}", sample)
+    capture_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for index, samples in enumerate(captures):
+        merged.add(f"user{index:06d}", consolidate(samples)[0])
+    merge_seconds = time.perf_counter() - started
+
+    print(f"📊 Consolidation benchmark ({SIZE} fingers x {SAMPLES} captures, {PROBES} probes, top-1)\n")
+    print(f"{'gallery':<22} {'templates':>10} {'MB':>6} {'enroll ms':>10} {'probe ms':>9} {'rank-1':>8}")
+    for name, engine, seconds in (("one per capture", per_capture, capture_seconds),
+                                  ("consolidated", merged, merge_seconds)):
+        engine.identify(probes[0][1], 1)  # warm-up
+        hits = 0
+        started = time.perf_counter()
+        for index, probe in probes:
+            top = engine.identify(probe, 1)
+            hits += bool(top) and top[0].user_id == f"user{index:06d}"
+        latency = (time.perf_counter() - started) / PROBES
+        print(f"{name:<22} {len(engine):>10} {engine.nbytes / 2 ** 20:>6.1f} {seconds / SIZE * 1000:>10.2f} "
+              f"{latency * 1000:>9.1f} {f'{hits}/{PROBES}':>8}")
+
+
+if __name__ == "__main__":
+    main()
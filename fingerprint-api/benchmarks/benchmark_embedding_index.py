@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: template embeddings in an IVF index in front of the 1:N minutiae matcher
+For several numbers of searched lists reports how often the genuine template
+makes the shortlist (recall), the index lookup time, rank-1 hits after the full
+matcher re-ranks the shortlist and the speed-up over scoring the whole gallery,
+on one core
+"""
+
+import os
+
+# One BLAS thread, so the numbers are per core
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import EmbeddingIndex, MatchingEngine
+from src.services.matching.synthetic import impression, random_minutiae
+
+SIZES = [int(size) for size in os.environ.get("BENCH_SIZES", "20000,100000").split(",")]
+LIST_PROBES = [int(count) for count in os.environ.get("BENCH_LIST_PROBES", "8,16,32,64").split(",")]
+SHORTLIST = int(os.environ.get("BENCH_SHORTLIST", "200"))
+PROBES = int(os.environ.get("BENCH_PROBES", "50"))
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"📊 Embedding index benchmark ({PROBES} probes per size, shortlist {SHORTLIST})\n")
+
+    for size in SIZES:
+        engine = MatchingEngine(index=EmbeddingIndex(), shortlist=SHORTLIST)
+        fingers = []
+        started = time.perf_counter()
+        for index in range(size):
+            finger = random_minutiae(rng, int(rng.integers(30, 55)))
+            if index < PROBES:
+                fingers.append(finger)
+            engine.add(f"user{index:06d}", impression(rng, finger))
+        enroll_seconds = time.perf_counter() - started
+        probes = [impression(rng, finger) for finger in fingers]
+        index = engine.index
+        index.shortlist(probes[0], SHORTLIST)  # moves the enrollment tail into the lists
+
+        full_seconds = 0.0
+        for probe in probes[:10]:
+            _, seconds = timed(engine.scores, probe)
+            full_seconds += seconds
+        full_ms = full_seconds / min(PROBES, 10) * 1000
+
+        print(f"gallery {size}: enrolled in {enroll_seconds:.0f} s, {index.lists} lists, "
+              f"index {index.nbytes / 2 ** 20:.0f} MB ({index.nbytes / size:.0f} bytes per template), "
+              f"full matcher {full_ms:.0f} ms per probe")
+        print(f"{'lists':>6} {'recall':>8} {'lookup ms':>10} {'rank-1':>7} {'probe ms':>9} {'speed-up':>9}")
+        for list_probes in LIST_PROBES + [index.lists]:
+            index.probes = list_probes
+            recalled, hits, lookup_seconds, total_seconds = 0, 0, 0.0, 0.0
+            for position, probe in enumerate(probes):
+                rows, seconds = timed(index.shortlist, probe, SHORTLIST)
+                recalled += position in rows
+                lookup_seconds += seconds
+                top, seconds = timed(engine.identify, probe, 1)
+                total_seconds += seconds
+                hits += top[0].user_id == f"user{position:06d}"
+            probe_ms = total_seconds / PROBES * 1000
+            label = "all" if list_probes == index.lists else list_probes
+            print(f"{label:>6} {f'{recalled}/{PROBES}':>8} {lookup_seconds / PROBES * 1000:>10.2f} "
+                  f"{f'{hits}/{PROBES}':>7} {probe_ms:>9.1f} {full_ms / probe_ms:>8.0f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
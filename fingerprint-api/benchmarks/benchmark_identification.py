@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 1:N minutiae identification against in-memory galleries
+Enrolls synthetic fingers at several gallery sizes, identifies fresh impressions
+of enrolled fingers and reports comparisons per second on one core and rank-1 hits
+"""
+
+import os
+
+# One BLAS thread, so the numbers are per core
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import MatchingEngine
+from src.services.matching.synthetic import impression, random_minutiae
+
+SIZES = [int(size) for size in os.environ.get("BENCH_SIZES", "1000,10000,100000").split(",")]
+PROBES = int(os.environ.get("BENCH_PROBES", "20"))
+TOP_K = int(os.environ.get("BENCH_TOP_K", "5"))
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"📊 Identification benchmark ({PROBES} probes per size, top-{TOP_K})\n")
+    print(f"{'gallery':>9} {'enroll s':>9} {'probe ms':>9} {'p95 ms':>8} {'cmp/s':>10} {'rank-1':>7} {'MB':>7}")
+
+    for size in SIZES:
+        engine = MatchingEngine()
+        fingers = []
+        started = time.perf_counter()
+        for index in range(size):
+            finger = random_minutiae(rng, int(rng.integers(30, 55)))
+            if index < PROBES:
+                fingers.append(finger)
+            engine.add(f"user{index:06d}", impression(rng, finger))
+        enroll_seconds = time.perf_counter() - started
+
+        engine.identify(impression(rng, fingers[0]), TOP_K)  # warm-up
+        latencies, hits = [], 0
+        for index, finger in enumerate(fingers):
+            probe = impression(rng, finger)
+            started = time.perf_counter()
+            top = engine.identify(probe, TOP_K)
+            latencies.append(time.perf_counter() - started)
+            hits += top[0].user_id == f"user{index:06d}"
+
+        latencies.sort()
+        mean = sum(latencies) / len(latencies)
+        megabytes = engine.nbytes / 2 ** 20
+        print(f"{size:>9} {enroll_seconds:>9.1f} {mean * 1000:>9.1f} "
+              f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>8.1f} {size / mean:>10.0f} "
+              f"{f'{hits}/{len(fingers)}':>7} {megabytes:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pattern-class binning of the identification gallery
+Tags every synthetic finger with its pattern class (arch, left/right loop, whorl)
+and compares exhaustive 1:N search with class-first search under each fallback
+rule: comparisons, penetration rate, latency and rank-1 hits, on one core
+"""
+
+import os
+
+# One BLAS thread, so the numbers are per core
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import MatchingEngine, PatternBins
+from src.services.matching.pattern_class import ARCH, LEFT_LOOP, RIGHT_LOOP, WHORL
+from src.services.matching.synthetic import impression, patterned_minutiae
+
+SIZE = int(os.environ.get("BENCH_SIZE", "5000"))
+PROBES = int(os.environ.get("BENCH_PROBES", "200"))
+# Share of each class among real fingers (tented arches counted as arches)
+FREQUENCIES = {ARCH: 0.05, LEFT_LOOP: 0.33, RIGHT_LOOP: 0.32, WHORL: 0.30}
+
+
+def main():
+    rng = np.random.default_rng(42)
+    patterns = rng.choice(list(FREQUENCIES), SIZE, p=list(FREQUENCIES.values()))
+    fingers = [patterned_minutiae(rng, pattern, int(rng.integers(30, 55))) for pattern in patterns]
+    enrolled = [impression(rng, finger) for finger in fingers]
+    genuine = [(index, impression(rng, fingers[index])) for index in rng.choice(SIZE, PROBES, replace=False)]
+    impostors = [patterned_minutiae(rng, pattern, 40) for pattern in patterns[:PROBES // 4]]
+
+    engines = {"exhaustive": MatchingEngine()}
+    for fallback in ("all", "neighbours", "none"):
+        engines[f"binned, {fallback}"] = MatchingEngine(bins=PatternBins(fallback))
+    for engine in engines.values():
+        for index, minutiae in enumerate(enrolled):
+            engine.add(f"user{index:06d}", minutiae)
+
+    binned = engines["binned, all"]
+    print(f"📊 Pattern-class binning benchmark ({SIZE} templates, {PROBES} genuine and "
+          f"{len(impostors)} impostor probes, top-1)\n")
+    print("Gallery per class: " + ", ".join(f"{name} {count}" for name, count in binned.pattern_classes().items()))
+    agree = np.mean([binned.bins.classes[row] == pattern for row, pattern in enumerate(patterns)])
+    print(f"Enrolled templates tagged with their finger's class: {agree:.1%}\n")
+    print(f"{'search':<20} {'penetration':>12} {'speed-up':>9} {'probe ms':>9} {'rank-1':>8} "
+          f"{'impostor penetration':>21}")
+    for name, engine in engines.items():
+        engine.identify(genuine[0][1], 1)  # warm-up
+        engine.reset_comparison_stats()
+        hits = 0
+        started = time.perf_counter()
+        for index, probe in genuine:
+            top = engine.identify(probe, 1)
+            hits += bool(top) and top[0].user_id == f"user{index:06d}"
+        latency = (time.perf_counter() - started) / PROBES
+        penetration = engine.comparison_stats()["penetration"]
+        engine.reset_comparison_stats()
+        for probe in impostors:
+            engine.identify(probe, 1)
+        print(f"{name:<20} {penetration:>12.1%} {1 / penetration:>8.1f}x {latency * 1000:>9.1f} "
+              f"{f'{hits}/{PROBES}':>8} {engine.comparison_stats()['penetration']:>21.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 1:N identification split over a pool of matcher processes
+Builds a memory-mapped gallery, then identifies the same probes in-process and with
+pools of increasing size, and reports latency, speed-up and per-core efficiency
+"""
+
+import os
+
+# One BLAS thread, so the in-process baseline is one core
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import MatchingPool, StoredMatchingEngine
+from src.services.matching.synthetic import impression, random_minutiae
+
+SIZE = int(os.environ.get("BENCH_SIZE", "20000"))
+PROBES = int(os.environ.get("BENCH_PROBES", "10"))
+CORES = os.cpu_count() or 1
+WORKERS = [int(count) for count in os.environ.get(
+    "BENCH_WORKERS", ",".join(str(count) for count in (1, 2, 4, 8, 16) if count <= CORES) or "1").split(",")]
+
+
+def mean_latency(searcher, probes):
+    started = time.perf_counter()
+    for probe in probes:
+        searcher.identify(probe, 5)
+    return (time.perf_counter() - started) / len(probes)
+
+
+def main():
+    rng = np.random.default_rng(42)
+    # /dev/shm keeps the gallery in memory; any directory works
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as path:
+        engine = StoredMatchingEngine.open(path)
+        fingers = []
+        for index in range(SIZE):
+            finger = random_minutiae(rng, int(rng.integers(30, 55)))
+            if index < PROBES:
+                fingers.append(finger)
+            engine.add(f"user{index:06d}", impression(rng, finger))
+        probes = [impression(rng, finger) for finger in fingers]
+
+        print(f"📊 Matcher pool benchmark ({SIZE} templates, {PROBES} probes, {CORES} cores)\n")
+        print(f"{'workers':>8} {'start s':>8} {'probe ms':>9} {'speed-up':>9} {'efficiency':>11} {'slowest shard ms':>17}")
+        engine.identify(probes[0], 5)  # warm-up
+        baseline = mean_latency(engine, probes)
+        print(f"{'inline':>8} {'':>8} {baseline * 1000:>9.1f} {1:>8.2f}x {'':>11} {'':>17}")
+
+        for workers in WORKERS:
+            started = time.perf_counter()
+            with MatchingPool(path, workers) as pool:
+                start_seconds = time.perf_counter() - started
+                latency = mean_latency(pool, probes)
+                slowest = max(shard["mean_ms"] for shard in pool.metrics())
+            speedup = baseline / latency
+            print(f"{workers:>8} {start_seconds:>8.1f} {latency * 1000:>9.1f} {speedup:>8.2f}x "
+                  f"{speedup / workers:>10.0%} {slowest:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: product-quantized embeddings in the IVF candidate index
+Trains codebooks offline on a separate set of embeddings, then for float32
+vectors and several code sizes reports index memory (in all and per row,
+including the full-precision enrollment tail and the list centroids), how often
+the genuine template makes the shortlist (recall) with the default and with
+every list searched, and the index lookup time, on one core
+"""
+
+import os
+
+# One BLAS thread, so the numbers are per core
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import EmbeddingIndex, ProductQuantizer, embed
+from src.services.matching.embedding import EMBEDDING_DIMENSIONS
+from src.services.matching.synthetic import impression, random_minutiae
+
+SIZE = int(os.environ.get("BENCH_SIZE", "100000"))
+SUBSPACES = [int(count) for count in os.environ.get("BENCH_SUBSPACES", "256,128,64,32").split(",")]
+TRAINING = int(os.environ.get("BENCH_TRAINING", "20000"))
+SHORTLIST = int(os.environ.get("BENCH_SHORTLIST", "200"))
+PROBES = int(os.environ.get("BENCH_PROBES", "200"))
+
+
+def recall(index, probes):
+    found, seconds = 0, 0.0
+    for position, probe in enumerate(probes):
+        started = time.perf_counter()
+        rows = index.shortlist(probe, SHORTLIST)
+        seconds += time.perf_counter() - started
+        found += position in rows
+    return found, seconds / len(probes) * 1000
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"📊 Product quantization benchmark ({SIZE} templates, {PROBES} probes, shortlist {SHORTLIST})\n")
+
+    # Offline: codebooks come from embeddings of other fingers than the gallery's
+    training = np.stack([embed(impression(rng, random_minutiae(rng, int(rng.integers(30, 55)))))
+                         for _ in range(TRAINING)])
+    quantizers = {}
+    for subspaces in SUBSPACES:
+        started = time.perf_counter()
+        quantizers[subspaces] = ProductQuantizer(subspaces).train(training)
+        print(f"codebooks for {subspaces} subspaces trained on {TRAINING} embeddings "
+              f"in {time.perf_counter() - started:.0f} s")
+
+    indexes = {0: EmbeddingIndex()}
+    indexes.update((subspaces, EmbeddingIndex(quantizer=quantizer)) for subspaces, quantizer in quantizers.items())
+    fingers = []
+    started = time.perf_counter()
+    for row in range(SIZE):
+        finger = random_minutiae(rng, int(rng.integers(30, 55)))
+        if row < PROBES:
+            fingers.append(finger)
+        template = impression(rng, finger)
+        for index in indexes.values():
+            index.add(row, template)
+    print(f"{len(indexes)} indexes filled in {time.perf_counter() - started:.0f} s\n")
+    probes = [impression(rng, finger) for finger in fingers]
+
+    print(f"{'vectors':>9} {'bytes':>6} {'smaller':>8} {'index MB':>9} {'per row':>8} {'recall':>8} "
+          f"{'lookup ms':>10} {'all lists':>10} {'lookup ms':>10}")
+    for subspaces, index in indexes.items():
+        index.scores(probes[0])  # moves the enrollment tail into the lists
+        code_bytes = subspaces or EMBEDDING_DIMENSIONS * 4
+        found, lookup_ms = recall(index, probes)
+        default_probes, index.probes = index.probes, index.lists
+        found_all, lookup_all_ms = recall(index, probes)
+        index.probes = default_probes
+        label = f"pq{subspaces}" if subspaces else "float32"
+        print(f"{label:>9} {code_bytes:>6} {EMBEDDING_DIMENSIONS * 4 / code_bytes:>7.0f}x "
+              f"{index.nbytes / 2 ** 20:>9.1f} {index.nbytes / SIZE:>8.0f} {f'{found}/{PROBES}':>8} "
+              f"{lookup_ms:>10.2f} {f'{found_all}/{PROBES}':>10} {lookup_all_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: geometric-hashing shortlists in front of the 1:N minutiae matcher
+For several shortlist sizes reports how often the genuine template makes the
+shortlist (recall), rank-1 hits after full matching of the shortlist and the
+speed-up over scoring the whole gallery, on one core
+"""
+
+import os
+
+# One BLAS thread, so the numbers are per core
+for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import GeometricHashIndex, MatchingEngine
+from src.services.matching.synthetic import impression, random_minutiae
+
+SIZES = [int(size) for size in os.environ.get("BENCH_SIZES", "10000,100000").split(",")]
+SHORTLISTS = [int(size) for size in os.environ.get("BENCH_SHORTLISTS", "20,50,200,1000").split(",")]
+PROBES = int(os.environ.get("BENCH_PROBES", "20"))
+# "hard" probes lose and gain more minutiae and are noisier than the enrolled impressions
+NOISE = {
+    "normal": {},
+    "hard": {"jitter": 4.0, "angle_jitter": 0.15, "missing": 0.25, "spurious": 0.25},
+}[os.environ.get("BENCH_NOISE", "normal")]
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"📊 Shortlist benchmark ({PROBES} probes per size, {os.environ.get('BENCH_NOISE', 'normal')} noise)\n")
+
+    for size in SIZES:
+        engine = MatchingEngine(index=GeometricHashIndex())
+        fingers = []
+        started = time.perf_counter()
+        for index in range(size):
+            finger = random_minutiae(rng, int(rng.integers(30, 55)))
+            if index < PROBES:
+                fingers.append(finger)
+            engine.add(f"user{index:06d}", impression(rng, finger))
+        enroll_seconds = time.perf_counter() - started
+        probes = [impression(rng, finger, **NOISE) for finger in fingers]
+
+        full_seconds, full_hits = 0.0, 0
+        for index, probe in enumerate(probes):
+            scores, seconds = timed(engine.scores, probe)
+            full_seconds += seconds
+            full_hits += engine._top_users(scores, 1)[0].user_id == f"user{index:06d}"
+        full_ms = full_seconds / PROBES * 1000
+
+        print(f"gallery {size}: enrolled in {enroll_seconds:.0f} s, index {engine.index.nbytes / 2 ** 20:.0f} MB "
+              f"({engine.index.postings / size:.0f} postings per template), gallery {engine.nbytes / 2 ** 20:.0f} MB")
+        print(f"{'shortlist':>10} {'recall':>8} {'rank-1':>7} {'vote ms':>8} {'probe ms':>9} {'speed-up':>9}")
+        print(f"{'all':>10} {'':>8} {f'{full_hits}/{PROBES}':>7} {'':>8} {full_ms:>9.1f} {1:>8.1f}x")
+        for shortlist in SHORTLISTS:
+            engine.shortlist = shortlist
+            recalled, hits, vote_seconds, total_seconds = 0, 0, 0.0, 0.0
+            for index, probe in enumerate(probes):
+                rows, seconds = timed(engine.index.shortlist, probe, shortlist)
+                recalled += index in rows
+                vote_seconds += seconds
+                top, seconds = timed(engine.identify, probe, 1)
+                total_seconds += seconds
+                hits += top[0].user_id == f"user{index:06d}"
+            probe_ms = total_seconds / PROBES * 1000
+            print(f"{shortlist:>10} {f'{recalled}/{PROBES}':>8} {f'{hits}/{PROBES}':>7} "
+                  f"{vote_seconds / PROBES * 1000:>8.1f} {probe_ms:>9.1f} {full_ms / probe_ms:>8.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compact binary templates against float32 rows
+Reports stored and wire sizes (raw body and base64 in JSON) and the cost of
+turning a received template into the minutiae array the matcher scores
+"""
+
+import base64
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.services.matching import encode_template, pack_template, parse_template
+from src.services.matching.synthetic import random_minutiae
+
+MINUTIAE = [int(count) for count in os.environ.get("BENCH_MINUTIAE", "20,40,80").split(",")]
+REPEATS = int(os.environ.get("BENCH_REPEATS", "20000"))
+
+
+def microseconds(function, *args):
+    return min(timeit.repeat(lambda: function(*args), number=REPEATS, repeat=3)) / REPEATS * 1e6
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"📊 Template format benchmark (best of 3 x {REPEATS} decodes)\n")
+    print(f"{'minutiae':>9} {'format':<8} {'bytes':>6} {'base64':>7} {'parse raw us':>13} {'parse base64 us':>16}")
+    for count in MINUTIAE:
+        minutiae = random_minutiae(rng, count)
+        for name, encoded in (("float32", pack_template(minutiae)), ("compact", encode_template(minutiae))):
+            text = base64.b64encode(encoded)
+            print(f"{count:>9} {name:<8} {len(encoded):>6} {len(text):>7} "
+                  f"{microseconds(parse_template, encoded):>13.1f} {microseconds(parse_template, text):>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,60 @@
-from fastapi import APIRouter, HTTPException
+from typing import List
+
+from fastapi import APIRouter, Body, HTTPException
 from pydantic import BaseModel
-from src.services.fingerprint_service import FingerprintService
+from src.services.fingerprint_service import default_service
+from src.utils.exceptions import LowQualityFingerprintError
 
 
 router = APIRouter()
-fingerprint_service = FingerprintService()
+fingerprint_service = default_service()
 
 class EnrollmentRequest(BaseModel):
     user_id: str
     fingerprint_data: bytes
+    finger: str = ""  # re-enrolling a finger replaces only that finger's template
+
+class SamplesEnrollmentRequest(BaseModel):
+    user_id: str
+    samples: List[bytes]
+    finger: str = ""
 
 
 @router.post("/fingerprints/enroll")
 def enroll_fingerprint(payload: EnrollmentRequest):
     try:
-        fingerprint_service.enroll_fingerprint(payload.user_id, payload.fingerprint_data)
+        fingerprint_service.enroll_fingerprint(payload.user_id, payload.fingerprint_data, payload.finger)
+        return {"message": "Fingerprint enrolled successfully"}
+
+    except LowQualityFingerprintError as e:
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "quality": e.quality, "message": str(e)})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/fingerprints/enroll/{user_id}/template")
+def enroll_fingerprint_template(user_id: str,
+                                fingerprint_data: bytes = Body(..., media_type="application/octet-stream"),
+                                finger: str = ""):
+    """Enroll a template sent as the raw request body instead of base64 in JSON."""
+    try:
+        fingerprint_service.enroll_fingerprint(user_id, fingerprint_data, finger)
         return {"message": "Fingerprint enrolled successfully"}
 
+    except LowQualityFingerprintError as e:
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "quality": e.quality, "message": str(e)})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/fingerprints/enroll/samples")
+def enroll_fingerprint_samples(payload: SamplesEnrollmentRequest):
+    """Enroll several captures of one finger, merged into a single template."""
+    try:
+        result = fingerprint_service.enroll_samples(payload.user_id, payload.samples, payload.finger)
+        return {"message": "Fingerprint enrolled successfully", "samples": result["samples"]}
+
+    except LowQualityFingerprintError as e:
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "quality": e.quality, "message": str(e)})
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,19 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from src.services.fingerprint_service import FingerprintService
+from fastapi import APIRouter, Body, HTTPException, Query
+from pydantic import BaseModel, Field
+from src.core.config import settings
+from src.services.fingerprint_service import default_service
+from src.utils.exceptions import InvalidFingerprintDataError, LowQualityFingerprintError
 
 router = APIRouter()
-fingerprint_service = FingerprintService()
+fingerprint_service = default_service()
 
 
 class VerificationRequest(BaseModel):
     fingerprint_data: bytes
+    top_k: int = Field(1, ge=1, le=settings.max_top_k)
 
 
 @router.post("/fingerprints/verify")
 def verify_fingerprint(payload: VerificationRequest):
     try:
-        result = fingerprint_service.verify_fingerprint(payload.fingerprint_data)
+        result = fingerprint_service.verify_fingerprint(payload.fingerprint_data, payload.top_k)
         return result
+    except LowQualityFingerprintError as e:
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "quality": e.quality, "message": str(e)})
+    except InvalidFingerprintDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:  # pragma: no cover - defensive programming
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/fingerprints/verify/template")
+def verify_fingerprint_template(fingerprint_data: bytes = Body(..., media_type="application/octet-stream"),
+                                top_k: int = Query(1, ge=1, le=settings.max_top_k)):
+    """Verify a template sent as the raw request body instead of base64 in JSON."""
+    try:
+        return fingerprint_service.verify_fingerprint(fingerprint_data, top_k)
+    except LowQualityFingerprintError as e:
+        raise HTTPException(status_code=422, detail={"reason": e.reason, "quality": e.quality, "message": str(e)})
+    except InvalidFingerprintDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:  # pragma: no cover - defensive programming
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/fingerprints/backend")
+def describe_backend():
+    return fingerprint_service.backend.describe()
@@ -1,11 +1,30 @@
-from pydantic import BaseSettings
+from typing import Optional
+
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:  # pydantic v1
+    from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     fingerprint_reader_port: str = "/dev/ttyUSB0"
     database_url: str = "sqlite:///./test.db"
     debug: bool = True
+    fingerprint_backend: str = "auto"  # auto, fprintd, libfprint, minutiae, template or simulator
+    match_threshold: Optional[float] = None  # decision threshold; None keeps the backend default
+    gallery_path: Optional[str] = None  # directory of the memory-mapped minutiae gallery; None keeps it in memory
+    candidate_shortlist: Optional[int] = None  # candidates the index passes to the matcher; None scores all
+    candidate_index: str = "hash"  # shortlist index: hash (geometric hashing) or embedding (IVF over template embeddings)
+    embedding_codebooks: Optional[str] = None  # .npz of product-quantization codebooks for the embedding index; None keeps float32 vectors
+    matcher_workers: int = 0  # processes splitting each search over the gallery store; 0 searches in-process
+    screen_minutiae: int = 0  # probe minutiae for approximate screening before full comparison; 0 compares all
+    screen_margin: float = 0.1  # screening slack; larger is more accurate and slower, none is exact
+    max_top_k: int = 50  # most candidates a verification may ask for with top_k
+    first_accept: bool = False  # stop single-answer searches at the first confident match
+    pattern_fallback: Optional[str] = None  # bin the gallery by pattern class; classes searched next: none, neighbours or all
+    enroll_min_quality: float = 0.5  # templates scoring lower are rejected before enrollment; 0 accepts all
+    verify_min_quality: float = 0.3  # probes scoring lower are rejected before the 1:N search; 0 accepts all
 
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
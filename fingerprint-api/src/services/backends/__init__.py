@@ -0,0 +1,56 @@
+"""Capture and match backends, selected by name from configuration."""
+
+from typing import Any, Callable, Dict
+
+from .base import BackendUnavailableError, Capability, FingerprintBackend
+from .simulator import SimulatorBackend
+from .template_matcher import TemplateMatcherBackend
+
+
+def _fprintd(**options: Any) -> FingerprintBackend:
+    from .fprintd import FprintdBackend
+    return FprintdBackend(**options)
+
+
+def _minutiae(**options: Any) -> FingerprintBackend:
+    from .minutiae import MinutiaeBackend
+    return MinutiaeBackend(**options)
+
+
+def _libfprint(**options: Any) -> FingerprintBackend:
+    from .libfprint import LibfprintBackend
+    return LibfprintBackend(**options)
+
+
+BACKENDS: Dict[str, Callable[..., FingerprintBackend]] = {
+    "fprintd": _fprintd,
+    "libfprint": _libfprint,
+    "minutiae": _minutiae,
+    "template": TemplateMatcherBackend,
+    "simulator": SimulatorBackend,
+}
+
+
+def create_backend(name: str = "auto", **options: Any) -> FingerprintBackend:
+    """Build the named backend; ``auto`` uses a libfprint reader when present, else the simulator."""
+    if name == "auto":
+        try:
+            return _libfprint()
+        except BackendUnavailableError:
+            return SimulatorBackend()
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown fingerprint backend {name!r}; expected one of {sorted(BACKENDS)} or 'auto'")
+    return factory(**options)
+
+
+__all__ = [
+    "BACKENDS",
+    "BackendUnavailableError",
+    "Capability",
+    "FingerprintBackend",
+    "SimulatorBackend",
+    "TemplateMatcherBackend",
+    "create_backend",
+]
@@ -0,0 +1,82 @@
+"""Capture and match backend interface shared by every fingerprint backend."""
+
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from ..matching.quality import QualityReport
+
+
+class Capability(str, Enum):
+    """What a backend can do beyond the basic 1:1 verify."""
+
+    CAPTURE = "capture"  # reads live fingers from a reader
+    NATIVE_IDENTIFY = "native_identify"  # 1:N search done by the backend itself
+    TEMPLATE_EXPORT = "template_export"  # enroll returns a template the caller can store
+    BATCH_MATCH = "batch_match"  # scores one probe against many templates in one call
+    GALLERY = "gallery"  # keeps its own prepared copy of the enrolled templates
+
+
+class BackendUnavailableError(RuntimeError):
+    """The configured backend cannot run on this host."""
+
+
+class FingerprintBackend:
+    """Base class for capture and match backends.
+
+    Templates are opaque bytes. ``verify(template)`` captures a live finger on
+    backends with ``CAPTURE``; with an explicit ``probe`` the two templates are
+    compared in-process. ``identify`` and ``match_batch`` are only implemented
+    by backends that advertise ``NATIVE_IDENTIFY`` and ``BATCH_MATCH``;
+    ``GALLERY`` backends are told about every enrolled template and search
+    their own copy with ``search``.
+    """
+
+    name: str = ""
+    capabilities: FrozenSet[Capability] = frozenset()
+    threshold: float = 0.5  # minimum match_batch score counted as a match
+
+    def supports(self, capability: Capability) -> bool:
+        return capability in self.capabilities
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "capabilities": sorted(capability.value for capability in self.capabilities),
+        }
+
+    def enroll(self, user_id: str) -> bytes:
+        """Capture a finger for ``user_id`` and return its template."""
+        raise NotImplementedError(f"{self.name} backend cannot enroll")
+
+    def verify(self, template: bytes, probe: Optional[bytes] = None) -> bool:
+        """Check a finger (captured live, or ``probe``) against ``template``."""
+        raise NotImplementedError(f"{self.name} backend cannot verify")
+
+    def identify(self, gallery: Mapping[Hashable, bytes], probe: Optional[bytes] = None) -> Optional[Hashable]:
+        """Return the gallery key whose template matches the finger, if any."""
+        raise NotImplementedError(f"{self.name} backend has no native identify")
+
+    def match_batch(self, probe: bytes, templates: Sequence[bytes]) -> List[float]:
+        """Similarity of ``probe`` to each template, in order."""
+        raise NotImplementedError(f"{self.name} backend has no batch matching")
+
+    def add_template(self, user_id: str, template: bytes, finger: str = "") -> None:
+        """Add an enrolled template of one of ``user_id``'s fingers to the backend's gallery."""
+        raise NotImplementedError(f"{self.name} backend keeps no gallery")
+
+    def remove_template(self, user_id: str, finger: Optional[str] = None) -> int:
+        """Drop the templates of ``user_id`` (only ``finger``'s if given) from the gallery; returns how many."""
+        raise NotImplementedError(f"{self.name} backend keeps no gallery")
+
+    def search(self, probe: bytes, top_k: int = 5) -> List[Tuple[str, float]]:
+        """The ``top_k`` best scoring ``(user_id, score)`` pairs in the gallery, best first."""
+        raise NotImplementedError(f"{self.name} backend keeps no gallery")
+
+    def consolidate(self, templates: Sequence[bytes]) -> bytes:
+        """Merge several captures of one finger into a single template."""
+        raise NotImplementedError(f"{self.name} backend cannot merge enrollment samples")
+
+    def assess(self, template: bytes) -> Optional["QualityReport"]:
+        """Quality of a submitted template, or None if the backend cannot judge its templates."""
+        return None
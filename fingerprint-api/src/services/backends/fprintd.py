@@ -0,0 +1,115 @@
+"""Backend that delegates capture, storage and matching to the fprintd daemon."""
+
+import threading
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Hashable, Mapping, Optional
+
+from .base import BackendUnavailableError, Capability, FingerprintBackend
+
+try:
+    from gi.repository import GLib
+    from pydbus import SessionBus, SystemBus
+except ImportError:  # pragma: no cover - optional dependency
+    GLib = None
+
+FPRINTD_BUS_NAME = "net.reactivated.Fprint"
+FPRINTD_MANAGER_PATH = "/net/reactivated/Fprint/Manager"
+
+_loop_lock = threading.Lock()
+_loop_thread: Optional[threading.Thread] = None
+
+
+def _start_main_loop() -> None:
+    """Run one long-lived GLib main loop per process on a daemon thread.
+
+    fprintd status signals are dispatched on it; callers only wait on futures
+    instead of spinning a loop of their own for every operation.
+    """
+    global _loop_thread
+    with _loop_lock:
+        if _loop_thread is None or not _loop_thread.is_alive():
+            _loop_thread = threading.Thread(target=GLib.MainLoop().run, name="glib-main-loop", daemon=True)
+            _loop_thread.start()
+
+
+class FprintdBackend(FingerprintBackend):
+    """fprintd keeps the templates itself, keyed by username.
+
+    The "template" handled by this backend is therefore the UTF-8 username the
+    prints are stored under. Native identify is available when the daemon
+    exposes IdentifyStart.
+    """
+
+    name = "fprintd"
+
+    def __init__(self, bus: str = "system", timeout: float = 30.0) -> None:
+        if GLib is None:
+            raise BackendUnavailableError("pydbus and PyGObject are required for the fprintd backend")
+        try:
+            self.bus = SessionBus() if bus == "session" else SystemBus()
+            manager = self.bus.get(FPRINTD_BUS_NAME, FPRINTD_MANAGER_PATH)
+            self.device = self.bus.get(FPRINTD_BUS_NAME, manager.GetDefaultDevice())
+        except Exception as exc:
+            raise BackendUnavailableError(f"fprintd is not reachable: {exc}") from exc
+        _start_main_loop()
+        self.timeout = timeout
+        capabilities = {Capability.CAPTURE}
+        if hasattr(self.device, "IdentifyStart"):
+            capabilities.add(Capability.NATIVE_IDENTIFY)
+        self.capabilities = frozenset(capabilities)
+
+    def enroll(self, user_id: str, finger: str = "right-index-finger") -> bytes:
+        self.device.Claim(user_id)
+        try:
+            result = self._run("EnrollStatus", lambda: self.device.EnrollStart(finger), self.device.EnrollStop)
+        finally:
+            self.device.Release()
+        if result[0] != "enroll-completed":
+            raise RuntimeError(f"Enrollment failed: {result[0]}")
+        return user_id.encode()
+
+    def verify(self, template: bytes, probe: Optional[bytes] = None) -> bool:
+        if probe is not None:
+            raise NotImplementedError("fprintd can only verify against a live capture")
+        self.device.Claim(template.decode())
+        try:
+            result = self._run("VerifyStatus", lambda: self.device.VerifyStart("any"), self.device.VerifyStop)
+        finally:
+            self.device.Release()
+        return result[0] == "verify-match"
+
+    def identify(self, gallery: Mapping[Hashable, bytes], probe: Optional[bytes] = None) -> Optional[Hashable]:
+        if probe is not None:
+            raise NotImplementedError("fprintd can only identify a live capture")
+        by_username = {template.decode(): key for key, template in gallery.items()}
+        self.device.Claim("")
+        try:
+            result = self._run(
+                "IdentifyStatus", lambda: self.device.IdentifyStart(list(by_username)), self.device.IdentifyStop)
+        finally:
+            self.device.Release()
+        if result[0] != "identify-match":
+            return None
+        return by_username.get(result[1])
+
+    def _run(self, signal_name: str, start: Any, stop: Any) -> tuple:
+        """Start an action and wait for its final status signal, delivered on the shared main loop."""
+        outcome: Future = Future()
+
+        def on_status(*args: Any) -> None:
+            if args[-1]:  # done
+                try:
+                    outcome.set_result(args[:-1])
+                except InvalidStateError:
+                    pass  # a second final status after the first one
+
+        subscription = getattr(self.device, signal_name).connect(on_status)
+        try:
+            start()
+            return outcome.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"No {signal_name} from fprintd within {self.timeout} seconds") from None
+        finally:
+            subscription.disconnect()
+            stop()
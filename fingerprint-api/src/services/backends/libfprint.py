@@ -0,0 +1,35 @@
+"""Backend for readers driven directly through python-libfprint."""
+
+from typing import Optional
+
+from ...utils.exceptions import FingerprintEnrollmentError
+from .. import libfprint_driver
+from .base import BackendUnavailableError, Capability, FingerprintBackend
+
+
+class LibfprintBackend(FingerprintBackend):
+    """Captures on the first libfprint device; templates are libfprint print data."""
+
+    name = "libfprint"
+    capabilities = frozenset({Capability.CAPTURE, Capability.TEMPLATE_EXPORT})
+
+    def __init__(self, driver: Optional[libfprint_driver.LibfprintDriver] = None) -> None:
+        if driver is None:
+            if not libfprint_driver.HARDWARE_AVAILABLE:
+                raise BackendUnavailableError("python-libfprint is not available")
+            try:
+                driver = libfprint_driver.LibfprintDriver()
+            except RuntimeError as exc:
+                raise BackendUnavailableError(str(exc)) from exc
+        self.driver = driver
+
+    def enroll(self, user_id: str) -> bytes:
+        result = self.driver.enroll_fingerprint()
+        if result["status"] != "success":
+            raise FingerprintEnrollmentError(result.get("message", "Fingerprint capture failed"))
+        return result["data"]
+
+    def verify(self, template: bytes, probe: Optional[bytes] = None) -> bool:
+        if probe is not None:
+            raise NotImplementedError("libfprint can only verify against a live capture")
+        return bool(self.driver.verify_fingerprint(template))
@@ -0,0 +1,122 @@
+"""In-process minutiae matcher with a NumPy-vectorized gallery."""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..matching import (
+    EmbeddingIndex, GeometricHashIndex, MatchingEngine, MatchingPool, PatternBins, ProductQuantizer,
+    StoredMatchingEngine, consolidate, encode_template, parse_template,
+)
+from ..matching.quality import QualityReport, assess_quality
+from .base import Capability, FingerprintBackend
+
+
+class MinutiaeBackend(FingerprintBackend):
+    """Templates are packed minutiae arrays; 1:N search runs over the whole gallery at once."""
+
+    name = "minutiae"
+    capabilities = frozenset({
+        Capability.NATIVE_IDENTIFY, Capability.BATCH_MATCH, Capability.TEMPLATE_EXPORT, Capability.GALLERY,
+    })
+
+    def __init__(self, gallery_path: Optional[str] = None, shortlist: Optional[int] = None,
+                 workers: int = 0, first_accept: bool = False, pattern_fallback: Optional[str] = None,
+                 candidate_index: str = "hash", embedding_codebooks: Optional[str] = None,
+                 **engine_options: Any) -> None:
+        """``gallery_path`` keeps the gallery in a memory-mapped store there instead of in memory;
+        ``shortlist`` scores only that many candidates picked by the ``candidate_index``: "hash"
+        (geometric hashing) or "embedding" (nearest template embeddings in an IVF index);
+        ``embedding_codebooks`` is a file saved by ``ProductQuantizer.save`` that makes the
+        embedding index keep product-quantization codes instead of float32 vectors;
+        ``workers`` splits every search over that many processes sharing the store;
+        ``first_accept`` ends single-answer searches at the first confident match;
+        ``pattern_fallback`` bins the gallery by pattern class and sets which other
+        classes a search falls back to ("none", "neighbours" or "all")."""
+        if candidate_index not in ("hash", "embedding"):
+            raise ValueError("The candidate index is either hash or embedding")
+        if embedding_codebooks and candidate_index != "embedding":
+            raise ValueError("Product-quantization codebooks only apply to the embedding candidate index")
+        self.first_accept = first_accept
+        self.candidate_index = candidate_index
+        self.pool: Optional[MatchingPool] = None
+        if workers:
+            if not gallery_path:
+                raise ValueError("A matcher pool shares the gallery store; set a gallery path")
+            if shortlist:
+                raise ValueError("Matcher workers scan the whole gallery; use either workers or a shortlist")
+            if pattern_fallback:
+                raise ValueError("Matcher workers scan the whole gallery; use either workers or pattern bins")
+            self.pool = MatchingPool(gallery_path, workers, **engine_options).start()
+        if shortlist:
+            quantizer = ProductQuantizer.load(embedding_codebooks) if embedding_codebooks else None
+            index = GeometricHashIndex() if candidate_index == "hash" else EmbeddingIndex(quantizer=quantizer)
+            engine_options.update(index=index, shortlist=shortlist)
+        if pattern_fallback:
+            engine_options.update(bins=PatternBins(pattern_fallback))
+        if gallery_path:
+            self.engine: MatchingEngine = StoredMatchingEngine.open(gallery_path, **engine_options)
+        else:
+            self.engine = MatchingEngine(**engine_options)
+
+    @property
+    def threshold(self) -> float:  # type: ignore[override]
+        return self.engine.threshold
+
+    @threshold.setter
+    def threshold(self, value: float) -> None:
+        self.engine.threshold = value
+
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description.update(templates=len(self.engine), gallery_bytes=self.engine.nbytes)
+        if self.engine.index is not None:
+            description.update(shortlist=self.engine.shortlist, candidate_index=self.candidate_index,
+                               index_bytes=self.engine.index.nbytes)
+            if isinstance(self.engine.index, EmbeddingIndex) and self.engine.index.quantizer is not None:
+                description.update(embedding_code_bytes=self.engine.index.quantizer.subspaces)
+        if self.engine.bins is not None:
+            description.update(pattern_fallback=self.engine.bins.fallback,
+                               pattern_classes=self.engine.pattern_classes())
+        if self.pool is not None:
+            description.update(shards=self.pool.metrics())
+        else:
+            description.update(comparisons=self.engine.comparison_stats())
+        return description
+
+    def assess(self, template: bytes) -> Optional[QualityReport]:
+        return assess_quality(parse_template(template))
+
+    def consolidate(self, templates: Sequence[bytes]) -> bytes:
+        minutiae, _ = consolidate([parse_template(template) for template in templates])
+        return encode_template(minutiae)
+
+    def verify(self, template: bytes, probe: Optional[bytes] = None) -> bool:
+        if probe is None:
+            raise ValueError("The minutiae matcher needs a probe template")
+        return self.match_batch(probe, [template])[0] >= self.threshold
+
+    def identify(self, gallery: Any, probe: Optional[bytes] = None) -> Optional[str]:
+        if probe is None:
+            raise ValueError("The minutiae matcher needs a probe template")
+        matches = self.search(probe, 1)
+        return matches[0][0] if matches and matches[0][1] >= self.threshold else None
+
+    def match_batch(self, probe: bytes, templates: Any) -> List[float]:
+        engine = MatchingEngine(
+            threshold=self.engine.threshold, neighbours=self.engine.neighbours,
+            max_minutiae=self.engine.max_minutiae)
+        for position, template in enumerate(templates):
+            engine.add(str(position), parse_template(template))
+        return engine.scores(parse_template(probe)).tolist() if len(engine) else []
+
+    def add_template(self, user_id: str, template: bytes, finger: str = "") -> None:
+        self.engine.add(user_id, parse_template(template), finger)
+
+    def remove_template(self, user_id: str, finger: Optional[str] = None) -> int:
+        return self.engine.remove(user_id, finger)
+
+    def search(self, probe: bytes, top_k: int = 5) -> List[Tuple[str, float]]:
+        searcher = self.pool if self.pool is not None else self.engine
+        # Only a single answer can stop at the first confident match
+        first_accept = self.first_accept and top_k == 1
+        matches = searcher.identify(parse_template(probe), top_k, first_accept=first_accept)
+        return [(match.user_id, match.score) for match in matches]
@@ -0,0 +1,60 @@
+"""Deterministic simulated reader for development, tests and load tests."""
+
+import random
+import threading
+import time
+from typing import Hashable, List, Mapping, Optional, Sequence
+
+from .base import Capability, FingerprintBackend
+
+
+class SimulatorBackend(FingerprintBackend):
+    """Pretends to capture ``presented`` after a seeded, configurable delay.
+
+    Templates are compared byte for byte, so a probe matches exactly the
+    templates enrolled from the same presented finger.
+    """
+
+    name = "simulator"
+    capabilities = frozenset({
+        Capability.CAPTURE, Capability.NATIVE_IDENTIFY, Capability.TEMPLATE_EXPORT, Capability.BATCH_MATCH,
+    })
+
+    def __init__(
+        self,
+        presented: bytes = b"sample_data",
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: Optional[int] = 0,
+    ) -> None:
+        self.presented = presented
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def capture(self) -> bytes:
+        delay_ms = self.latency_ms
+        if self.jitter_ms:
+            with self._lock:
+                delay_ms = max(self._random.gauss(self.latency_ms, self.jitter_ms), 0.0)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        return self.presented
+
+    def enroll(self, user_id: str) -> bytes:
+        return self.capture()
+
+    def verify(self, template: bytes, probe: Optional[bytes] = None) -> bool:
+        finger = self.capture() if probe is None else probe
+        return finger == template
+
+    def identify(self, gallery: Mapping[Hashable, bytes], probe: Optional[bytes] = None) -> Optional[Hashable]:
+        finger = self.capture() if probe is None else probe
+        for key, template in gallery.items():
+            if template == finger:
+                return key
+        return None
+
+    def match_batch(self, probe: bytes, templates: Sequence[bytes]) -> List[float]:
+        return [1.0 if template == probe else 0.0 for template in templates]
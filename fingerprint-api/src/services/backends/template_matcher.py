@@ -0,0 +1,44 @@
+"""In-process template matcher: no reader, compares stored templates directly."""
+
+from typing import Callable, Hashable, List, Mapping, Optional, Sequence
+
+from .base import Capability, FingerprintBackend
+
+ScoreFunction = Callable[[bytes, bytes], float]
+
+
+def exact_score(probe: bytes, template: bytes) -> float:
+    return 1.0 if probe == template else 0.0
+
+
+class TemplateMatcherBackend(FingerprintBackend):
+    """Matches probe templates submitted by clients against the gallery.
+
+    ``score`` compares two templates and returns a similarity in [0, 1]; the
+    default only accepts identical templates.
+    """
+
+    name = "template"
+    capabilities = frozenset({Capability.NATIVE_IDENTIFY, Capability.BATCH_MATCH, Capability.TEMPLATE_EXPORT})
+
+    def __init__(self, score: ScoreFunction = exact_score, threshold: float = 0.5) -> None:
+        self.score = score
+        self.threshold = threshold
+
+    def verify(self, template: bytes, probe: Optional[bytes] = None) -> bool:
+        if probe is None:
+            raise ValueError("The template matcher needs a probe template")
+        return self.score(probe, template) >= self.threshold
+
+    def identify(self, gallery: Mapping[Hashable, bytes], probe: Optional[bytes] = None) -> Optional[Hashable]:
+        if probe is None:
+            raise ValueError("The template matcher needs a probe template")
+        keys = list(gallery)
+        scores = self.match_batch(probe, [gallery[key] for key in keys])
+        if not scores:
+            return None
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return keys[best] if scores[best] >= self.threshold else None
+
+    def match_batch(self, probe: bytes, templates: Sequence[bytes]) -> List[float]:
+        return [self.score(probe, template) for template in templates]
@@ -1,19 +1,121 @@
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+from ..utils.exceptions import InvalidFingerprintDataError, LowQualityFingerprintError
+from .backends import Capability, FingerprintBackend, create_backend
+from .matching.quality import QualityReport
+
+
+@lru_cache(maxsize=None)
+def default_backend() -> FingerprintBackend:
+    """The configured backend, built once per process so every endpoint shares its gallery."""
+    options: Dict[str, Any] = {}
+    if settings.fingerprint_backend == "minutiae":
+        options.update(gallery_path=settings.gallery_path, shortlist=settings.candidate_shortlist,
+                       candidate_index=settings.candidate_index, embedding_codebooks=settings.embedding_codebooks,
+                       workers=settings.matcher_workers, first_accept=settings.first_accept,
+                       pattern_fallback=settings.pattern_fallback,
+                       screen_minutiae=settings.screen_minutiae, screen_margin=settings.screen_margin)
+    backend = create_backend(settings.fingerprint_backend, **options)
+    if settings.match_threshold is not None:
+        backend.threshold = settings.match_threshold
+    return backend
+
+
+@lru_cache(maxsize=None)
+def default_service() -> "FingerprintService":
+    """The service behind every router, so templates enrolled through one are seen by the others."""
+    return FingerprintService()
 
-from .libfprint_driver import LibfprintDriver
 
 class FingerprintService:
-    def __init__(self) -> None:
-        self.driver = LibfprintDriver()
+    def __init__(self, backend: Optional[FingerprintBackend] = None, enroll_min_quality: Optional[float] = None,
+                 verify_min_quality: Optional[float] = None) -> None:
+        self.backend = backend or default_backend()
+        self.templates: Dict[Tuple[str, str], bytes] = {}  # (user_id, finger) -> template
+        self.enroll_min_quality = settings.enroll_min_quality if enroll_min_quality is None else enroll_min_quality
+        self.verify_min_quality = settings.verify_min_quality if verify_min_quality is None else verify_min_quality
+
+    def check_quality(self, fingerprint_data: bytes, min_quality: float) -> Optional[QualityReport]:
+        """Reject a submitted template scoring below ``min_quality`` before any matching.
+
+        Returns the quality report, or None when the gate is off or the
+        backend cannot judge its templates.
+        """
+        if not min_quality or not fingerprint_data:
+            return None
+        report = self.backend.assess(fingerprint_data)
+        if report is not None and report.score < min_quality:
+            raise LowQualityFingerprintError(report.reason, report.score)
+        return report
+
+    def enroll_fingerprint(self, user_id: str, fingerprint_data: bytes, finger: str = "") -> Dict[str, Any]:
+        """Enroll one of ``user_id``'s fingers, replacing only an earlier template of that finger."""
+        self.check_quality(fingerprint_data, self.enroll_min_quality)
+        template = fingerprint_data or self.backend.enroll(user_id)
+        if self.backend.supports(Capability.GALLERY):
+            self.backend.remove_template(user_id, finger)
+            self.backend.add_template(user_id, template, finger)
+        else:
+            self.templates[user_id, finger] = template
+        return {"message": "Fingerprint enrolled successfully", "user_id": user_id, "finger": finger}
+
+    def enroll_samples(self, user_id: str, samples: Sequence[bytes], finger: str = "") -> Dict[str, Any]:
+        """Enroll several captures of one finger as a single consolidated template.
+
+        Each capture goes through the enrollment quality gate; the backend
+        then merges them, so 1:N searches compare each finger once instead of
+        once per capture.
+        """
+        if not samples:
+            raise InvalidFingerprintDataError("No enrollment samples")
+        for sample in samples:
+            self.check_quality(sample, self.enroll_min_quality)
+        template = self.backend.consolidate(samples) if len(samples) > 1 else samples[0]
+        self.enroll_fingerprint(user_id, template, finger)
+        return {"message": "Fingerprint enrolled successfully", "user_id": user_id, "finger": finger,
+                "samples": len(samples)}
 
-    def enroll_fingerprint(self, user_id: str, fingerprint_data: bytes) -> Dict[str, Any]:
+    def verify_fingerprint(self, fingerprint_data: bytes, top_k: int = 1) -> Dict[str, Any]:
+        self.check_quality(fingerprint_data, self.verify_min_quality)
+        if self.backend.supports(Capability.GALLERY):
+            candidates = self.search(fingerprint_data, max(top_k, 1))
+            best = candidates[0] if candidates else None
+            if best is None or best["score"] < self.backend.threshold:
+                return {"match": False, "candidates": candidates}
+            return {"match": True, "user_id": best["user_id"], "score": best["score"], "candidates": candidates}
+        user_id = self.identify(fingerprint_data) if self.templates else None
+        return {"match": True, "user_id": user_id} if user_id is not None else {"match": False}
 
-        # Logic to save fingerprint_data associated with user_id
-        return {"message": "Fingerprint enrolled successfully", "user_id": user_id}
+    def search(self, fingerprint_data: bytes, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Best ``top_k`` enrolled users for a probe, with their scores, best first."""
+        return [
+            {"user_id": user_id, "score": round(score, 4)}
+            for user_id, score in self.backend.search(fingerprint_data, top_k)
+        ]
 
-    def verify_fingerprint(self, fingerprint_data: bytes) -> Dict[str, Any]:
-        match = self.driver.verify_fingerprint(fingerprint_data)
-        if match:
+    def identify(self, fingerprint_data: bytes) -> Optional[str]:
+        """1:N search over the enrolled templates, using the fastest path the backend offers.
 
-            return {"match": True, "user_id": "1234"}
-        return {"match": False}
\ No newline at end of file
+        Backends with a reader identify the finger on the reader; the others
+        match the submitted template in-process.
+        """
+        probe = None if self.backend.supports(Capability.CAPTURE) else fingerprint_data
+        if self.backend.supports(Capability.GALLERY):
+            matches = self.backend.search(fingerprint_data, 1)
+            return matches[0][0] if matches and matches[0][1] >= self.backend.threshold else None
+        if self.backend.supports(Capability.NATIVE_IDENTIFY):
+            key = self.backend.identify(self.templates, probe)
+            return key[0] if key is not None else None
+        keys = list(self.templates)
+        if self.backend.supports(Capability.BATCH_MATCH) and probe is not None:
+            scores = self.backend.match_batch(probe, [self.templates[key] for key in keys])
+            best = max(range(len(scores)), key=scores.__getitem__, default=None)
+            if best is None or scores[best] < self.backend.threshold:
+                return None
+            return keys[best][0]
+        for user_id, finger in keys:
+            if self.backend.verify(self.templates[user_id, finger], probe):
+                return user_id
+        return None
@@ -0,0 +1,36 @@
+"""Software minutiae matching: templates, descriptors and the 1:N engine."""
+
+from .consolidation import consolidate
+from .embedding import EmbeddingIndex, embed
+from .engine import Match, MatchingEngine
+from .gallery_store import GalleryStore, StoredMatchingEngine
+from .index import GeometricHashIndex
+from .libfprint_print import print_minutiae, print_templates
+from .pattern_class import PatternBins, classify_pattern
+from .pool import MatchingPool
+from .quantization import ProductQuantizer
+from .minutiae import local_descriptors, pack_template, parse_template
+from .template_format import decode_template, encode_template, template_info
+
+__all__ = [
+    "EmbeddingIndex",
+    "GalleryStore",
+    "GeometricHashIndex",
+    "Match",
+    "MatchingEngine",
+    "MatchingPool",
+    "PatternBins",
+    "ProductQuantizer",
+    "StoredMatchingEngine",
+    "classify_pattern",
+    "consolidate",
+    "decode_template",
+    "embed",
+    "encode_template",
+    "local_descriptors",
+    "pack_template",
+    "parse_template",
+    "print_minutiae",
+    "print_templates",
+    "template_info",
+]
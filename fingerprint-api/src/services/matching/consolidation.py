@@ -0,0 +1,141 @@
+"""Merging several enrollment captures of one finger into a single template."""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ...utils.exceptions import InvalidFingerprintDataError
+from .minutiae import MINUTIA_FIELDS, local_descriptors
+
+DISTANCE_TOLERANCE = 10.0  # px between two captures of the same minutia after alignment
+ANGLE_TOLERANCE = 0.35  # radians
+MIN_OVERLAP = 10  # minutiae a capture must share with the reference to be merged
+
+
+def consolidate(samples: Sequence[np.ndarray], min_support: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge captures of one finger into a super-template and its minutia weights.
+
+    Every capture is aligned (rotation and translation) to the one with the
+    most minutiae. Local-descriptor pairs of the same type, closest first,
+    each seed an alignment; the search stops at the first seed that lines up
+    half of the minutiae (usually among the first few), or keeps the best
+    seed overall. Minutiae of different captures that land within
+    ``DISTANCE_TOLERANCE`` pixels and ``ANGLE_TOLERANCE`` radians of each
+    other are the same minutia; its position, direction and type are averaged. A minutia seen in at least
+    ``min_support`` captures is kept (all of them with a single capture), with
+    the share of captures it appeared in as its weight. The result is sorted
+    by weight, so the most reliable minutiae are the ones the matcher keeps
+    when a template has more than its ``max_minutiae``.
+
+    Raises ``InvalidFingerprintDataError`` if a capture does not overlap the
+    reference, e.g. when it is a different finger.
+    """
+    samples = [np.asarray(sample, dtype=np.float32).reshape(-1, MINUTIA_FIELDS) for sample in samples]
+    if not samples:
+        raise InvalidFingerprintDataError("No enrollment samples to consolidate")
+    order = sorted(range(len(samples)), key=lambda index: -len(samples[index]))
+    reference = samples[order[0]]
+    clusters = _Clusters(reference)
+    for index in order[1:]:
+        aligned = _align(reference, samples[index])
+        if aligned is None:
+            raise InvalidFingerprintDataError(f"Enrollment sample {index} does not overlap the others")
+        clusters.merge(aligned)
+    return clusters.result(len(samples), min(min_support, len(samples)))
+
+
+class _Clusters:
+    """Running sums of the minutiae merged so far, one row per distinct minutia."""
+
+    def __init__(self, reference: np.ndarray) -> None:
+        self.xy = reference[:, :2].astype(np.float64)
+        self.direction = np.column_stack([np.cos(reference[:, 2]), np.sin(reference[:, 2])])
+        self.types = reference[:, 3].astype(np.float64)
+        self.support = np.ones(len(reference))
+
+    def merge(self, minutiae: np.ndarray) -> None:
+        centres = self.xy / self.support[:, None]
+        angles = np.arctan2(self.direction[:, 1], self.direction[:, 0])
+        taken = _pair_up(minutiae, centres, angles)
+        for row, cluster in taken:
+            self.xy[cluster] += minutiae[row, :2]
+            self.direction[cluster] += np.cos(minutiae[row, 2]), np.sin(minutiae[row, 2])
+            self.types[cluster] += minutiae[row, 3]
+            self.support[cluster] += 1
+        new = np.setdiff1d(np.arange(len(minutiae)), [row for row, _ in taken])
+        self.xy = np.concatenate([self.xy, minutiae[new, :2]])
+        self.direction = np.concatenate(
+            [self.direction, np.column_stack([np.cos(minutiae[new, 2]), np.sin(minutiae[new, 2])])])
+        self.types = np.concatenate([self.types, minutiae[new, 3]])
+        self.support = np.concatenate([self.support, np.ones(len(new))])
+
+    def result(self, samples: int, min_support: int) -> Tuple[np.ndarray, np.ndarray]:
+        keep = np.flatnonzero(self.support >= min_support)
+        keep = keep[np.argsort(-self.support[keep], kind="stable")]
+        support = self.support[keep]
+        minutiae = np.column_stack([
+            self.xy[keep] / support[:, None],
+            np.mod(np.arctan2(self.direction[keep, 1], self.direction[keep, 0]), 2 * np.pi),
+            np.rint(self.types[keep] / support),
+        ]).astype(np.float32)
+        return minutiae, (support / samples).astype(np.float32)
+
+
+def _align(reference: np.ndarray, sample: np.ndarray) -> Optional[np.ndarray]:
+    """``sample`` moved into the reference frame, or None if too few minutiae line up."""
+    similarity = _descriptor_distances(sample, reference)
+    seeds = np.argsort(similarity, axis=None)
+    enough = max(MIN_OVERLAP, min(len(sample), len(reference)) // 2)
+    found_pairs: List[Tuple[int, int]] = []
+    for row, column in zip(*np.unravel_index(seeds, similarity.shape)):
+        if not np.isfinite(similarity[row, column]):
+            break
+        moved = _transform(sample, reference[column, 2] - sample[row, 2], reference[column, :2], sample[row, :2])
+        pairs = _pair_up(moved, reference[:, :2], reference[:, 2])
+        if len(pairs) > len(found_pairs):
+            found_pairs = pairs
+            if len(pairs) >= enough:
+                break
+    if len(found_pairs) < min(MIN_OVERLAP, len(sample), len(reference)):
+        return None
+    # Refine on every pair that lined up (2-D least-squares rigid fit)
+    rows, columns = np.array(found_pairs).T
+    source, target = sample[rows, :2].astype(np.float64), reference[columns, :2].astype(np.float64)
+    source_mean, target_mean = source.mean(axis=0), target.mean(axis=0)
+    a, b = (source - source_mean).T, (target - target_mean).T
+    rotation = np.arctan2((a[0] * b[1] - a[1] * b[0]).sum(), (a * b).sum())
+    return _transform(sample, rotation, target_mean, source_mean)
+
+
+def _transform(minutiae: np.ndarray, rotation: float, target: np.ndarray, source: np.ndarray) -> np.ndarray:
+    """Rotate ``minutiae`` by ``rotation`` so that ``source`` lands on ``target``."""
+    cos, sin = np.cos(rotation), np.sin(rotation)
+    matrix = np.array([[cos, -sin], [sin, cos]])
+    moved = minutiae.astype(np.float64).copy()
+    moved[:, :2] = (moved[:, :2] - source) @ matrix.T + target
+    moved[:, 2] = np.mod(moved[:, 2] + rotation, 2 * np.pi)
+    return moved
+
+
+def _pair_up(minutiae: np.ndarray, xy: np.ndarray, angles: np.ndarray) -> List[Tuple[int, int]]:
+    """One-to-one pairs (minutia row, target row) within tolerance, closest first."""
+    distances = np.hypot(minutiae[:, None, 0] - xy[None, :, 0], minutiae[:, None, 1] - xy[None, :, 1])
+    turn = np.abs(np.angle(np.exp(1j * (minutiae[:, None, 2] - angles[None, :]))))
+    distances[(distances > DISTANCE_TOLERANCE) | (turn > ANGLE_TOLERANCE)] = np.inf
+    rows, columns = np.nonzero(np.isfinite(distances))
+    pairs, used_rows, used_columns = [], set(), set()
+    for index in np.argsort(distances[rows, columns], kind="stable"):
+        row, column = rows[index], columns[index]
+        if row not in used_rows and column not in used_columns:
+            used_rows.add(row)
+            used_columns.add(column)
+            pairs.append((int(row), int(column)))
+    return pairs
+
+
+def _descriptor_distances(sample: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Squared local-descriptor distances, infinite between minutiae of different types."""
+    ours, theirs = local_descriptors(sample), local_descriptors(reference)
+    distances = (ours ** 2).sum(axis=1)[:, None] + (theirs ** 2).sum(axis=1)[None, :] - 2 * ours @ theirs.T
+    distances[sample[:, None, 3] != reference[None, :, 3]] = np.inf
+    return distances
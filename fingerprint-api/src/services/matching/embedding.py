@@ -0,0 +1,232 @@
+"""Fixed-length fingerprint embeddings and an in-process approximate nearest-neighbour index."""
+
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from .index import pair_invariants
+from .quantization import ProductQuantizer
+
+# Pair histogram: each minutia with its nearest neighbours, like a Minutia Cylinder-Code cell
+EMBEDDING_NEIGHBOURS = 8
+DISTANCE_STEP = 20.0  # px per distance bin
+MAX_DISTANCE = 160.0  # px; farther neighbours are left out
+ANGLE_BINS = 8  # per relative angle
+DISTANCE_BINS = int(MAX_DISTANCE // DISTANCE_STEP) + 1
+HISTOGRAM_SIZE = 4 * DISTANCE_BINS * ANGLE_BINS * ANGLE_BINS  # times the 4 type combinations
+EMBEDDING_DIMENSIONS = 512
+PROJECTION_SEED = 20240917  # fixed so every process projects the same way
+_CORNERS = np.array([[(corner >> axis) & 1 for axis in range(3)] for corner in range(8)])
+
+
+def pair_histogram(minutiae: np.ndarray) -> np.ndarray:
+    """Histogram of the pair invariants of each minutia and its nearest neighbours.
+
+    Every (distance, angle, angle, types) tuple from ``pair_invariants`` is
+    spread over the 2 x 2 x 2 closest (distance, angle, angle) cells of its
+    type combination with trilinear weights, so small shifts between captures
+    move weight gradually instead of jumping bins. Pooling the cells over all
+    minutiae gives one translation and rotation invariant vector per template:
+    the sum of the minutiae's cylinder codes.
+    """
+    distance, angle_i, angle_j, types = pair_invariants(minutiae, EMBEDDING_NEIGHBOURS, MAX_DISTANCE)
+    coordinates = np.stack([distance / DISTANCE_STEP, angle_i * (ANGLE_BINS / (2 * np.pi)),
+                            angle_j * (ANGLE_BINS / (2 * np.pi))])
+    low = np.floor(coordinates)
+    fraction = coordinates - low
+    # (8 corners, 3 axes, pairs): the bins each pair spreads over and their weights
+    bins = low.astype(np.int64)[None] + _CORNERS[:, :, None]
+    weights = np.where(_CORNERS[:, :, None] == 1, fraction[None], 1 - fraction[None]).prod(axis=1)
+    distance_bin = np.minimum(bins[:, 0], DISTANCE_BINS - 1)
+    cells = ((types * DISTANCE_BINS + distance_bin) * ANGLE_BINS + bins[:, 1] % ANGLE_BINS) * ANGLE_BINS
+    cells += bins[:, 2] % ANGLE_BINS
+    return np.bincount(cells.ravel(), weights.ravel(), minlength=HISTOGRAM_SIZE)
+
+
+def embed(minutiae: np.ndarray) -> np.ndarray:
+    """Unit-length ``EMBEDDING_DIMENSIONS`` vector of a template; genuine pairs have a high dot product.
+
+    The pair histogram goes through a fixed random Gaussian projection, which
+    keeps dot products on average while cutting the vector to a size a large
+    gallery can hold in memory.
+    """
+    vector = pair_histogram(minutiae).astype(np.float32) @ _projection()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@lru_cache(maxsize=1)
+def _projection() -> np.ndarray:
+    rng = np.random.default_rng(PROJECTION_SEED)
+    return (rng.standard_normal((HISTOGRAM_SIZE, EMBEDDING_DIMENSIONS)) / np.sqrt(EMBEDDING_DIMENSIONS)).astype(np.float32)
+
+
+class EmbeddingIndex:
+    """Inverted-file (IVF) index over template embeddings that shortlists gallery rows.
+
+    Embeddings are clustered with k-means into about sqrt(n) lists, and each
+    is stored with its list. A probe is compared with the list centroids, and
+    only the vectors of its ``probes`` closest lists are scored, by dot
+    product. Until ``train_size`` templates are enrolled, and for templates
+    added since the last rebuild (up to ``tail_size``), scoring is exhaustive.
+    The lists are retrained whenever the gallery has grown ``retrain_growth``
+    times since the last training, which takes seconds at 100k templates.
+
+    Vectors of a list are contiguous, so scoring a list reads one slice.
+    With a trained ``quantizer`` the lists hold product-quantization codes
+    instead of float32 vectors (``quantizer.subspaces`` bytes a template,
+    not 2048) and are scored from the probe's lookup tables; the tail stays
+    full precision until it is moved into the lists. The rows follow the
+    engine's, like ``GeometricHashIndex``.
+    """
+
+    def __init__(self, probes: int = 32, train_size: int = 4096, tail_size: int = 1024,
+                 retrain_growth: float = 4.0, iterations: int = 10, seed: int = 0,
+                 quantizer: Optional[ProductQuantizer] = None) -> None:
+        if quantizer is not None and quantizer.dimensions != EMBEDDING_DIMENSIONS:
+            raise ValueError(f"The product quantizer must be trained on {EMBEDDING_DIMENSIONS}-dimensional embeddings")
+        self.quantizer = quantizer
+        self.probes = probes
+        self.train_size = train_size
+        self.tail_size = tail_size
+        self.retrain_growth = retrain_growth
+        self.iterations = iterations
+        self.seed = seed
+        self.clear()
+
+    def clear(self) -> None:
+        self.centroids = np.zeros((0, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        # (n, dimensions) vectors, or (subspaces, n) codes with a quantizer; sorted by list
+        self._stored = self._encode(np.zeros((0, EMBEDDING_DIMENSIONS), dtype=np.float32))
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._offsets = np.zeros(1, dtype=np.int64)  # list l holds positions offsets[l]:offsets[l + 1]
+        self._tail_vectors = np.zeros((self.tail_size, EMBEDDING_DIMENSIONS), dtype=np.float32)
+        self._tail_rows = np.zeros(self.tail_size, dtype=np.int32)
+        self._tail_length = 0
+        self._trained_size = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Rows indexed so far (the next row ``add`` expects is this one)."""
+        return self._size
+
+    @property
+    def lists(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the vectors or codes, their rows, the tail and the centroids."""
+        stored = self._stored.nbytes + self._rows.nbytes
+        return stored + self._tail_vectors.nbytes + self._tail_rows.nbytes + self.centroids.nbytes
+
+    def add(self, row: int, minutiae: np.ndarray) -> None:
+        """Index the template stored at gallery ``row``."""
+        if self._tail_length == self.tail_size:
+            self._rebuild()
+        self._tail_vectors[self._tail_length] = embed(minutiae)
+        self._tail_rows[self._tail_length] = row
+        self._tail_length += 1
+        self._size = max(self._size, row + 1)
+        if self._size >= max(self.train_size, self.retrain_growth * self._trained_size):
+            self.train()
+
+    def drop(self, rows: np.ndarray) -> None:
+        """Remove ``rows`` and renumber the rest, as the engine does when it compacts its gallery."""
+        self._rebuild()
+        removed = np.unique(np.asarray(rows, dtype=np.int64))
+        keep = ~np.isin(self._rows, removed)
+        lists = np.repeat(np.arange(len(self._offsets) - 1), np.diff(self._offsets))[keep]
+        self._stored = self._take(self._stored, keep)
+        self._rows = (self._rows[keep] - np.searchsorted(removed, self._rows[keep])).astype(np.int32)
+        self._offsets = np.searchsorted(lists, np.arange(len(self._offsets)))
+        self._size -= len(removed)
+
+    def train(self) -> None:
+        """Cluster every indexed embedding into fresh lists (k-means on a sample, then assign all)."""
+        self._rebuild()
+        count = len(self._rows)
+        lists = max(1, int(round(np.sqrt(count))))
+        rng = np.random.default_rng(self.seed)
+        sample = self._decode(self._take(self._stored, rng.choice(count, min(count, 64 * lists), replace=False)))
+        centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Spherical k-means; an empty list keeps its centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids).astype(np.float32)
+        self.centroids = centroids
+        self._trained_size = count
+        self._sort(self._stored, self._rows)
+
+    def scores(self, probe: np.ndarray) -> np.ndarray:
+        """Dot product of the probe embedding with every row (-inf for rows never added).
+
+        Exact, or from the codes' lookup tables with a quantizer.
+        """
+        query = embed(probe)
+        self._rebuild()
+        result = np.full(self._size, -np.inf, dtype=np.float32)
+        result[self._rows] = self._score([(0, len(self._rows))], query)
+        return result
+
+    def shortlist(self, probe: np.ndarray, size: int, exclude: Optional[np.ndarray] = None) -> np.ndarray:
+        """About the ``size`` rows whose embeddings are closest to the probe's, skipping ``exclude``d rows."""
+        query = embed(probe)
+        if self.lists:
+            closest = np.argpartition(-(self.centroids @ query), min(self.probes, self.lists) - 1)
+            spans = [(self._offsets[item], self._offsets[item + 1]) for item in closest[:self.probes]]
+        else:
+            spans = [(0, len(self._rows))]
+        rows = [self._rows[start:stop] for start, stop in spans]
+        scores = [self._score(spans, query)]
+        if self._tail_length:
+            rows.append(self._tail_rows[:self._tail_length])
+            scores.append(self._tail_vectors[:self._tail_length] @ query)
+        rows_found, scores_found = np.concatenate(rows), np.concatenate(scores)
+        if exclude is not None:
+            live = ~exclude[rows_found]
+            rows_found, scores_found = rows_found[live], scores_found[live]
+        if size < len(rows_found):
+            rows_found = rows_found[np.argpartition(-scores_found, size - 1)[:size]]
+        return np.sort(rows_found)
+
+    def _rebuild(self) -> None:
+        """Move the tail into the lists (every vector into list 0 before training)."""
+        if not self._tail_length:
+            return
+        tail = self._encode(self._tail_vectors[:self._tail_length])
+        stored = np.concatenate([self._stored, tail], axis=0 if self.quantizer is None else 1)
+        rows = np.concatenate([self._rows, self._tail_rows[:self._tail_length]])
+        self._tail_length = 0
+        self._sort(stored, rows)
+
+    def _sort(self, stored: np.ndarray, rows: np.ndarray) -> None:
+        lists = np.zeros(len(rows), dtype=np.int64)
+        if self.lists:
+            for start in range(0, len(rows), 16384):
+                vectors = self._decode(self._take(stored, slice(start, start + 16384)))
+                lists[start:start + 16384] = np.argmax(vectors @ self.centroids.T, axis=1)
+        order = np.argsort(lists, kind="stable")
+        self._stored, self._rows = np.ascontiguousarray(self._take(stored, order)), rows[order]
+        self._offsets = np.searchsorted(lists[order], np.arange(max(self.lists, 1) + 1))
+
+    def _score(self, spans: List[Tuple[int, int]], query: np.ndarray) -> np.ndarray:
+        """Scores of the stored vectors at positions ``spans`` against the ``query`` embedding."""
+        if self.quantizer is None:
+            return np.concatenate([self._stored[start:stop] @ query for start, stop in spans])
+        # One gather per subspace over all the spans beats one per span
+        codes = np.concatenate([self._stored[:, start:stop] for start, stop in spans], axis=1)
+        return self.quantizer.scores(codes, self.quantizer.tables(query))
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors if self.quantizer is None else self.quantizer.encode(vectors)
+
+    def _decode(self, stored: np.ndarray) -> np.ndarray:
+        return stored if self.quantizer is None else self.quantizer.decode(stored)
+
+    def _take(self, stored: np.ndarray, positions: Any) -> np.ndarray:
+        return stored[positions] if self.quantizer is None else stored[:, positions]
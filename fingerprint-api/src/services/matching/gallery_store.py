@@ -0,0 +1,357 @@
+"""Persistent gallery: templates as columnar, memory-mapped NumPy arrays."""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .engine import Match, MatchingEngine
+
+FORMAT_VERSION = 2  # 2 added the fingers column; version 1 stores are upgraded when opened
+USER_ID_BYTES = 64
+FINGER_BYTES = 32
+
+
+class GalleryStore:
+    """Append-only template gallery kept as one fixed-stride file per column.
+
+    Minutiae are stored row by row across all templates (``minutiae.f32``
+    holds x, y and angle, ``types.u1`` the type); ``offsets.i64`` gives each
+    template's first row and minutia count, ``user_ids.s64`` its owner and
+    ``fingers.s32`` the finger it was enrolled as.
+    The matcher's padded descriptors and norms are stored alongside, so a
+    restart maps the files instead of rebuilding the gallery, and every worker
+    process reading the same directory shares the page cache.
+
+    Appends only add bytes to the end of each file, under an exclusive lock.
+    The offsets column is written last and is the commit record: readers see
+    as many templates as it has complete rows, and a writer first truncates
+    whatever a crashed append left behind. Deleting a template sets its byte
+    in ``deleted.u1`` in place; ``compact`` rewrites the files without them.
+    """
+
+    def __init__(self, directory: str, max_minutiae: int = 48, dimensions: int = 16) -> None:
+        self.directory = directory
+        self.max_minutiae = max_minutiae
+        self.dimensions = dimensions
+        os.makedirs(directory, exist_ok=True)
+        self._check_meta()
+        # Column name -> (file name, dtype, per-template shape or None for per-minutia columns)
+        self._columns: Dict[str, Tuple[str, np.dtype, Optional[tuple]]] = {
+            "minutiae": ("minutiae.f32", np.dtype("<f4"), None),
+            "types": ("types.u1", np.dtype("u1"), None),
+            "descriptors": ("descriptors.f32", np.dtype("<f4"), (max_minutiae, dimensions)),
+            "norms": ("norms.f32", np.dtype("<f4"), (max_minutiae,)),
+            "user_ids": ("user_ids.s64", np.dtype(f"S{USER_ID_BYTES}"), ()),
+            "fingers": ("fingers.s32", np.dtype(f"S{FINGER_BYTES}"), ()),
+            "deleted": ("deleted.u1", np.dtype("u1"), ()),
+            "offsets": ("offsets.i64", np.dtype("<i8"), (2,)),
+        }
+        self._identity: Optional[Tuple[int, int]] = None
+        self._mapped = False
+        self.generation = 0  # bumped on every remap
+        self._size = 0
+        self._user_ids: List[str] = []
+        self._fingers: List[str] = []
+        self.refresh()
+
+    def __len__(self) -> int:
+        """Stored templates, including deleted ones that still occupy a row."""
+        return self._size
+
+    @property
+    def user_ids(self) -> List[str]:
+        return self._user_ids
+
+    @property
+    def fingers(self) -> List[str]:
+        return self._fingers
+
+    @property
+    def deleted(self) -> np.ndarray:
+        return self._deleted.astype(bool)
+
+    @property
+    def epoch(self) -> Optional[int]:
+        """Changes when ``compact`` renumbers the rows."""
+        return self._identity[0] if self._identity else None
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the mapped columns on disk."""
+        paths = [self._path(name) for name, _, _ in self._columns.values()]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    def refresh(self) -> bool:
+        """Map templates appended (or a compaction done) by other processes; True if anything changed."""
+        try:
+            stat = os.stat(self._path("offsets.i64"))
+            identity = (stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            identity = None
+        if self._mapped and identity == self._identity:
+            return False
+        if identity is None or (self._identity is not None and identity[0] != self._identity[0]):
+            self._user_ids, self._fingers = [], []
+        self._identity, self._mapped = identity, True
+        self.generation += 1
+        self._size = identity[1] // 16 if identity else 0
+        self._map()
+        start = len(self._user_ids)
+        self._user_ids.extend(raw.decode() for raw in self._user_id_column[start:self._size])
+        self._fingers.extend(raw.decode() for raw in self._finger_column[start:self._size])
+        return True
+
+    def append(self, user_id: str, minutiae: np.ndarray, descriptors: np.ndarray, norms: np.ndarray,
+               finger: str = "") -> int:
+        """Store one template and its prepared gallery row; returns the template's row."""
+        encoded = user_id.encode()
+        if len(encoded) > USER_ID_BYTES:
+            raise ValueError(f"User ids are limited to {USER_ID_BYTES} bytes in the gallery store")
+        if len(finger.encode()) > FINGER_BYTES:
+            raise ValueError(f"Finger names are limited to {FINGER_BYTES} bytes in the gallery store")
+        minutiae = np.asarray(minutiae, dtype=np.float32)
+        with self._locked():
+            self.refresh()
+            self._truncate_torn_append()
+            first = self._rows()
+            self._write("minutiae", minutiae[:, :3])
+            self._write("types", minutiae[:, 3])
+            self._write("descriptors", descriptors)
+            self._write("norms", norms)
+            self._write("user_ids", np.array([encoded], dtype=self._columns["user_ids"][1]))
+            self._write("fingers", np.array([finger.encode()], dtype=self._columns["fingers"][1]))
+            self._write("deleted", np.zeros(1))
+            self._write("offsets", np.array([first, len(minutiae)]))
+            self.refresh()
+        return self._size - 1
+
+    def delete(self, user_id: str, finger: Optional[str] = None) -> int:
+        """Mark the live templates of ``user_id`` (only ``finger``'s if given) deleted; returns how many."""
+        with self._locked():
+            self.refresh()
+            rows = [row for row, owner in enumerate(self._user_ids)
+                    if owner == user_id and finger in (None, self._fingers[row]) and not self._deleted[row]]
+            if rows:
+                self._deleted[rows] = 1
+                self._deleted.flush()
+        return len(rows)
+
+    def minutiae(self, row: int) -> np.ndarray:
+        """The (n, 4) minutiae of one stored template."""
+        first, count = self._offsets[row]
+        return np.column_stack([self._minutiae[first:first + count], self._types[first:first + count]])
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Read-only views of the mapped gallery rows, as the matching engine stores them."""
+        return {
+            "descriptors": self._descriptors,
+            "norms": self._norms,
+            "counts": np.minimum(self._offsets[:, 1], self.max_minutiae).astype(np.int32),
+        }
+
+    def compact(self) -> int:
+        """Rewrite the columns without deleted templates; returns how many were dropped.
+
+        Processes that still map the old files keep reading them until their
+        next ``refresh``. Meant for maintenance windows: the columns are swapped
+        one by one, so an interrupted compaction needs a rerun.
+        """
+        with self._locked():
+            self.refresh()
+            keep = np.flatnonzero(self._deleted == 0)
+            dropped = self._size - len(keep)
+            if not dropped:
+                return 0
+            counts = self._offsets[keep, 1]
+            rows = np.concatenate([np.arange(first, first + count) for first, count in self._offsets[keep]]
+                                  + [np.zeros(0, dtype=np.int64)])
+            columns = {
+                "minutiae": self._minutiae[rows], "types": self._types[rows],
+                "descriptors": self._descriptors[keep], "norms": self._norms[keep],
+                "user_ids": self._user_id_column[keep], "fingers": self._finger_column[keep],
+                "deleted": self._deleted[keep],
+                "offsets": np.column_stack([np.cumsum(counts) - counts, counts]),
+            }
+            for name, values in columns.items():
+                file_name, dtype, _ = self._columns[name]
+                with open(self._path(file_name) + ".tmp", "wb") as handle:
+                    handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                    os.fsync(handle.fileno())
+            # Offsets go last, as in append
+            for file_name, _, _ in self._columns.values():
+                os.replace(self._path(file_name) + ".tmp", self._path(file_name))
+            self.refresh()
+        return int(dropped)
+
+    def _check_meta(self) -> None:
+        meta = {"version": FORMAT_VERSION, "max_minutiae": self.max_minutiae, "dimensions": self.dimensions}
+        path = self._path("meta.json")
+        if not os.path.exists(path):
+            with open(path, "w") as handle:
+                json.dump(meta, handle)
+            return
+        with open(path) as handle:
+            stored = json.load(handle)
+        if stored == dict(meta, version=1):
+            self._upgrade_from_version_1(meta)
+            stored = meta
+        if stored != meta:
+            raise ValueError(f"Gallery store {self.directory} was written with {stored}, not {meta}")
+
+    def _upgrade_from_version_1(self, meta: Dict[str, Any]) -> None:
+        """Give every template of a version 1 store an empty finger, then record version 2."""
+        with self._locked():
+            offsets = self._path("offsets.i64")
+            size = os.path.getsize(offsets) // 16 if os.path.exists(offsets) else 0
+            with open(self._path("fingers.s32"), "wb") as handle:
+                handle.write(bytes(size * FINGER_BYTES))
+                os.fsync(handle.fileno())
+            with open(self._path("meta.json") + ".tmp", "w") as handle:
+                json.dump(meta, handle)
+            os.replace(self._path("meta.json") + ".tmp", self._path("meta.json"))
+
+    def _map(self) -> None:
+        size = self._size
+        self._offsets = self._column("offsets", size)
+        rows = int(self._offsets[-1].sum()) if size else 0
+        self._minutiae = self._column("minutiae", rows)
+        self._types = self._column("types", rows)
+        self._descriptors = self._column("descriptors", size)
+        self._norms = self._column("norms", size)
+        self._user_id_column = self._column("user_ids", size)
+        self._finger_column = self._column("fingers", size)
+        self._deleted = self._column("deleted", size, mode="r+")
+
+    def _column(self, name: str, length: int, mode: str = "r") -> np.ndarray:
+        file_name, dtype, shape = self._columns[name]
+        shape = (length, 3) if name == "minutiae" else (length,) + (shape or ())
+        if not length:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._path(file_name), dtype=dtype, mode=mode, shape=shape)
+
+    def _rows(self) -> int:
+        return int(self._offsets[-1].sum()) if self._size else 0
+
+    def _truncate_torn_append(self) -> None:
+        for name, (file_name, dtype, shape) in self._columns.items():
+            if shape is None:
+                length = self._rows() * dtype.itemsize * (3 if name == "minutiae" else 1)
+            else:
+                length = self._size * dtype.itemsize * int(np.prod(shape))
+            path = self._path(file_name)
+            if os.path.exists(path) and os.path.getsize(path) != length:
+                os.truncate(path, length)
+
+    def _write(self, name: str, values: Any) -> None:
+        file_name, dtype, _ = self._columns[name]
+        with open(self._path(file_name), "ab") as handle:
+            handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self._path(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+
+
+class StoredMatchingEngine(MatchingEngine):
+    """A ``MatchingEngine`` whose gallery lives in a ``GalleryStore``.
+
+    Scoring reads the mapped descriptor columns directly. Every call first
+    picks up templates other processes appended, so workers sharing a store
+    see each other's enrollments.
+    """
+
+    def __init__(self, store: GalleryStore, **options: Any) -> None:
+        super().__init__(**options)
+        if (store.max_minutiae, store.dimensions) != (self.max_minutiae, self.dimensions):
+            raise ValueError("The gallery store was built for different matcher settings")
+        self.store = store
+        self._generation = None
+        self._index_epoch = None
+        self._sync()
+
+    @classmethod
+    def open(cls, directory: str, **options: Any) -> "StoredMatchingEngine":
+        """Engine over the store in ``directory``, created with the layout these options need."""
+        layout = MatchingEngine(**options)
+        return cls(GalleryStore(directory, layout.max_minutiae, layout.dimensions), **options)
+
+    def __len__(self) -> int:
+        self._sync()
+        return self._size - int(self.store.deleted.sum())
+
+    @property
+    def user_ids(self) -> List[str]:
+        self._sync()
+        deleted = self.store.deleted
+        return [user_id for row, user_id in enumerate(self._user_ids) if not deleted[row]]
+
+    @property
+    def fingers(self) -> List[str]:
+        self._sync()
+        deleted = self.store.deleted
+        return [finger for row, finger in enumerate(self._fingers) if not deleted[row]]
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes
+
+    def add(self, user_id: str, minutiae: np.ndarray, finger: str = "") -> None:
+        descriptors, norms, _ = self.encode(minutiae)
+        self.store.append(user_id, minutiae, descriptors, norms, finger)
+        self._sync()
+
+    def remove(self, user_id: str, finger: Optional[str] = None) -> int:
+        removed = self.store.delete(user_id, finger)
+        self._sync()
+        return removed
+
+    def scores(self, probe: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        self._sync()
+        return super().scores(probe, rows)
+
+    def identify(self, probe: np.ndarray, top_k: int = 5, rows: Optional[np.ndarray] = None,
+                 first_accept: bool = False) -> List[Match]:
+        self._sync()
+        return super().identify(probe, top_k, rows, first_accept)
+
+    def pattern_classes(self) -> Dict[str, int]:
+        self._sync()
+        return super().pattern_classes()
+
+    def _removed(self) -> Optional[np.ndarray]:
+        deleted = self.store.deleted[:self._size]
+        return deleted if deleted.any() else None
+
+    def _sync(self) -> None:
+        self.store.refresh()
+        if self._generation != self.store.generation:
+            self._generation = self.store.generation
+            arrays = self.store.arrays()
+            self._descriptors, self._norms, self._counts = arrays["descriptors"], arrays["norms"], arrays["counts"]
+            self._user_ids, self._fingers = self.store.user_ids, self.store.fingers
+            self._size = len(self.store)
+            if self.index is not None or self.bins is not None:
+                self._sync_index()
+
+    def _sync_index(self) -> None:
+        # Rows are stable until a compaction; then the index and pattern bins start over
+        indexes = [index for index in (self.index, self.bins) if index is not None]
+        if self.store.epoch != self._index_epoch or any(len(index) > self._size for index in indexes):
+            for index in indexes:
+                index.clear()
+            self._index_epoch = self.store.epoch
+        for index in indexes:
+            for row in range(len(index), self._size):
+                index.add(row, self.store.minutiae(row))
@@ -0,0 +1,176 @@
+"""Geometric-hashing index that shortlists gallery templates before full matching."""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def pair_invariants(minutiae: np.ndarray, neighbours: int = 6,
+                    max_distance: float = 150.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Rotation and translation invariants of each minutia paired with its nearest neighbours.
+
+    For the pair (i, j) these are the distance between the two minutiae and
+    the ridge angle of each one measured from the line joining them, plus the
+    two types. Returns (distance, angle_i, angle_j, types) with one entry per
+    pair; ``types`` packs the two minutia types into 0..3.
+    """
+    minutiae = np.asarray(minutiae, dtype=np.float32)
+    count = len(minutiae)
+    neighbours = min(neighbours, count - 1)
+    if neighbours < 1:
+        empty = np.zeros(0, dtype=np.float32)
+        return empty, empty, empty, empty.astype(np.int64)
+    xy = minutiae[:, :2]
+    offsets = xy[None, :, :] - xy[:, None, :]
+    distances = np.hypot(offsets[..., 0], offsets[..., 1])
+    np.fill_diagonal(distances, np.inf)
+    nearest = np.argpartition(distances, neighbours - 1, axis=1)[:, :neighbours]
+
+    first = np.repeat(np.arange(count), neighbours)
+    second = nearest.ravel()
+    distance = distances[first, second]
+    close = distance < max_distance
+    first, second, distance = first[close], second[close], distance[close]
+    bearing = np.arctan2(offsets[first, second, 1], offsets[first, second, 0])
+    angle_i = np.mod(minutiae[first, 2] - bearing, 2 * np.pi)
+    angle_j = np.mod(minutiae[second, 2] - bearing, 2 * np.pi)
+    types = (minutiae[first, 3].astype(np.int64) << 1) | minutiae[second, 3].astype(np.int64)
+    return distance, angle_i, angle_j, types
+
+
+class GeometricHashIndex:
+    """Inverted index from quantized minutia-pair invariants to gallery rows.
+
+    Every template contributes one hash key per minutia pair (see
+    ``pair_invariants``). A probe votes for each row sharing one of its keys,
+    and the rows with the most votes form the shortlist that the full matcher
+    then scores. Probe invariants are also looked up in the neighbouring bin of
+    each quantized value, so pairs near a bin edge still find their
+    counterpart.
+
+    Postings are two parallel arrays (key, row) sorted by key, so a lookup is
+    a binary search and the votes are one ``bincount``. New templates go to a
+    small unsorted tail that is merged in when it grows past ``tail_size``
+    postings; removing rows rewrites the arrays.
+    """
+
+    def __init__(
+        self,
+        neighbours: int = 4,
+        max_distance: float = 150.0,
+        distance_step: float = 6.0,
+        angle_bins: int = 24,
+        tail_size: int = 65536,
+    ) -> None:
+        self.neighbours = neighbours
+        self.max_distance = max_distance
+        self.distance_step = distance_step
+        self.angle_bins = angle_bins
+        self.tail_size = tail_size
+        self.clear()
+
+    def clear(self) -> None:
+        self._keys = np.zeros(0, dtype=np.uint32)
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._tail_keys: list = []
+        self._tail_rows: list = []
+        self._tail_length = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Rows indexed so far (the next row ``add`` expects is this one)."""
+        return self._size
+
+    @property
+    def postings(self) -> int:
+        return len(self._keys) + self._tail_length
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the postings."""
+        return self.postings * (self._keys.itemsize + self._rows.itemsize)
+
+    def add(self, row: int, minutiae: np.ndarray) -> None:
+        """Index the template stored at gallery ``row``."""
+        keys = np.unique(self._quantize(*pair_invariants(minutiae, self.neighbours, self.max_distance)))
+        self._tail_keys.append(keys.astype(np.uint32))
+        self._tail_rows.append(np.full(len(keys), row, dtype=np.int32))
+        self._tail_length += len(keys)
+        self._size = max(self._size, row + 1)
+        if self._tail_length > self.tail_size:
+            self._merge()
+
+    def drop(self, rows: np.ndarray) -> None:
+        """Remove ``rows`` and renumber the rest, as the engine does when it compacts its gallery."""
+        self._merge()
+        removed = np.unique(np.asarray(rows, dtype=np.int32))
+        keep = ~np.isin(self._rows, removed)
+        self._keys = self._keys[keep]
+        self._rows = self._rows[keep] - np.searchsorted(removed, self._rows[keep]).astype(np.int32)
+        self._size -= len(removed)
+
+    def votes(self, probe: np.ndarray) -> np.ndarray:
+        """Number of the probe's (multi-probed) pair keys each row shares."""
+        keys = self._probe_keys(probe)
+        low = np.searchsorted(self._keys, keys, side="left")
+        high = np.searchsorted(self._keys, keys, side="right")
+        lengths = high - low
+        # Positions of every matching posting: each run low..high laid end to end
+        starts = np.repeat(low - np.cumsum(lengths) + lengths, lengths)
+        positions = starts + np.arange(lengths.sum())
+        votes = np.bincount(self._rows[positions], minlength=self._size)
+        if self._tail_length:
+            tail_keys = np.concatenate(self._tail_keys)
+            hits = np.isin(tail_keys, keys)
+            votes += np.bincount(np.concatenate(self._tail_rows)[hits], minlength=self._size)
+        return votes
+
+    def shortlist(self, probe: np.ndarray, size: int, exclude: Optional[np.ndarray] = None) -> np.ndarray:
+        """The ``size`` rows with the most votes (ties in row order), skipping ``exclude``d rows."""
+        votes = self.votes(probe)
+        if exclude is not None:
+            votes[exclude[:len(votes)]] = -1
+        if size >= len(votes):
+            return np.flatnonzero(votes >= 0)
+        best = np.argpartition(-votes, size - 1)[:size]
+        return np.sort(best[votes[best] >= 0])
+
+    def _probe_keys(self, probe: np.ndarray) -> np.ndarray:
+        distance, angle_i, angle_j, types = pair_invariants(probe, self.neighbours, self.max_distance)
+        # The value and its nearest other bin for each invariant: 8 lookups per pair
+        variants = []
+        for other_d in (False, True):
+            for other_i in (False, True):
+                for other_j in (False, True):
+                    variants.append(self._quantize(distance, angle_i, angle_j, types, other_d, other_i, other_j))
+        return np.unique(np.concatenate(variants)).astype(np.uint32)
+
+    def _quantize(self, distance: np.ndarray, angle_i: np.ndarray, angle_j: np.ndarray, types: np.ndarray,
+                  other_d: bool = False, other_i: bool = False, other_j: bool = False) -> np.ndarray:
+        """Hash keys; each ``other_*`` flag puts that value in its nearer neighbouring bin instead of its own."""
+        bins = self.angle_bins
+        step = 2 * np.pi / bins
+        distance_bin = np.maximum(self._bin(distance / self.distance_step, other_d), 0)
+        bin_i = self._bin(angle_i / step, other_i) % bins
+        bin_j = self._bin(angle_j / step, other_j) % bins
+        return ((distance_bin * bins + bin_i) * bins + bin_j) * 4 + types
+
+    @staticmethod
+    def _bin(value: np.ndarray, other: bool) -> np.ndarray:
+        base = np.floor(value)
+        if other:
+            base = np.where(value - base < 0.5, base - 1, base + 1)
+        return base.astype(np.int64)
+
+    def _merge(self) -> None:
+        if not self._tail_length:
+            return
+        tail_keys = np.concatenate(self._tail_keys)
+        tail_rows = np.concatenate(self._tail_rows)
+        order = np.argsort(tail_keys, kind="stable")
+        tail_keys, tail_rows = tail_keys[order], tail_rows[order]
+        # Linear merge of the sorted tail into the sorted postings
+        at = np.searchsorted(self._keys, tail_keys, side="right")
+        self._keys = np.insert(self._keys, at, tail_keys)
+        self._rows = np.insert(self._rows, at, tail_rows)
+        self._tail_keys, self._tail_rows, self._tail_length = [], [], 0
@@ -0,0 +1,97 @@
+"""Minutiae from serialized libfprint prints (``PrintData``/``FpPrint``)."""
+
+import struct
+from typing import List
+
+import numpy as np
+
+from ...utils.exceptions import InvalidFingerprintDataError
+from .minutiae import ENDING, MINUTIA_FIELDS
+from .template_format import Buffer, encode_template
+
+# libfprint 0.x (python-libfprint): "FP1"/"FP2", driver id, device type, data type
+LEGACY_HEADER = struct.Struct("<3sHIB")
+LEGACY_ITEM = struct.Struct("<I")
+LEGACY_NBIS = 1
+# NBIS ``struct xyt_struct``: row count, then fixed x, y and theta columns
+XYT_ROWS = 200
+XYT_SIZE = 4 + 3 * 4 * XYT_ROWS
+# libfprint 1.x: "FP1" followed by a little-endian GVariant
+PRINT_VARIANT = "(issbymsmsia{sv}v)"
+PRINT_NBIS = 2
+
+
+def is_libfprint_print(data: Buffer) -> bool:
+    return bytes(memoryview(data)[:3]) in (b"FP1", b"FP2")
+
+
+def print_minutiae(data: Buffer) -> List[np.ndarray]:
+    """One (n, 4) minutiae array per impression stored in a serialized libfprint print.
+
+    Reads both the 0.x format written by python-libfprint and the GVariant
+    format of libfprint 1.x (the latter needs PyGObject). NBIS stores
+    neither minutia types nor sub-pixel positions, so every minutia is
+    reported as a ridge ending at whole pixels. Prints from match-on-chip
+    readers hold device data, not minutiae, and are rejected.
+    """
+    view = memoryview(data)
+    if not is_libfprint_print(view):
+        raise InvalidFingerprintDataError("Not a serialized libfprint print")
+    if bytes(view[:3]) == b"FP2" or _is_legacy(view):
+        return [_from_xyt(*columns) for columns in _legacy_xyt(view)]
+    return [_from_xyt(*columns) for columns in _variant_xyt(view)]
+
+
+def print_templates(data: Buffer) -> List[bytes]:
+    """The impressions of a serialized libfprint print as compact templates."""
+    return [encode_template(minutiae) for minutiae in print_minutiae(data)]
+
+
+def _from_xyt(x: np.ndarray, y: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    minutiae = np.zeros((len(x), MINUTIA_FIELDS), dtype=np.float32)
+    minutiae[:, 0], minutiae[:, 1] = x, y
+    minutiae[:, 2] = np.radians(np.asarray(theta, dtype=np.float32))
+    minutiae[:, 3] = ENDING
+    return minutiae
+
+
+def _is_legacy(view: memoryview) -> bool:
+    # Both formats start with "FP1". The 0.x data type byte falls on the third
+    # character of the 1.x driver name, which is never 0 or 1.
+    return len(view) >= LEGACY_HEADER.size and view[LEGACY_HEADER.size - 1] in (0, LEGACY_NBIS)
+
+
+def _legacy_xyt(view: memoryview) -> List[tuple]:
+    prefix, _, _, data_type = LEGACY_HEADER.unpack_from(view)
+    if data_type != LEGACY_NBIS:
+        raise InvalidFingerprintDataError("libfprint print holds device data, not minutiae")
+    if prefix == b"FP1":
+        items = [view[LEGACY_HEADER.size:]]
+    else:
+        items, offset = [], LEGACY_HEADER.size
+        while offset < len(view):
+            (length,) = LEGACY_ITEM.unpack_from(view, offset)
+            offset += LEGACY_ITEM.size
+            items.append(view[offset:offset + length])
+            offset += length
+    impressions = []
+    for item in items:
+        if len(item) != XYT_SIZE:
+            raise InvalidFingerprintDataError("Truncated NBIS minutiae in libfprint print")
+        (rows,) = struct.unpack_from("<i", item)
+        columns = np.frombuffer(item, dtype="<i4", count=3 * XYT_ROWS, offset=4).reshape(3, XYT_ROWS)
+        impressions.append(tuple(columns[:, :min(max(rows, 0), XYT_ROWS)]))
+    return impressions
+
+
+def _variant_xyt(view: memoryview) -> List[tuple]:
+    try:
+        from gi.repository import GLib
+    except ImportError as exc:
+        raise RuntimeError("Reading libfprint 1.x prints needs PyGObject") from exc
+    variant = GLib.Variant.new_from_bytes(
+        GLib.VariantType.new(PRINT_VARIANT), GLib.Bytes.new(bytes(view[3:])), False)
+    if variant.get_child_value(0).get_int32() != PRINT_NBIS:
+        raise InvalidFingerprintDataError("libfprint print holds device data, not minutiae")
+    (impressions,) = variant.get_child_value(9).get_variant().unpack()
+    return [tuple(np.asarray(column, dtype=np.int32) for column in xyt) for xyt in impressions]
@@ -0,0 +1,78 @@
+"""Minutiae templates and the local descriptors the matcher compares."""
+
+import base64
+import binascii
+
+import numpy as np
+
+from ...utils.exceptions import InvalidFingerprintDataError
+from .template_format import Buffer, decode_template, is_compact_template
+
+# One minutia per row: x, y (pixels), angle (radians), type
+MINUTIA_FIELDS = 4
+ENDING = 0
+BIFURCATION = 1
+MIN_MINUTIAE = 4
+
+# Per neighbour: distance, cos/sin of the relative ridge angle, cos/sin of the bearing
+NEIGHBOUR_FEATURES = 5
+
+
+def pack_template(minutiae: np.ndarray) -> bytes:
+    """Serialize an (n, 4) minutiae array as little-endian float32 rows."""
+    return np.asarray(minutiae, dtype="<f4").reshape(-1, MINUTIA_FIELDS).tobytes()
+
+
+def parse_template(data: Buffer) -> np.ndarray:
+    """Read a compact template (see ``template_format``) or one packed by ``pack_template``,
+    raw or base64-encoded (as sent in JSON)."""
+    raw = data
+    compact = is_compact_template(raw)
+    if not compact:
+        try:
+            decoded = base64.b64decode(data, validate=True)
+            compact = is_compact_template(decoded)
+            if compact or (decoded and len(decoded) % (4 * MINUTIA_FIELDS) == 0):
+                raw = decoded
+        except (binascii.Error, ValueError):
+            pass
+    if compact:
+        # Quantized fields are always finite
+        minutiae = decode_template(raw)
+    elif not len(raw) or len(raw) % (4 * MINUTIA_FIELDS):
+        raise InvalidFingerprintDataError("Template is not a packed minutiae array")
+    else:
+        minutiae = np.frombuffer(raw, dtype="<f4").reshape(-1, MINUTIA_FIELDS).astype(np.float32)
+        if not np.isfinite(minutiae).all():
+            raise InvalidFingerprintDataError("Template contains non-finite values")
+    if len(minutiae) < MIN_MINUTIAE:
+        raise InvalidFingerprintDataError(f"Template has fewer than {MIN_MINUTIAE} minutiae")
+    return minutiae
+
+
+def local_descriptors(minutiae: np.ndarray, neighbours: int = 3, distance_scale: float = 40.0) -> np.ndarray:
+    """Rotation and translation invariant descriptor of each minutia.
+
+    Describes every minutia by its ``neighbours`` nearest minutiae: their
+    distance and the ridge angle and bearing of each one relative to the
+    minutia's own direction. Returns an (n, neighbours * 5) float32 array.
+    """
+    minutiae = np.asarray(minutiae, dtype=np.float32)
+    count = len(minutiae)
+    if count <= neighbours:
+        raise InvalidFingerprintDataError(f"Need more than {neighbours} minutiae to build descriptors")
+    xy = minutiae[:, :2]
+    theta = minutiae[:, 2]
+
+    offsets = xy[None, :, :] - xy[:, None, :]
+    distances = np.hypot(offsets[..., 0], offsets[..., 1])
+    np.fill_diagonal(distances, np.inf)
+    nearest = np.argsort(distances, axis=1)[:, :neighbours]
+
+    rows = np.arange(count)[:, None]
+    distance = distances[rows, nearest] / distance_scale
+    ridge = theta[nearest] - theta[:, None]
+    bearing = np.arctan2(offsets[rows, nearest, 1], offsets[rows, nearest, 0]) - theta[:, None]
+    features = np.stack(
+        [distance, np.cos(ridge), np.sin(ridge), np.cos(bearing), np.sin(bearing)], axis=-1)
+    return features.reshape(count, neighbours * NEIGHBOUR_FEATURES).astype(np.float32)
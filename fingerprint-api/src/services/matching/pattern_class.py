@@ -0,0 +1,181 @@
+"""Global pattern class of a finger (arch, loop, whorl) and a gallery binned by it."""
+
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+ARCH = "arch"
+LEFT_LOOP = "left_loop"
+RIGHT_LOOP = "right_loop"
+WHORL = "whorl"
+UNKNOWN = "unknown"  # too few minutiae to tell; such templates are in every bin
+PATTERN_CLASSES = (ARCH, LEFT_LOOP, RIGHT_LOOP, WHORL, UNKNOWN)
+
+# Classes most often confused with each one, searched next when the probe's class has no match
+NEIGHBOUR_CLASSES: Dict[str, Tuple[str, ...]] = {
+    ARCH: (LEFT_LOOP, RIGHT_LOOP),
+    LEFT_LOOP: (ARCH, WHORL),
+    RIGHT_LOOP: (ARCH, WHORL),
+    WHORL: (LEFT_LOOP, RIGHT_LOOP),
+}
+FALLBACKS = ("none", "neighbours", "all")
+
+GRID_STEP = 20.0  # px between orientation field samples
+SMOOTHING = 35.0  # px; Gaussian width that spreads minutia directions over the grid
+MIN_SUPPORT = 0.5  # summed minutia weight below which a grid point has no orientation
+CLASSIFY_MIN_MINUTIAE = 12
+# Closed loop of 8 grid points around a node, in order, for the Poincare index
+_RING = np.array([(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)])
+
+
+def orientation_field(minutiae: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ridge orientation on a grid over the minutiae, from their directions.
+
+    Returns the doubled orientation angle (rows, columns), the mask of grid
+    points close enough to minutiae to have one, and the grid origin in
+    pixels. Doubling makes a direction and its opposite the same ridge
+    orientation, so Gaussian-weighted averaging is one matrix product.
+    """
+    minutiae = np.asarray(minutiae, dtype=np.float64)
+    xy = minutiae[:, :2]
+    origin = xy.min(axis=0)
+    shape = (np.floor((xy.max(axis=0) - origin) / GRID_STEP).astype(int) + 2)[::-1]
+    rows, columns = np.indices(shape)
+    grid = origin + GRID_STEP * np.column_stack([columns.ravel(), rows.ravel()])
+    squares = ((grid[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2)
+    weights = np.exp(squares * (-0.5 / SMOOTHING ** 2))
+    doubled = weights @ np.exp(2j * minutiae[:, 2])
+    valid = weights.sum(axis=1) > MIN_SUPPORT
+    return np.angle(doubled).reshape(shape), valid.reshape(shape), origin
+
+
+def singular_points(minutiae: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(cores, deltas) as (k, 2) pixel positions, from the Poincare index of the orientation field.
+
+    Walking around a core the doubled orientation turns by +2 pi, around a
+    delta by -2 pi. Detections at neighbouring grid points are one point.
+    """
+    doubled, valid, origin = orientation_field(minutiae)
+    height, width = doubled.shape
+    if height < 3 or width < 3:
+        return np.zeros((0, 2)), np.zeros((0, 2))
+    turn = np.zeros((height - 2, width - 2))
+    inside = np.ones((height - 2, width - 2), dtype=bool)
+    for (row, column), (next_row, next_column) in zip(_RING, np.roll(_RING, -1, axis=0)):
+        here = doubled[1 + row:height - 1 + row, 1 + column:width - 1 + column]
+        there = doubled[1 + next_row:height - 1 + next_row, 1 + next_column:width - 1 + next_column]
+        turn += np.angle(np.exp(1j * (there - here)))
+        inside &= valid[1 + row:height - 1 + row, 1 + column:width - 1 + column]
+    index = np.rint(turn / (2 * np.pi))
+    found = []
+    for sign in (1, -1):
+        nodes: List[np.ndarray] = []
+        for node in np.argwhere(inside & (index == sign)):
+            if all(np.abs(node - other).max() > 1 for other in nodes):
+                nodes.append(node)
+        # Grid (row, column) of each node back to pixel (x, y)
+        found.append(origin + GRID_STEP * (np.array(nodes, dtype=np.float64).reshape(-1, 2)[:, ::-1] + 1))
+    return found[0], found[1]
+
+
+def classify_pattern(minutiae: np.ndarray) -> str:
+    """The pattern class of a template: arch, left or right loop, whorl, or unknown.
+
+    No core is an arch (plain or tented) and two or more are a whorl. A
+    single core is a loop, opening to the left of the image (a left loop)
+    when its delta lies to the right of the core. Without a single delta in
+    the capture, the side comes from the orientation field around the core.
+    """
+    minutiae = np.asarray(minutiae, dtype=np.float64)
+    if len(minutiae) < CLASSIFY_MIN_MINUTIAE:
+        return UNKNOWN
+    cores, deltas = singular_points(minutiae)
+    if not len(cores):
+        return ARCH
+    if len(cores) > 1:
+        return WHORL
+    if len(deltas) == 1:
+        return LEFT_LOOP if deltas[0, 0] > cores[0, 0] else RIGHT_LOOP
+    return LEFT_LOOP if np.cos(_opening(minutiae, cores[0])) < 0 else RIGHT_LOOP
+
+
+def _opening(minutiae: np.ndarray, core: np.ndarray) -> float:
+    """Direction from a loop core along which ridges run radially: the open end of the loop.
+
+    Around a core the orientation is ``bearing / 2 + c``; it is radial where
+    ``bearing == 2c``, and each point on a circle around the core gives an
+    estimate ``2 * orientation - bearing`` of it.
+    """
+    bearings = np.linspace(-np.pi, np.pi, 16, endpoint=False)
+    ring = core + 2 * GRID_STEP * np.column_stack([np.cos(bearings), np.sin(bearings)])
+    squares = ((ring[:, None, :] - minutiae[None, :, :2]) ** 2).sum(axis=2)
+    doubled = np.exp(squares * (-0.5 / SMOOTHING ** 2)) @ np.exp(2j * minutiae[:, 2])
+    return float(np.angle((doubled / np.maximum(np.abs(doubled), 1e-12) * np.exp(-1j * bearings)).sum()))
+
+
+class PatternBins:
+    """Gallery rows grouped by pattern class, so a search can start with the probe's class.
+
+    ``stages`` lists the rows to search in turn: the probe's class (with the
+    ``unknown`` templates), then, if no confident match turned up, the
+    neighbouring classes when ``fallback`` is ``"neighbours"`` or ``"all"``,
+    and finally every other class when it is ``"all"``. ``neighbours`` maps a
+    class to the classes searched after it. Rows follow the engine's, like
+    ``GeometricHashIndex``.
+    """
+
+    def __init__(self, fallback: str = "all", neighbours: Optional[Mapping[str, Sequence[str]]] = None) -> None:
+        if fallback not in FALLBACKS:
+            raise ValueError(f"Pattern class fallback must be one of {', '.join(FALLBACKS)}")
+        self.fallback = fallback
+        self.neighbours = dict(NEIGHBOUR_CLASSES if neighbours is None else neighbours)
+        self.clear()
+
+    def clear(self) -> None:
+        self._classes = np.zeros(0, dtype=np.int8)
+
+    def __len__(self) -> int:
+        """Rows classified so far (the next row ``add`` expects is this one)."""
+        return len(self._classes)
+
+    @property
+    def classes(self) -> List[str]:
+        return [PATTERN_CLASSES[code] for code in self._classes]
+
+    def add(self, row: int, minutiae: np.ndarray) -> None:
+        """Classify the template stored at gallery ``row``."""
+        code = PATTERN_CLASSES.index(classify_pattern(minutiae))
+        if row >= len(self._classes):
+            self._classes = np.resize(self._classes, row + 1)
+        self._classes[row] = code
+
+    def drop(self, rows: np.ndarray) -> None:
+        """Remove ``rows`` and renumber the rest, as the engine does when it compacts its gallery."""
+        self._classes = np.delete(self._classes, np.asarray(rows, dtype=np.int64))
+
+    def sizes(self, exclude: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Templates per class, skipping ``exclude``d rows."""
+        classes = self._classes if exclude is None else self._classes[~exclude[:len(self._classes)]]
+        counts = np.bincount(classes, minlength=len(PATTERN_CLASSES))
+        return {name: int(count) for name, count in zip(PATTERN_CLASSES, counts)}
+
+    def stages(self, probe: np.ndarray, exclude: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """Rows to search in turn for ``probe``, skipping ``exclude``d rows and empty stages."""
+        probe_class = classify_pattern(probe)
+        if probe_class == UNKNOWN:
+            groups = [PATTERN_CLASSES]
+        else:
+            neighbours = tuple(self.neighbours.get(probe_class, ()))
+            groups = [(probe_class, UNKNOWN)]
+            if self.fallback != "none":
+                groups.append(neighbours)
+            if self.fallback == "all":
+                groups.append(tuple(name for name in PATTERN_CLASSES if name not in groups[0] + neighbours))
+        live = np.ones(len(self._classes), dtype=bool) if exclude is None else ~exclude[:len(self._classes)]
+        stages = []
+        for group in groups:
+            codes = [PATTERN_CLASSES.index(name) for name in group]
+            rows = np.flatnonzero(live & np.isin(self._classes, codes))
+            if len(rows):
+                stages.append(rows)
+        return stages
@@ -0,0 +1,220 @@
+"""Worker processes that split 1:N identification over a memory-mapped gallery."""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ...utils.exceptions import FingerprintVerificationError
+from .engine import Match
+from .gallery_store import GalleryStore, StoredMatchingEngine
+
+# BLAS thread pools inside the workers would fight each other for the same cores
+_BLAS_THREADS = ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def _serve(connection: Any, gallery_path: str, engine_options: Dict[str, Any]) -> None:
+    """Worker loop: map the store and answer shard requests until told to stop."""
+    engine = StoredMatchingEngine.open(gallery_path, **engine_options)
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        command, start, stop = message[:3]
+        started = time.perf_counter()
+        if command == "warm":
+            # One pass over the shard faults its pages in and exercises the scoring path
+            if stop > start:
+                engine.scores(engine.store.minutiae(start), np.arange(start, stop))
+            connection.send(("ready", os.getpid(), time.perf_counter() - started))
+        elif command == "identify":
+            probe, top_k, first_accept = message[3:]
+            rows = np.arange(start, stop)
+            matches = engine.identify(probe, top_k, rows, first_accept) if stop > start else []
+            found = [(match.user_id, match.score) for match in matches]
+            connection.send(("ok", found, time.perf_counter() - started, engine.comparison_stats()))
+
+
+class MatchingPool:
+    """Splits every identification across ``workers`` processes.
+
+    Each worker maps the same ``GalleryStore`` files, so the gallery sits once
+    in the page cache (put it under /dev/shm to keep it in memory outright)
+    and nothing is copied to the workers. Worker ``i`` owns the i-th contiguous
+    slice of the gallery rows, recomputed on every request so enrollments
+    spread over the shards. A probe goes to every worker at once; each returns
+    its shard's top ``top_k`` users and the pool merges them. With
+    ``first_accept`` each worker stops at its own first confident match.
+
+    Workers are started with ``spawn`` and single-threaded BLAS, and warm their
+    shard before the pool reports ready. A worker that dies or stops answering
+    within ``timeout`` seconds is replaced and its shard retried once; only a
+    second failure fails the request. ``metrics`` reports per-shard latency.
+    """
+
+    def __init__(self, gallery_path: str, workers: Optional[int] = None, timeout: float = 30.0,
+                 **engine_options: Any) -> None:
+        self.gallery_path = gallery_path
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.engine_options = engine_options
+        self._store = StoredMatchingEngine.open(gallery_path, **engine_options).store
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Any] = [None] * self.workers
+        self._connections: List[Any] = [None] * self.workers
+        self._latencies: List[Deque[float]] = [deque(maxlen=512) for _ in range(self.workers)]
+        self._requests = [0] * self.workers
+        self._respawns = [0] * self.workers
+        self._comparisons: List[Dict[str, Any]] = [{} for _ in range(self.workers)]
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "MatchingPool":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def start(self) -> "MatchingPool":
+        """Start every worker and wait until all of them have warmed their shard."""
+        bounds = self._bounds()
+        for shard in range(self.workers):
+            self._spawn(shard)
+        for shard in range(self.workers):
+            self._warm(shard, bounds[shard])
+        return self
+
+    def close(self) -> None:
+        for shard in range(self.workers):
+            self._stop(shard)
+
+    def identify(self, probe: np.ndarray, top_k: int = 5, first_accept: bool = False) -> List[Match]:
+        """The ``top_k`` best users over all shards, best first (one entry per user)."""
+        with self._lock:
+            bounds = self._bounds()
+            shards = [shard for shard, (start, stop) in enumerate(bounds) if stop > start]
+            for shard in shards:
+                self._send(shard, ("identify",) + bounds[shard] + (probe, top_k, first_accept))
+            found: List[Tuple[str, float]] = []
+            for shard in shards:
+                reply = self._receive(shard)
+                if reply is None:
+                    self._respawn(shard, bounds[shard])
+                    self._send(shard, ("identify",) + bounds[shard] + (probe, top_k, first_accept))
+                    reply = self._receive(shard)
+                if reply is None:
+                    raise FingerprintVerificationError(f"Matcher shard {shard} failed twice")
+                _, matches, seconds, self._comparisons[shard] = reply
+                self._latencies[shard].append(seconds)
+                self._requests[shard] += 1
+                found.extend(matches)
+        found.sort(key=lambda match: -match[1])
+        merged: List[Match] = []
+        seen = set()
+        for user_id, score in found:
+            if user_id not in seen:
+                seen.add(user_id)
+                merged.append(Match(user_id, score))
+                if len(merged) == top_k:
+                    break
+        return merged
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """Per-shard request count, respawns, matching latency (ms, last 512 requests) and
+        comparisons saved by approximate screening and first-accept (since the worker started)."""
+        bounds = self._bounds()
+        report = []
+        for shard in range(self.workers):
+            latencies = np.array(self._latencies[shard]) * 1000
+            process = self._processes[shard]
+            report.append({
+                "shard": shard,
+                "pid": process.pid if process is not None else None,
+                "alive": bool(process is not None and process.is_alive()),
+                "rows": bounds[shard][1] - bounds[shard][0],
+                "requests": self._requests[shard],
+                "respawns": self._respawns[shard],
+                "mean_ms": round(float(latencies.mean()), 2) if len(latencies) else None,
+                "p95_ms": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+                "max_ms": round(float(latencies.max()), 2) if len(latencies) else None,
+                "comparisons": self._comparisons[shard],
+            })
+        return report
+
+    def _bounds(self) -> List[Tuple[int, int]]:
+        self._store.refresh()
+        total = len(self._store)
+        return [(total * shard // self.workers, total * (shard + 1) // self.workers) for shard in range(self.workers)]
+
+    def _spawn(self, shard: int) -> None:
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=_serve, args=(child, self.gallery_path, self.engine_options),
+            name=f"matcher-{shard}", daemon=True)
+        with _single_threaded_blas():
+            process.start()
+        child.close()
+        self._processes[shard], self._connections[shard] = process, parent
+
+    def _warm(self, shard: int, bounds: Tuple[int, int]) -> None:
+        self._send(shard, ("warm",) + bounds)
+        if self._receive(shard) is None:
+            raise FingerprintVerificationError(f"Matcher shard {shard} failed to start")
+
+    def _respawn(self, shard: int, bounds: Tuple[int, int]) -> None:
+        self._stop(shard)
+        self._respawns[shard] += 1
+        self._spawn(shard)
+        self._warm(shard, bounds)
+
+    def _stop(self, shard: int) -> None:
+        process, connection = self._processes[shard], self._connections[shard]
+        if process is None:
+            return
+        try:
+            connection.send(None)
+        except (OSError, ValueError):
+            pass
+        process.join(1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        connection.close()
+        self._processes[shard] = self._connections[shard] = None
+
+    def _send(self, shard: int, message: tuple) -> None:
+        try:
+            self._connections[shard].send(message)
+        except (OSError, ValueError):
+            pass  # the worker is gone; _receive reports it
+
+    def _receive(self, shard: int) -> Optional[tuple]:
+        """The worker's reply, or None if it died or timed out."""
+        connection = self._connections[shard]
+        try:
+            if connection.poll(self.timeout):
+                return connection.recv()
+        except (EOFError, OSError):
+            pass
+        return None
+
+
+@contextmanager
+def _single_threaded_blas() -> Iterator[None]:
+    saved = {variable: os.environ.get(variable) for variable in _BLAS_THREADS}
+    os.environ.update({variable: "1" for variable in _BLAS_THREADS})
+    try:
+        yield
+    finally:
+        for variable, value in saved.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
@@ -0,0 +1,76 @@
+"""Fast quality assessment of minutiae templates before enrollment and search."""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+# Reason codes, one per quality component
+TOO_FEW_MINUTIAE = "too_few_minutiae"
+SMALL_AREA = "small_area"
+POOR_RIDGE_CLARITY = "poor_ridge_clarity"
+
+# Component levels that count as a good capture (score 1.0) at 500 dpi
+GOOD_MINUTIAE = 25
+GOOD_AREA = 40000.0  # px^2 of the minutiae's convex hull, about 10 x 10 mm
+RIDGE_PERIOD = 8.0  # px; genuine minutiae are rarely closer than one ridge period
+
+
+@dataclass(frozen=True)
+class QualityReport:
+    """Per-component scores in [0, 1]; ``score`` is the weakest of them."""
+
+    score: float
+    minutiae: float
+    area: float
+    clarity: float
+    reason: Optional[str]  # weakest component when ``score`` < 1
+
+
+def assess_quality(minutiae: np.ndarray) -> QualityReport:
+    """Score a template on minutiae count, usable area and ridge clarity.
+
+    The API only receives minutiae, so ridge clarity is estimated from them:
+    noisy or scarred ridges break into short fragments whose end points come
+    out as minutiae closer together than one ridge period. Clarity is the share
+    of minutiae with no such neighbour. The usable area is the convex hull of
+    the minutiae. Takes well under a millisecond, against a full 1:N search.
+    """
+    minutiae = np.asarray(minutiae, dtype=np.float32)
+    count = len(minutiae)
+    xy = minutiae[:, :2].astype(np.float64)
+    count_score = min(count / GOOD_MINUTIAE, 1.0)
+    area_score = min(_hull_area(xy.tolist()) / GOOD_AREA, 1.0)
+    if count > 1:
+        squares = np.einsum("ij,ij->i", xy, xy)
+        distances = squares[:, None] + squares[None, :] - 2 * (xy @ xy.T)
+        np.fill_diagonal(distances, np.inf)
+        clarity = float((distances.min(axis=1) >= RIDGE_PERIOD ** 2).mean())
+    else:
+        clarity = 0.0
+    components = {TOO_FEW_MINUTIAE: count_score, SMALL_AREA: area_score, POOR_RIDGE_CLARITY: clarity}
+    reason = min(components, key=components.get)
+    score = components[reason]
+    return QualityReport(round(score, 4), round(count_score, 4), round(area_score, 4), round(clarity, 4),
+                         reason if score < 1.0 else None)
+
+
+def _hull_area(xy: List[List[float]]) -> float:
+    """Area of the convex hull of the points (monotone chain and shoelace)."""
+    if len(xy) < 3:
+        return 0.0
+    points = sorted(xy)
+    hull: List[List[float]] = []
+    for sweep in (points, points[::-1]):
+        start = len(hull)
+        for point in sweep:
+            while len(hull) >= start + 2 and _cross(hull[-2], hull[-1], point) <= 0:
+                hull.pop()
+            hull.append(point)
+        hull.pop()
+    twice_area = sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(hull, hull[1:] + hull[:1]))
+    return abs(twice_area) / 2
+
+
+def _cross(origin: List[float], a: List[float], b: List[float]) -> float:
+    return (a[0] - origin[0]) * (b[1] - origin[1]) - (a[1] - origin[1]) * (b[0] - origin[0])
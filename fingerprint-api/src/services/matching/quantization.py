@@ -0,0 +1,125 @@
+"""Product quantization: embeddings stored as one byte per subspace and scored from lookup tables."""
+
+from typing import Optional
+
+import numpy as np
+
+CENTROIDS = 256  # per subspace, so a code fits one uint8
+ENCODE_CHUNK = 4096  # vectors encoded at once; bounds the (chunk, 256) distance array
+
+
+class ProductQuantizer:
+    """Splits a vector into ``subspaces`` equal slices and keeps, for each, the nearest of 256 centroids.
+
+    A 512-dimensional float32 embedding (2048 bytes) becomes ``subspaces``
+    bytes: 128 is 16 times smaller, 256 is 8 times. The codebooks are
+    trained once, offline, on embeddings like the gallery's, and saved with
+    ``save``; every process loads the same file, so stored codes stay valid
+    across restarts and retraining of the index lists.
+
+    Scoring uses asymmetric distance computation: the probe stays full
+    precision, its dot product with every centroid of every subspace goes
+    into a (subspaces, 256) lookup table, and the score of a stored vector is
+    the sum of its subspaces' table entries. Codes are kept subspace-major,
+    (subspaces, n), so each subspace's table entries for a whole block of
+    vectors come from one gather over a contiguous row.
+    """
+
+    def __init__(self, subspaces: int = 128, codebooks: Optional[np.ndarray] = None) -> None:
+        self.subspaces = subspaces
+        self.codebooks = codebooks  # (subspaces, 256, slice width), float32
+        if codebooks is not None:
+            self.subspaces = len(codebooks)
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def dimensions(self) -> int:
+        return 0 if self.codebooks is None else self.subspaces * self.codebooks.shape[2]
+
+    @classmethod
+    def load(cls, path: str) -> "ProductQuantizer":
+        with np.load(path) as saved:
+            return cls(codebooks=saved["codebooks"].astype(np.float32))
+
+    def save(self, path: str) -> None:
+        if self.codebooks is None:
+            raise ValueError("Train the product quantizer before saving it")
+        with open(path, "wb") as handle:
+            np.savez(handle, codebooks=self.codebooks)
+
+    def train(self, vectors: np.ndarray, iterations: int = 20, sample: int = 16384,
+              seed: int = 0) -> "ProductQuantizer":
+        """k-means of every subspace on up to ``sample`` of ``vectors``."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        count, dimensions = vectors.shape
+        if dimensions % self.subspaces:
+            raise ValueError(f"{dimensions} dimensions do not split into {self.subspaces} subspaces")
+        if count < CENTROIDS:
+            raise ValueError(f"Training a product quantizer takes at least {CENTROIDS} vectors")
+        rng = np.random.default_rng(seed)
+        chosen = vectors[rng.choice(count, min(count, sample), replace=False)]
+        slices = self._split(chosen)  # (subspaces, n, width)
+        codebooks = slices[:, rng.choice(len(chosen), CENTROIDS, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = self._nearest(slices, codebooks)  # (subspaces, n)
+            for subspace in range(self.subspaces):
+                counts = np.bincount(nearest[subspace], minlength=CENTROIDS)
+                sums = np.stack([np.bincount(nearest[subspace], column, minlength=CENTROIDS)
+                                 for column in slices[subspace].T], axis=1)
+                filled = counts > 0  # an empty centroid stays where it is
+                codebooks[subspace, filled] = sums[filled] / counts[filled, None]
+        self.codebooks = codebooks
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """(subspaces, n) uint8 codes of ``vectors``: the nearest centroid of each slice."""
+        codebooks = self._codebooks()
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        codes = np.empty((self.subspaces, len(vectors)), dtype=np.uint8)
+        for start in range(0, len(vectors), ENCODE_CHUNK):
+            chunk = self._split(vectors[start:start + ENCODE_CHUNK])
+            codes[:, start:start + ENCODE_CHUNK] = self._nearest(chunk, codebooks)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Approximate vectors of ``codes``: their centroids put back together."""
+        codebooks = self._codebooks()
+        centroids = codebooks[np.arange(self.subspaces)[:, None], codes]  # (subspaces, n, width)
+        return centroids.transpose(1, 0, 2).reshape(codes.shape[1], self.dimensions)
+
+    def tables(self, query: np.ndarray) -> np.ndarray:
+        """(subspaces, 256) dot products of each slice of ``query`` with that subspace's centroids."""
+        codebooks = self._codebooks()
+        return np.einsum("skw,sw->sk", codebooks, np.asarray(query, dtype=np.float32).reshape(self.subspaces, -1))
+
+    def scores(self, codes: np.ndarray, tables: np.ndarray) -> np.ndarray:
+        """Approximate dot product of the query behind ``tables`` with every column of ``codes``."""
+        result = np.zeros(codes.shape[1], dtype=np.float32)
+        for table, column in zip(tables, codes):
+            result += table.take(column)
+        return result
+
+    def _codebooks(self) -> np.ndarray:
+        if self.codebooks is None:
+            raise ValueError("The product quantizer has no codebooks; train or load them first")
+        return self.codebooks
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subspaces, -1).transpose(1, 0, 2)
+
+    @staticmethod
+    def _nearest(slices: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+        """(subspaces, n) index of the centroid nearest each slice, one subspace at a time.
+
+        A (subspaces, n, 256) distance array for all subspaces at once would
+        not fit in cache, and filling it costs more than the arithmetic.
+        """
+        half_norms = 0.5 * (codebooks ** 2).sum(axis=2)
+        nearest = np.empty(slices.shape[:2], dtype=np.uint8)
+        for subspace, (block, centroids) in enumerate(zip(slices, codebooks)):
+            # Smallest |x - c|^2 is largest x.c - |c|^2 / 2, as |x|^2 is the same for every centroid
+            nearest[subspace] = np.argmax(block @ centroids.T - half_norms[subspace], axis=1)
+        return nearest
@@ -0,0 +1,77 @@
+"""Synthetic minutiae templates for tests and benchmarks."""
+
+from typing import Optional
+
+import numpy as np
+
+from .minutiae import BIFURCATION, ENDING
+from .pattern_class import ARCH, LEFT_LOOP, RIGHT_LOOP, WHORL
+
+
+def random_minutiae(rng: np.random.Generator, count: int = 40, size: float = 400.0) -> np.ndarray:
+    """A random finger: ``count`` minutiae spread over a size x size image."""
+    margin = size * 0.1
+    return np.column_stack([
+        rng.uniform(margin, size - margin, count),
+        rng.uniform(margin, size - margin, count),
+        rng.uniform(0, 2 * np.pi, count),
+        rng.integers(ENDING, BIFURCATION + 1, count),
+    ]).astype(np.float32)
+
+
+def patterned_minutiae(rng: np.random.Generator, pattern: str, count: int = 40, size: float = 400.0) -> np.ndarray:
+    """A random finger of a given pattern class, with minutiae following its ridge flow.
+
+    Loops and whorls use the zero-pole orientation model (half the bearing
+    from each core, minus half the bearing from each delta); arches bend
+    smoothly upwards in the middle.
+    """
+    def near(x: float, y: float, spread: float) -> complex:
+        return complex(*(size * np.array([x, y]) + rng.normal(0, spread, 2)))
+
+    cores, deltas = [], []
+    if pattern in (LEFT_LOOP, RIGHT_LOOP):
+        cores = [near(0.5, 0.38, 20)]
+        deltas = [near(0.72 if pattern == LEFT_LOOP else 0.28, 0.78, 20)]
+    elif pattern == WHORL:
+        cores = [near(0.46, 0.48, 8), near(0.54, 0.48, 8)]
+        deltas = [near(0.22, 0.82, 20), near(0.78, 0.82, 20)]
+    elif pattern != ARCH:
+        raise ValueError(f"No synthetic model for pattern {pattern!r}")
+    minutiae = random_minutiae(rng, count, size)
+    z = minutiae[:, 0] + 1j * minutiae[:, 1]
+    if pattern == ARCH:
+        flow = -0.6 * np.cos(np.pi * minutiae[:, 0] / size)
+    else:
+        flow = 0.5 * (sum(np.angle(z - core) for core in cores) - sum(np.angle(z - delta) for delta in deltas))
+    # A minutia points either way along its ridge
+    flow = flow + rng.normal(0, 0.1) + np.pi * rng.integers(0, 2, count)
+    minutiae[:, 2] = np.mod(flow, 2 * np.pi)
+    return minutiae
+
+
+def impression(
+    rng: np.random.Generator,
+    minutiae: np.ndarray,
+    rotation: float = 0.25,
+    translation: float = 20.0,
+    jitter: float = 2.0,
+    angle_jitter: float = 0.08,
+    missing: float = 0.1,
+    spurious: float = 0.1,
+    size: Optional[float] = 400.0,
+) -> np.ndarray:
+    """Another capture of the same finger: moved, rotated, noisy, some minutiae lost or added."""
+    angle = rng.uniform(-rotation, rotation)
+    cos, sin = np.cos(angle), np.sin(angle)
+    centre = minutiae[:, :2].mean(axis=0)
+    xy = (minutiae[:, :2] - centre) @ np.array([[cos, sin], [-sin, cos]], dtype=np.float32) + centre
+    xy = xy + rng.uniform(-translation, translation, 2) + rng.normal(0, jitter, xy.shape)
+    theta = np.mod(minutiae[:, 2] + angle + rng.normal(0, angle_jitter, len(minutiae)), 2 * np.pi)
+    moved = np.column_stack([xy, theta, minutiae[:, 3]]).astype(np.float32)
+
+    kept = moved[rng.random(len(moved)) >= missing]
+    extra = rng.binomial(len(minutiae), spurious)
+    if extra:
+        kept = np.concatenate([kept, random_minutiae(rng, extra, size or 400.0)])
+    return kept[rng.permutation(len(kept))]
@@ -11,4 +11,10 @@ class UserNotFoundError(Exception):
     pass
 
 class InvalidFingerprintDataError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class LowQualityFingerprintError(InvalidFingerprintDataError):
+    def __init__(self, reason: str, quality: float) -> None:
+        super().__init__(f"Fingerprint quality {quality:.2f} is below the threshold ({reason})")
+        self.reason = reason
+        self.quality = quality
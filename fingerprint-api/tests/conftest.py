@@ -1,3 +1,13 @@
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pytest
+
+from src.services.fingerprint_service import default_service
+
+
+@pytest.fixture(autouse=True)
+def empty_default_service():
+    """Every test starts with nothing enrolled in the service the routers share."""
+    default_service().templates.clear()
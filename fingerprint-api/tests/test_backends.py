@@ -0,0 +1,114 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.endpoints import enrollment, verification
+from src.main import app
+from src.services import libfprint_driver
+from src.services.backends import Capability, SimulatorBackend, TemplateMatcherBackend, create_backend
+from src.services.backends.libfprint import LibfprintBackend
+from src.services.fingerprint_service import FingerprintService
+from src.services.matching import encode_template
+from src.services.matching.synthetic import random_minutiae
+
+client = TestClient(app)
+FAKE_FPRINTD = Path(__file__).resolve().parents[2] / "fingerprint-access-control" / "tools" / "fake_fprintd.py"
+
+
+def test_auto_backend_falls_back_to_simulator():
+    backend = create_backend("auto")
+    assert backend.name in ("libfprint", "simulator")
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend("nonexistent")
+
+
+def test_backend_endpoint_reports_capabilities():
+    response = client.get("/fingerprints/backend")
+    assert response.status_code == 200
+    assert "backend" in response.json()
+    assert isinstance(response.json()["capabilities"], list)
+
+
+def test_template_matcher_identifies_submitted_template():
+    service = FingerprintService(TemplateMatcherBackend())
+    service.enroll_fingerprint("alice", b"alice-template")
+    service.enroll_fingerprint("bob", b"bob-template")
+    assert service.verify_fingerprint(b"bob-template") == {"match": True, "user_id": "bob"}
+    assert service.verify_fingerprint(b"mallory-template") == {"match": False}
+
+
+def test_simulator_identifies_presented_finger():
+    backend = SimulatorBackend(presented=b"bob-template")
+    assert backend.supports(Capability.CAPTURE)
+    service = FingerprintService(backend)
+    service.enroll_fingerprint("alice", b"alice-template")
+    service.enroll_fingerprint("bob", b"bob-template")
+    assert service.identify(b"ignored") == "bob"
+
+
+def test_sequential_verify_when_backend_has_no_identify():
+    class VerifyOnly(TemplateMatcherBackend):
+        capabilities = frozenset()
+
+    service = FingerprintService(VerifyOnly())
+    service.enroll_fingerprint("alice", b"alice-template")
+    service.enroll_fingerprint("bob", b"bob-template")
+    assert service.identify(b"bob-template") == "bob"
+
+
+def _backend(name):
+    if name != "libfprint":
+        return create_backend(name)
+    if libfprint_driver.HARDWARE_AVAILABLE:
+        pytest.skip("a real libfprint reader would wait for a finger")
+    return LibfprintBackend(libfprint_driver.LibfprintDriver())  # the dummy reader presents b"sample_data"
+
+
+@pytest.mark.parametrize("name", ["simulator", "template", "minutiae", "libfprint"])
+def test_enrolled_template_verifies_through_the_api(name, monkeypatch):
+    assert enrollment.fingerprint_service is verification.fingerprint_service
+    monkeypatch.setattr(enrollment.fingerprint_service, "backend", _backend(name))
+    template = encode_template(random_minutiae(np.random.default_rng(4), 45)) if name == "minutiae" else b"sample_data"
+    headers = {"Content-Type": "application/octet-stream"}
+
+    response = client.post("/fingerprints/verify/template", content=template, headers=headers)
+    assert response.status_code == 200 and not response.json()["match"]
+    response = client.post("/fingerprints/enroll/alice/template", content=template, headers=headers)
+    assert response.status_code == 200
+    response = client.post("/fingerprints/verify/template", content=template, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["match"] and response.json()["user_id"] == "alice"
+
+
+@pytest.fixture
+def fake_fprintd(tmp_path, monkeypatch):
+    """The access-control fake fprintd on a private session bus, with alice's finger on the reader."""
+    pytest.importorskip("gi")
+    pytest.importorskip("pydbus")
+    scenario = tmp_path / "scenario.json"
+    scenario.write_text(json.dumps({"scan_time_ms": 10, "scan_jitter_ms": 0, "retry_rate": 0,
+                                    "enroll_stages": 2, "presented": {"username": "alice"}}))
+    process = subprocess.Popen([sys.executable, str(FAKE_FPRINTD), "--launch-bus", "--scenario", str(scenario)],
+                               stdout=subprocess.PIPE, text=True)
+    export = process.stdout.readline()  # export DBUS_SESSION_BUS_ADDRESS=... FPRINTD_BUS=session
+    process.stdout.readline()  # running
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", export.split()[1].split("=", 1)[1])
+    yield
+    process.terminate()
+    process.wait(timeout=10)
+
+
+def test_fprintd_enrollment_verifies_through_the_api(fake_fprintd, monkeypatch):
+    monkeypatch.setattr(enrollment.fingerprint_service, "backend", create_backend("fprintd", bus="session"))
+    assert not client.post("/fingerprints/verify", json={"fingerprint_data": ""}).json()["match"]
+    # An empty template makes the reader capture the finger
+    assert client.post("/fingerprints/enroll", json={"user_id": "alice", "fingerprint_data": ""}).status_code == 200
+    assert client.post("/fingerprints/verify", json={"fingerprint_data": ""}).json() == {"match": True, "user_id": "alice"}
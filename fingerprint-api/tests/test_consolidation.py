@@ -0,0 +1,65 @@
+import base64
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.endpoints import enrollment
+from src.main import app
+from src.services.backends import create_backend
+from src.services.fingerprint_service import FingerprintService
+from src.services.matching import consolidate, encode_template
+from src.services.matching.synthetic import impression, random_minutiae
+from src.utils.exceptions import InvalidFingerprintDataError
+
+
+@pytest.fixture
+def finger():
+    rng = np.random.default_rng(5)
+    minutiae = random_minutiae(rng, 45)
+    return rng, minutiae, [impression(rng, minutiae) for _ in range(3)]
+
+
+def _rotated(minutiae, angle, shift):
+    cos, sin = np.cos(angle), np.sin(angle)
+    moved = minutiae.copy()
+    moved[:, :2] = minutiae[:, :2] @ np.array([[cos, sin], [-sin, cos]]) + shift
+    moved[:, 2] = np.mod(moved[:, 2] + angle, 2 * np.pi)
+    return moved
+
+
+def test_merges_captures_into_weighted_minutiae(finger):
+    rng, minutiae, samples = finger
+    samples[1] = _rotated(samples[1], 0.3, [25, -15])
+    merged, weights = consolidate(samples)
+    assert (np.diff(weights) <= 0).all() and weights.max() == 1.0 and weights.min() >= 2 / 3
+    # Merged minutiae sit on the finger's own minutiae, whatever frame the reference capture had
+    reference = max(samples, key=len)
+    nearest = np.hypot(*(merged[:, None, :2] - reference[None, :, :2]).transpose(2, 0, 1)).min(axis=1)
+    assert np.median(nearest) < 3
+    assert len(merged) > 0.7 * len(minutiae)
+
+    with pytest.raises(InvalidFingerprintDataError):
+        consolidate([samples[0], random_minutiae(rng, 45)])
+
+
+def test_service_enrolls_one_template_per_finger(finger):
+    rng, minutiae, samples = finger
+    service = FingerprintService(create_backend("minutiae"), enroll_min_quality=0.5)
+    service.enroll_samples("user1", [encode_template(sample) for sample in samples])
+    other = random_minutiae(rng, 45)
+    service.enroll_samples("user2", [encode_template(impression(rng, other)) for _ in range(3)])
+    assert len(service.backend.engine) == 2
+
+    result = service.verify_fingerprint(encode_template(impression(rng, minutiae)))
+    assert result["match"] and result["user_id"] == "user1"
+
+
+def test_samples_endpoint(finger, monkeypatch):
+    _, _, samples = finger
+    monkeypatch.setattr(enrollment, "fingerprint_service", FingerprintService(create_backend("minutiae")))
+    client = TestClient(app)
+    payload = {"user_id": "user1", "samples": [base64.b64encode(encode_template(sample)).decode() for sample in samples]}
+    response = client.post("/fingerprints/enroll/samples", json=payload)
+    assert response.status_code == 200 and response.json()["samples"] == 3
+    assert client.post("/fingerprints/enroll/samples", json={"user_id": "user1", "samples": []}).status_code == 400
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.matching import EmbeddingIndex, MatchingEngine, embed
+from src.services.matching.embedding import EMBEDDING_DIMENSIONS
+from src.services.matching.synthetic import impression, random_minutiae
+
+
+@pytest.fixture
+def fingers():
+    rng = np.random.default_rng(13)
+    return rng, [random_minutiae(rng, int(rng.integers(30, 55))) for _ in range(300)]
+
+
+def test_genuine_embeddings_are_closest(fingers):
+    rng, gallery = fingers
+    vectors = np.stack([embed(impression(rng, minutiae)) for minutiae in gallery])
+    assert vectors.shape == (300, EMBEDDING_DIMENSIONS) and np.allclose(np.linalg.norm(vectors, axis=1), 1)
+    for row in (0, 150, 299):
+        similarity = vectors @ embed(impression(rng, gallery[row]))
+        assert np.argmax(similarity) == row
+
+
+def test_index_shortlists_from_its_lists(fingers):
+    rng, gallery = fingers
+    index = EmbeddingIndex(probes=4, train_size=100, tail_size=16)
+    for row, minutiae in enumerate(gallery):
+        index.add(row, impression(rng, minutiae))
+    assert len(index) == 300 and index.lists == 10
+    hits = sum(row in index.shortlist(impression(rng, gallery[row]), 20) for row in range(0, 300, 10))
+    assert hits >= 25
+
+    index.probes = index.lists
+    probe = impression(rng, gallery[200])
+    assert 200 in index.shortlist(probe, 5)
+    index.drop([3, 100])
+    assert len(index) == 298 and 198 in index.shortlist(probe, 5)
+    exclude = np.zeros(298, dtype=bool)
+    exclude[198] = True
+    assert 198 not in index.shortlist(probe, 5, exclude=exclude)
+
+
+def test_engine_reranks_the_embedding_shortlist(fingers):
+    rng, gallery = fingers
+    engine = MatchingEngine(index=EmbeddingIndex(train_size=100), shortlist=30)
+    for row, minutiae in enumerate(gallery):
+        engine.add(f"user{row}", impression(rng, minutiae))
+    top = engine.identify(impression(rng, gallery[42]), top_k=1)
+    assert top[0].user_id == "user42" and engine.comparison_stats()["templates"] == 30
+
+    with pytest.raises(ValueError):
+        create_backend("minutiae", candidate_index="lsh")
+    backend = create_backend("minutiae", shortlist=50, candidate_index="embedding")
+    assert backend.describe()["candidate_index"] == "embedding"
@@ -0,0 +1,100 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.matching import GalleryStore, MatchingEngine, StoredMatchingEngine, pack_template
+from src.services.matching.synthetic import impression, random_minutiae
+
+
+@pytest.fixture
+def fingers():
+    rng = np.random.default_rng(11)
+    return rng, {f"user{i}": random_minutiae(rng, 40) for i in range(60)}
+
+
+def test_reopened_store_scores_like_the_in_memory_engine(tmp_path, fingers):
+    rng, gallery = fingers
+    stored, in_memory = StoredMatchingEngine(GalleryStore(str(tmp_path))), MatchingEngine()
+    for user_id, minutiae in gallery.items():
+        enrolled = impression(rng, minutiae)
+        stored.add(user_id, enrolled)
+        in_memory.add(user_id, enrolled)
+    probe = impression(rng, gallery["user4"])
+
+    reopened = StoredMatchingEngine(GalleryStore(str(tmp_path)))
+    assert len(reopened) == len(gallery)
+    assert np.allclose(reopened.scores(probe), in_memory.scores(probe))
+    assert reopened.identify(probe, top_k=1)[0].user_id == "user4"
+    assert np.array_equal(reopened.store.minutiae(0)[:, 3], stored.store.minutiae(0)[:, 3])
+
+
+def test_appends_and_deletes_are_seen_by_other_handles(tmp_path, fingers):
+    _, gallery = fingers
+    writer, reader = (StoredMatchingEngine(GalleryStore(str(tmp_path))) for _ in range(2))
+    writer.add("user1", gallery["user1"])
+    writer.add("user2", gallery["user2"])
+    assert reader.identify(gallery["user2"], top_k=1)[0].user_id == "user2"
+
+    assert writer.remove("user2") == 1
+    assert [match.user_id for match in reader.identify(gallery["user2"], top_k=5)] == ["user1"]
+    assert reader.user_ids == ["user1"]
+
+
+def test_compaction_and_torn_appends(tmp_path, fingers):
+    _, gallery = fingers
+    engine = StoredMatchingEngine(GalleryStore(str(tmp_path)))
+    for user_id in ("user1", "user2", "user3"):
+        engine.add(user_id, gallery[user_id])
+    engine.remove("user2")
+    assert engine.store.compact() == 1
+    assert len(engine.store) == 2 and engine.user_ids == ["user1", "user3"]
+
+    # A writer that died halfway leaves bytes past the last committed template
+    with open(os.path.join(str(tmp_path), "minutiae.f32"), "ab") as handle:
+        handle.write(b"torn")
+    engine.add("user4", gallery["user4"])
+    assert engine.identify(gallery["user4"], top_k=1)[0].user_id == "user4"
+    assert engine.identify(gallery["user3"], top_k=1)[0].user_id == "user3"
+
+
+def test_fingers_are_stored_and_deleted_one_by_one(tmp_path, fingers):
+    _, gallery = fingers
+    engine = StoredMatchingEngine(GalleryStore(str(tmp_path)))
+    engine.add("alice", gallery["user1"], finger="right-index-finger")
+    engine.add("alice", gallery["user2"], finger="right-middle-finger")
+    assert engine.remove("alice", "right-index-finger") == 1
+    reopened = StoredMatchingEngine(GalleryStore(str(tmp_path)))
+    assert reopened.user_ids == ["alice"] and reopened.fingers == ["right-middle-finger"]
+
+
+def test_version_1_stores_are_upgraded(tmp_path, fingers):
+    _, gallery = fingers
+    engine = StoredMatchingEngine(GalleryStore(str(tmp_path)))
+    engine.add("user1", gallery["user1"])
+    engine.add("user2", gallery["user2"])
+    # What a version 1 store looked like: no fingers column
+    os.remove(os.path.join(str(tmp_path), "fingers.s32"))
+    with open(os.path.join(str(tmp_path), "meta.json"), "w") as handle:
+        json.dump({"version": 1, "max_minutiae": 48, "dimensions": 16}, handle)
+
+    upgraded = StoredMatchingEngine(GalleryStore(str(tmp_path)))
+    assert upgraded.fingers == ["", ""] and upgraded.identify(gallery["user2"], top_k=1)[0].user_id == "user2"
+    upgraded.add("user3", gallery["user3"], finger="left-thumb")
+    assert StoredMatchingEngine(GalleryStore(str(tmp_path))).fingers == ["", "", "left-thumb"]
+
+
+def test_store_rejects_other_matcher_settings(tmp_path):
+    GalleryStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        GalleryStore(str(tmp_path), max_minutiae=32)
+
+
+def test_backend_persists_its_gallery(tmp_path, fingers):
+    rng, gallery = fingers
+    backend = create_backend("minutiae", gallery_path=str(tmp_path))
+    backend.add_template("user7", pack_template(gallery["user7"]))
+    restarted = create_backend("minutiae", gallery_path=str(tmp_path))
+    assert restarted.identify(None, pack_template(impression(rng, gallery["user7"]))) == "user7"
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.matching import GalleryStore, GeometricHashIndex, MatchingEngine, StoredMatchingEngine
+from src.services.matching.synthetic import impression, random_minutiae
+
+
+@pytest.fixture
+def fingers():
+    rng = np.random.default_rng(5)
+    return rng, [random_minutiae(rng, 40) for _ in range(400)]
+
+
+def test_shortlist_recalls_genuine_templates(fingers):
+    rng, gallery = fingers
+    index = GeometricHashIndex(tail_size=4096)
+    for row, minutiae in enumerate(gallery):
+        index.add(row, impression(rng, minutiae))
+    assert len(index) == len(gallery) and index.nbytes == index.postings * 8
+    hits = sum(row in index.shortlist(impression(rng, gallery[row]), 10) for row in range(30))
+    assert hits >= 28
+
+
+def test_drop_renumbers_like_a_fresh_index(fingers):
+    _, gallery = fingers
+    index, fresh = GeometricHashIndex(tail_size=1024), GeometricHashIndex()
+    for row, minutiae in enumerate(gallery[:50]):
+        index.add(row, minutiae)
+    index.drop([3, 17])
+    for row, minutiae in enumerate(gallery[i] for i in range(50) if i not in (3, 17)):
+        fresh.add(row, minutiae)
+    assert np.array_equal(index.votes(gallery[20]), fresh.votes(gallery[20]))
+
+
+def test_engine_scores_only_the_shortlist(fingers):
+    rng, gallery = fingers
+    engine = MatchingEngine(index=GeometricHashIndex(), shortlist=20)
+    for row, minutiae in enumerate(gallery):
+        engine.add(f"user{row}", impression(rng, minutiae))
+    probe = impression(rng, gallery[7])
+    assert engine.identify(probe, top_k=1)[0].user_id == "user7"
+    assert engine.remove("user7") == 1
+    assert "user7" not in [match.user_id for match in engine.identify(probe, top_k=5)]
+    assert engine.identify(impression(rng, gallery[8]), top_k=1)[0].user_id == "user8"
+
+
+def test_stored_engine_indexes_appends_and_skips_deleted(tmp_path, fingers):
+    _, gallery = fingers
+    writer = StoredMatchingEngine(GalleryStore(str(tmp_path)))
+    reader = StoredMatchingEngine(GalleryStore(str(tmp_path)), index=GeometricHashIndex(), shortlist=5)
+    for row, minutiae in enumerate(gallery[:40]):
+        writer.add(f"user{row}", minutiae)
+    assert reader.identify(gallery[30], top_k=1)[0].user_id == "user30"
+    writer.remove("user30")
+    assert "user30" not in [match.user_id for match in reader.identify(gallery[30], top_k=3)]
+    writer.store.compact()
+    assert reader.identify(gallery[31], top_k=1)[0].user_id == "user31"
+
+
+def test_backend_reports_index_memory():
+    backend = create_backend("minutiae", shortlist=50)
+    description = backend.describe()
+    assert description["shortlist"] == 50 and description["index_bytes"] == 0
@@ -0,0 +1,114 @@
+import base64
+
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.fingerprint_service import FingerprintService
+from src.services.matching import MatchingEngine, pack_template, parse_template
+from src.services.matching.synthetic import impression, random_minutiae
+from src.utils.exceptions import InvalidFingerprintDataError
+
+
+@pytest.fixture
+def fingers():
+    rng = np.random.default_rng(7)
+    return rng, {f"user{i}": random_minutiae(rng, 40) for i in range(200)}
+
+
+def test_template_round_trip_raw_and_base64():
+    minutiae = random_minutiae(np.random.default_rng(0), 12)
+    packed = pack_template(minutiae)
+    assert np.array_equal(parse_template(packed), minutiae)
+    assert np.array_equal(parse_template(base64.b64encode(packed)), minutiae)
+
+
+def test_invalid_template_is_rejected():
+    with pytest.raises(InvalidFingerprintDataError):
+        parse_template(b"sample_data")
+
+
+def test_engine_ranks_genuine_user_first(fingers):
+    rng, gallery = fingers
+    engine = MatchingEngine()
+    for user_id, minutiae in gallery.items():
+        engine.add(user_id, impression(rng, minutiae))
+    hits = 0
+    for user_id in list(gallery)[:20]:
+        top = engine.identify(impression(rng, gallery[user_id]), top_k=3)
+        assert len(top) == 3 and top[0].score >= top[1].score >= top[2].score
+        hits += top[0].user_id == user_id
+    assert hits >= 18
+
+
+def test_engine_remove_and_scores_subset(fingers):
+    rng, gallery = fingers
+    engine = MatchingEngine(chunk_size=16)
+    for user_id, minutiae in gallery.items():
+        engine.add(user_id, minutiae)
+    probe = impression(rng, gallery["user3"])
+    full = engine.scores(probe)
+    rows = np.array([3, 10, 42])
+    assert np.allclose(engine.scores(probe, rows), full[rows])
+    assert engine.remove("user3") == 1
+    assert len(engine) == len(gallery) - 1
+    assert "user3" not in [match.user_id for match in engine.identify(probe, top_k=5)]
+
+
+def test_service_returns_top_k_candidates(fingers):
+    rng, gallery = fingers
+    service = FingerprintService(create_backend("minutiae"))
+    for user_id, minutiae in list(gallery.items())[:30]:
+        service.enroll_fingerprint(user_id, pack_template(impression(rng, minutiae)))
+    result = service.verify_fingerprint(pack_template(gallery["user5"]), top_k=3)
+    assert result["match"] is True
+    assert result["user_id"] == "user5"
+    assert len(result["candidates"]) == 3
+
+
+def test_screening_skips_comparisons_without_changing_the_winner(fingers):
+    rng, gallery = fingers
+    exact, screened = MatchingEngine(chunk_size=32), MatchingEngine(chunk_size=32, screen_minutiae=16)
+    for user_id, minutiae in gallery.items():
+        enrolled = impression(rng, minutiae)
+        exact.add(user_id, enrolled)
+        screened.add(user_id, enrolled)
+    for user_id in ("user20", "user150"):
+        probe = impression(rng, gallery[user_id])
+        assert screened.identify(probe, top_k=1) == exact.identify(probe, top_k=1)
+    stats = screened.comparison_stats()
+    assert stats["templates"] == 2 * len(gallery) and stats["screened"] == stats["templates"]
+    assert stats["skipped"] > len(gallery)
+
+
+def test_first_accept_stops_the_search(fingers):
+    rng, gallery = fingers
+    engine = MatchingEngine(chunk_size=16)
+    for user_id, minutiae in gallery.items():
+        engine.add(user_id, minutiae)
+    top = engine.identify(impression(rng, gallery["user1"]), top_k=1, first_accept=True)
+    assert top[0].user_id == "user1" and top[0].score >= engine.threshold + engine.accept_margin
+    stats = engine.comparison_stats()
+    assert stats["early_accepts"] == 1 and stats["scored"] <= 32
+
+
+def test_screen_needs_at_least_pairs_minutiae():
+    with pytest.raises(ValueError):
+        MatchingEngine(pairs=6, screen_minutiae=4)
+
+
+@pytest.mark.parametrize("name", ["minutiae", "template"])
+def test_reenrolling_a_finger_keeps_the_other_fingers(fingers, name):
+    rng, gallery = fingers
+    service = FingerprintService(create_backend(name))
+    index, middle = (pack_template(impression(rng, gallery[user_id])) for user_id in ("user1", "user2"))
+    service.enroll_fingerprint("alice", index, finger="right-index-finger")
+    service.enroll_fingerprint("alice", middle, finger="right-middle-finger")
+    index = pack_template(impression(rng, gallery["user1"]))
+    service.enroll_fingerprint("alice", index, finger="right-index-finger")
+    if name == "minutiae":
+        assert sorted(service.backend.engine.fingers) == ["right-index-finger", "right-middle-finger"]
+    else:
+        assert sorted(service.templates) == [("alice", "right-index-finger"), ("alice", "right-middle-finger")]
+    for template in (index, middle):
+        assert service.verify_fingerprint(template)["user_id"] == "alice"
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.matching import MatchingEngine, PatternBins, classify_pattern
+from src.services.matching.pattern_class import ARCH, LEFT_LOOP, RIGHT_LOOP, UNKNOWN, WHORL
+from src.services.matching.synthetic import impression, patterned_minutiae
+
+PATTERNS = (ARCH, LEFT_LOOP, RIGHT_LOOP, WHORL)
+
+
+def test_classifies_synthetic_patterns():
+    rng = np.random.default_rng(8)
+    for pattern in PATTERNS:
+        classes = [classify_pattern(impression(rng, patterned_minutiae(rng, pattern, 45))) for _ in range(20)]
+        assert classes.count(pattern) >= 13, (pattern, classes)
+    assert classify_pattern(patterned_minutiae(rng, WHORL, 8)) == UNKNOWN
+
+
+def test_bins_search_the_probe_class_first():
+    rng = np.random.default_rng(9)
+    fingers = {f"user{index}": patterned_minutiae(rng, PATTERNS[index % 4], 45) for index in range(80)}
+    engine = MatchingEngine(bins=PatternBins("none"))
+    for user_id, minutiae in fingers.items():
+        engine.add(user_id, impression(rng, minutiae))
+    sizes = engine.pattern_classes()
+    assert sum(sizes.values()) == 80 and min(sizes[pattern] for pattern in PATTERNS) > 10
+
+    classes = dict(zip(engine.user_ids, engine.bins.classes))
+    probe = impression(rng, fingers["user5"])
+    stages = engine.bins.stages(probe)
+    assert len(stages) == 1 and {classes[engine.user_ids[row]] for row in stages[0]} == {classify_pattern(probe)}
+    if classes["user5"] == classify_pattern(probe):
+        assert engine.identify(probe, top_k=1)[0].user_id == "user5"
+    assert engine.comparison_stats()["penetration"] < 0.5
+
+    engine.bins.fallback = "all"
+    assert np.array_equal(np.sort(np.concatenate(engine.bins.stages(probe))), np.arange(80))
+    engine.remove("user5")
+    assert sum(engine.pattern_classes().values()) == 79 and len(engine.bins) == 79
+
+
+def test_backend_reports_pattern_classes():
+    with pytest.raises(ValueError):
+        PatternBins("sometimes")
+    backend = create_backend("minutiae", pattern_fallback="neighbours")
+    description = backend.describe()
+    assert description["pattern_fallback"] == "neighbours" and description["pattern_classes"][ARCH] == 0
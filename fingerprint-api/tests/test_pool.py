@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.matching import MatchingPool, StoredMatchingEngine
+from src.services.matching.synthetic import impression, random_minutiae
+
+
+@pytest.fixture(scope="module")
+def gallery(tmp_path_factory):
+    rng = np.random.default_rng(9)
+    path = str(tmp_path_factory.mktemp("gallery"))
+    engine = StoredMatchingEngine.open(path)
+    fingers = [random_minutiae(rng, 40) for _ in range(300)]
+    for row, minutiae in enumerate(fingers):
+        engine.add(f"user{row}", impression(rng, minutiae))
+    with MatchingPool(path, workers=2, timeout=10) as pool:
+        yield rng, engine, fingers, pool
+
+
+def test_pool_merges_shards_like_one_engine(gallery):
+    rng, engine, fingers, pool = gallery
+    probe = impression(rng, fingers[250])
+    assert pool.identify(probe, top_k=4) == engine.identify(probe, top_k=4)
+    assert [shard["rows"] for shard in pool.metrics()] == [150, 150]
+    assert all(shard["requests"] >= 1 and shard["mean_ms"] is not None for shard in pool.metrics())
+
+
+def test_pool_respawns_a_dead_worker(gallery):
+    rng, _, fingers, pool = gallery
+    pool._processes[1].kill()
+    pool._processes[1].join()
+    assert pool.identify(impression(rng, fingers[290]), top_k=1)[0].user_id == "user290"
+    assert pool.metrics()[1]["respawns"] == 1 and pool.metrics()[1]["alive"]
+
+
+def test_pool_sees_new_enrollments(gallery):
+    _, engine, fingers, pool = gallery
+    engine.add("late", fingers[3][:25])
+    assert pool.identify(fingers[3][:25], top_k=1)[0].user_id == "late"
+
+
+def test_workers_need_a_gallery_store():
+    with pytest.raises(ValueError):
+        create_backend("minutiae", workers=2)
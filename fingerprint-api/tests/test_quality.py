@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.endpoints import verification
+from src.main import app
+from src.services.backends import create_backend
+from src.services.fingerprint_service import FingerprintService
+from src.services.matching import encode_template
+from src.services.matching.quality import POOR_RIDGE_CLARITY, SMALL_AREA, TOO_FEW_MINUTIAE, assess_quality
+from src.services.matching.synthetic import impression, random_minutiae
+from src.utils.exceptions import LowQualityFingerprintError
+
+
+@pytest.fixture
+def finger():
+    rng = np.random.default_rng(11)
+    return rng, random_minutiae(rng, 40)
+
+
+def test_reports_the_weakest_component(finger):
+    rng, minutiae = finger
+    good = assess_quality(impression(rng, minutiae))
+    assert good.score >= 0.7 and good.minutiae == good.area == 1.0
+
+    assert assess_quality(minutiae[:6]).reason == TOO_FEW_MINUTIAE
+    huddled = minutiae.copy()
+    huddled[:, :2] = 200 + (huddled[:, :2] - 200) * 0.3
+    assert assess_quality(huddled).reason == SMALL_AREA
+    broken = np.concatenate([minutiae[:20], minutiae[:20] + [3, 2, 0, 0]])
+    report = assess_quality(broken)
+    assert report.reason == POOR_RIDGE_CLARITY and report.clarity == 0.0
+
+
+def test_service_rejects_poor_probes_before_searching(finger, monkeypatch):
+    rng, minutiae = finger
+    service = FingerprintService(create_backend("minutiae"), enroll_min_quality=0.5, verify_min_quality=0.5)
+    service.enroll_fingerprint("user1", encode_template(impression(rng, minutiae)))
+    with pytest.raises(LowQualityFingerprintError) as rejected:
+        service.enroll_fingerprint("user2", encode_template(minutiae[:8]))
+    assert rejected.value.reason == TOO_FEW_MINUTIAE and rejected.value.quality == pytest.approx(0.32)
+
+    searched = []
+    monkeypatch.setattr(service.backend, "search", lambda *args: searched.append(args) or [])
+    with pytest.raises(LowQualityFingerprintError):
+        service.verify_fingerprint(encode_template(minutiae[:8]))
+    assert not searched
+    service.verify_min_quality = 0
+    assert service.verify_fingerprint(encode_template(minutiae[:8])) == {"match": False, "candidates": []}
+
+
+def test_endpoint_returns_the_reason_code(finger, monkeypatch):
+    _, minutiae = finger
+    monkeypatch.setattr(verification, "fingerprint_service", FingerprintService(create_backend("minutiae")))
+    response = TestClient(app).post("/fingerprints/verify/template", content=encode_template(minutiae[:5]),
+                                    headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 422
+    assert response.json()["detail"]["reason"] == TOO_FEW_MINUTIAE
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.matching import EmbeddingIndex, ProductQuantizer, embed
+from src.services.matching.synthetic import impression, random_minutiae
+
+
+@pytest.fixture(scope="module")
+def quantizer():
+    rng = np.random.default_rng(21)
+    training = np.stack([embed(random_minutiae(rng, int(rng.integers(30, 55)))) for _ in range(600)])
+    return ProductQuantizer(128).train(training, iterations=8)
+
+
+@pytest.fixture
+def fingers():
+    rng = np.random.default_rng(22)
+    return rng, [random_minutiae(rng, int(rng.integers(30, 55))) for _ in range(300)]
+
+
+def test_codes_score_like_the_vectors(quantizer, fingers, tmp_path):
+    rng, gallery = fingers
+    vectors = np.stack([embed(minutiae) for minutiae in gallery])
+    codes = quantizer.encode(vectors)
+    assert codes.shape == (128, 300) and codes.dtype == np.uint8
+    assert vectors.nbytes == 16 * codes.nbytes
+
+    query = embed(impression(rng, gallery[7]))
+    scores = quantizer.scores(codes, quantizer.tables(query))
+    assert np.allclose(scores, quantizer.decode(codes) @ query, atol=1e-5)
+    assert np.abs(scores - vectors @ query).max() < 0.1 and np.argmax(scores) == 7
+
+    path = tmp_path / "codebooks.npz"
+    quantizer.save(str(path))
+    assert np.array_equal(ProductQuantizer.load(str(path)).encode(vectors), codes)
+    with pytest.raises(ValueError):
+        ProductQuantizer().encode(vectors)
+    with pytest.raises(ValueError):
+        ProductQuantizer(100).train(vectors)
+
+
+def test_index_keeps_codes(quantizer, fingers):
+    rng, gallery = fingers
+    plain = EmbeddingIndex(train_size=100, tail_size=16)
+    quantized = EmbeddingIndex(train_size=100, tail_size=16, quantizer=quantizer)
+    for row, minutiae in enumerate(gallery):
+        template = impression(rng, minutiae)
+        plain.add(row, template)
+        quantized.add(row, template)
+    probe = impression(rng, gallery[120])
+    assert quantized.scores(probe).argmax() == 120 and quantized.nbytes < plain.nbytes / 2
+    hits = sum(row in quantized.shortlist(impression(rng, gallery[row]), 20) for row in range(0, 300, 10))
+    assert hits >= 25
+
+    quantized.probes = quantized.lists
+    quantized.drop([3, 100])
+    assert len(quantized) == 298 and 118 in quantized.shortlist(probe, 5)
+    with pytest.raises(ValueError):
+        EmbeddingIndex(quantizer=ProductQuantizer())
+
+
+def test_backend_loads_codebooks(quantizer, tmp_path):
+    path = str(tmp_path / "codebooks.npz")
+    quantizer.save(path)
+    with pytest.raises(ValueError):
+        create_backend("minutiae", shortlist=50, embedding_codebooks=path)
+    backend = create_backend("minutiae", shortlist=50, candidate_index="embedding", embedding_codebooks=path)
+    assert backend.describe()["embedding_code_bytes"] == 128
@@ -0,0 +1,84 @@
+import base64
+import struct
+
+import numpy as np
+import pytest
+
+from src.services.backends import create_backend
+from src.services.matching import (
+    decode_template, encode_template, pack_template, parse_template, print_minutiae, print_templates, template_info)
+from src.services.matching.synthetic import impression, random_minutiae
+from src.utils.exceptions import InvalidFingerprintDataError
+
+
+def test_compact_round_trip_within_quantization():
+    minutiae = random_minutiae(np.random.default_rng(0), 40)
+    minutiae[0, :2] = -12.3, 4000.0
+    encoded = encode_template(minutiae, width=400, height=500)
+    assert len(encoded) == 256 < len(pack_template(minutiae)) // 2
+    info = template_info(encoded)
+    assert (info.version, info.minutiae, info.width, info.height, info.size) == (1, 40, 400, 500, 256)
+    decoded = decode_template(memoryview(encoded))
+    assert np.abs(decoded[:, :2] - minutiae[:, :2]).max() <= 1 / 16
+    angle = np.angle(np.exp(1j * (decoded[:, 2] - minutiae[:, 2])))
+    assert np.abs(angle).max() <= np.pi / 256 + 1e-6
+    assert np.array_equal(decoded[:, 3], minutiae[:, 3])
+
+
+def test_parse_template_reads_compact_raw_and_base64():
+    minutiae = random_minutiae(np.random.default_rng(1), 12)
+    encoded = encode_template(minutiae)
+    expected = decode_template(encoded)
+    assert np.array_equal(parse_template(encoded), expected)
+    assert np.array_equal(parse_template(base64.b64encode(encoded)), expected)
+
+
+def test_corrupt_templates_are_rejected():
+    encoded = bytearray(encode_template(random_minutiae(np.random.default_rng(2), 12)))
+    with pytest.raises(InvalidFingerprintDataError, match="truncated"):
+        template_info(encoded[:-1])
+    flipped = bytearray(encoded)
+    flipped[20] ^= 1
+    with pytest.raises(InvalidFingerprintDataError, match="checksum"):
+        parse_template(bytes(flipped))
+    encoded[4] = 2
+    with pytest.raises(InvalidFingerprintDataError, match="version 2"):
+        parse_template(bytes(encoded))
+
+
+def test_legacy_libfprint_print_converts_to_templates():
+    rng = np.random.default_rng(3)
+    impressions = [np.rint(random_minutiae(rng, count)) for count in (30, 45)]
+    items = b""
+    for minutiae in impressions:
+        columns = np.zeros((3, 200), dtype="<i4")
+        columns[:, :len(minutiae)] = minutiae[:, 0], minutiae[:, 1], np.degrees(minutiae[:, 2])
+        item = struct.pack("<i", len(minutiae)) + columns.tobytes()
+        items += struct.pack("<I", len(item)) + item
+    data = struct.pack("<3sHIB", b"FP2", 1, 0, 1) + items
+    converted = print_minutiae(data)
+    assert [len(minutiae) for minutiae in converted] == [30, 45]
+    assert np.array_equal(converted[1][:, :2], impressions[1][:, :2])
+    assert np.allclose(converted[1][:, 2], np.radians(np.degrees(impressions[1][:, 2]).astype(np.int32)))
+    assert len(print_templates(data)[0]) == 12 + 30 * 6 + 4
+
+    with pytest.raises(InvalidFingerprintDataError, match="device data"):
+        print_minutiae(struct.pack("<3sHIB", b"FP1", 1, 0, 0) + b"raw sensor data")
+
+
+def test_libfprint_1x_print_converts_to_minutiae():
+    GLib = pytest.importorskip("gi.repository.GLib")
+    xyt = ([10, 20, 30, 40, 50], [5, 6, 7, 8, 9], [0, 90, 180, 270, 45])
+    nbis = GLib.Variant("(a(aiaiai))", ([xyt],))
+    variant = GLib.Variant("(issbymsmsia{sv}v)", (2, "upektc_img", "", False, 7, None, None, 0, {}, nbis))
+    (minutiae,) = print_minutiae(b"FP1" + variant.get_data_as_bytes().get_data())
+    assert np.array_equal(minutiae[:, 0], xyt[0]) and np.allclose(minutiae[:, 2], np.radians(xyt[2]))
+
+
+def test_minutiae_backend_matches_compact_templates():
+    rng = np.random.default_rng(4)
+    gallery = {f"user{i}": random_minutiae(rng, 40) for i in range(20)}
+    backend = create_backend("minutiae")
+    for user_id, minutiae in gallery.items():
+        backend.add_template(user_id, encode_template(impression(rng, minutiae)))
+    assert backend.identify(None, encode_template(impression(rng, gallery["user3"]))) == "user3"
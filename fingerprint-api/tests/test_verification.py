@@ -1,14 +1,30 @@
 from fastapi.testclient import TestClient
+from src.core.config import settings
 from src.main import app
 
 client = TestClient(app)
 
 def test_verify_fingerprint_success():
+    client.post("/fingerprints/enroll", json={"user_id": "alice", "fingerprint_data": "sample_data"})
     response = client.post("/fingerprints/verify", json={"fingerprint_data": "sample_data"})
     assert response.status_code == 200
-    assert response.json() == {"match": True, "user_id": "1234"}
+    assert response.json() == {"match": True, "user_id": "alice"}
 
 def test_verify_fingerprint_failure():
     response = client.post("/fingerprints/verify", json={"fingerprint_data": "invalid_data"})
     assert response.status_code == 200
-    assert response.json() == {"match": False}
\ No newline at end of file
+    assert response.json() == {"match": False}
+
+def test_verify_fingerprint_raw_body():
+    headers = {"Content-Type": "application/octet-stream"}
+    assert client.post("/fingerprints/enroll/alice/template", content=b"sample_data", headers=headers).status_code == 200
+    response = client.post("/fingerprints/verify/template", content=b"sample_data", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"match": True, "user_id": "alice"}
+
+def test_verify_fingerprint_rejects_out_of_range_top_k():
+    for top_k in (0, settings.max_top_k + 1):
+        assert client.post("/fingerprints/verify", json={"fingerprint_data": "sample_data", "top_k": top_k}).status_code == 422
+        response = client.post(f"/fingerprints/verify/template?top_k={top_k}", content=b"sample_data",
+                               headers={"Content-Type": "application/octet-stream"})
+        assert response.status_code == 422